@@ -0,0 +1,149 @@
+"""
+libs/backtest.py
+
+리밸런스 포트폴리오 백테스트 (날짜 루프 없는 패널 연산).
+
+- 리밸런스일 d_k 종가에 목표 비중 w_k 로 교체 → d_k 다음 거래일부터 d_{k+1} 까지 보유
+- 보유 구간 안에서는 비중이 가격에 따라 표류 (구간별 누적수익률 cumprod 로 한 번에 계산)
+- 일수익률: 다음 종가 기준(close, 거래정지일은 직전 종가 유지) 또는 target_ret_1d
+- 회전율: 리밸런스 직전 표류 비중과 새 비중의 차이 합 Σ|w_new - w_drift| (첫 리밸런스는 1)
+- 거래비용: cost_bps × 회전율을 리밸런스 다음 거래일 수익률에서 차감
+
+사용 예시
+    from libs.backtest import rebalance_dates, run_backtest
+
+    reb = rebalance_dates(dates, "M")
+    res = run_backtest(weights, prices, cost_bps=15)   # weights: date, symbol, weight
+    print(res.stats)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class BacktestResult:
+    daily: pd.DataFrame       # date 인덱스: ret, gross_ret, nav, drawdown, turnover, bench_ret
+    rebalances: pd.DataFrame  # 리밸런스일 인덱스: turnover, n_holdings
+    stats: dict = field(default_factory=dict)
+
+
+def rebalance_dates(dates, freq="M") -> pd.DatetimeIndex:
+    """
+    거래일 목록에서 리밸런스일 선택.
+    freq: 정수 N(N 거래일마다) 또는 기간 문자("D", "W", "M", "Q") — 기간별 마지막 거래일.
+    """
+    dates = pd.DatetimeIndex(sorted(pd.unique(pd.DatetimeIndex(dates))))
+    if isinstance(freq, (int, np.integer)):
+        return dates[::int(freq)]
+    if freq == "D":
+        return dates
+    return pd.DatetimeIndex(dates.to_series().groupby(dates.to_period(freq)).max().to_numpy())
+
+
+def daily_returns(prices: pd.DataFrame, source: str = "close") -> pd.DataFrame:
+    """
+    (date × symbol) 일수익률 — t 행은 t-1 → t 수익률.
+    prices: date, symbol, close (source="target" 이면 target_ret_1d).
+    """
+    if source == "target":
+        r = prices.pivot(index="date", columns="symbol", values="target_ret_1d").sort_index()
+        return r.shift(1)
+    close = prices.pivot(index="date", columns="symbol", values="close").sort_index().astype(np.float64)
+    # 거래정지/결측일은 직전 종가 유지 (그날 수익률 0, 재개일에 누적 반영)
+    return close.ffill().pct_change(fill_method=None)
+
+
+def run_backtest(
+    weights: pd.DataFrame,
+    prices: pd.DataFrame | None = None,
+    cost_bps: float = 0.0,
+    source: str = "close",
+    returns: pd.DataFrame | None = None,
+) -> BacktestResult:
+    """
+    weights: date(리밸런스일), symbol, weight
+    prices : date, symbol, close (또는 target_ret_1d)
+    returns: 미리 계산한 daily_returns(prices) — 같은 가격으로 여러 번 돌릴 때 (파라미터 스윕)
+    """
+    R_all = daily_returns(prices, source) if returns is None else returns
+    dates = R_all.index
+
+    W = (weights.pivot_table(index="date", columns="symbol", values="weight", aggfunc="sum")
+                .fillna(0.0).sort_index())
+    W = W[W.index.isin(dates)]
+    # 한 번이라도 보유한 종목만 계산 (전 종목 패널 대비 수십 배 작음)
+    W = W.loc[:, W.columns.isin(R_all.columns) & (W != 0).any(axis=0).to_numpy()]
+    R = R_all[W.columns]
+    reb = W.index
+    W0 = W.to_numpy()
+
+    # 각 날짜가 속한 보유 구간 (직전 리밸런스일 번호, 첫 리밸런스 이전은 -1)
+    pid = np.searchsorted(reb.to_numpy(), dates.to_numpy(), side="left") - 1
+    live = pid >= 0
+
+    gross = np.nan_to_num(R.to_numpy(), nan=0.0) + 1.0
+    G = pd.DataFrame(gross[live]).groupby(pid[live]).cumprod().to_numpy()  # 구간 시작 대비 누적
+    Wp = W0[pid[live]]
+    V = (Wp * G).sum(axis=1)                                              # 구간 시작 대비 포트 가치
+    first = np.r_[True, pid[live][1:] != pid[live][:-1]]
+    V_prev = np.where(first, Wp.sum(axis=1), np.r_[np.nan, V[:-1]])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        port = np.where(V_prev > 0, V / V_prev - 1.0, 0.0)
+
+    # 회전율: 리밸런스일 종가 기준 표류 비중 → 새 비중
+    live_dates = dates[live]
+    drift = np.zeros_like(W0)
+    pos = live_dates.get_indexer(reb)
+    has = pos >= 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dw = Wp[pos[has]] * G[pos[has]] / V[pos[has], None]
+    drift[has] = np.nan_to_num(dw)
+    turnover = np.abs(W0 - drift).sum(axis=1)
+
+    # 거래비용: 리밸런스 다음 거래일(각 구간 첫날)에 차감
+    cost = np.zeros(live.sum())
+    cost[first] = turnover[pid[live][first]] * cost_bps / 1e4
+    net = port - cost
+
+    daily = pd.DataFrame(index=live_dates)
+    daily.index.name = "date"
+    daily["gross_ret"] = port
+    daily["ret"] = net
+    daily["nav"] = np.cumprod(1.0 + net)
+    daily["drawdown"] = daily["nav"] / daily["nav"].cummax() - 1.0
+    daily["turnover"] = pd.Series(turnover, index=reb).reindex(live_dates).fillna(0.0).to_numpy()
+    daily["bench_ret"] = R_all.mean(axis=1).to_numpy()[live]   # 동일가중 전 종목 (참고용)
+
+    rebalances = pd.DataFrame({"turnover": turnover, "n_holdings": (W0 > 0).sum(axis=1)}, index=reb)
+    return BacktestResult(daily, rebalances, summarize(daily, rebalances))
+
+
+def summarize(daily: pd.DataFrame, rebalances: pd.DataFrame) -> dict:
+    r = daily["ret"]
+    n = len(r)
+    if n == 0:
+        return {}
+    years = n / TRADING_DAYS
+    nav = float(daily["nav"].iloc[-1])
+    vol = float(r.std(ddof=1)) if n > 1 else np.nan
+    return {
+        "start": daily.index[0].date(),
+        "end": daily.index[-1].date(),
+        "days": n,
+        "total_return": nav - 1.0,
+        "cagr": nav ** (1 / years) - 1.0 if nav > 0 else np.nan,
+        "ann_vol": vol * np.sqrt(TRADING_DAYS),
+        "sharpe": float(r.mean()) / vol * np.sqrt(TRADING_DAYS) if vol and np.isfinite(vol) else np.nan,
+        "max_drawdown": float(daily["drawdown"].min()),
+        "bench_total_return": float(np.prod(1.0 + daily["bench_ret"].fillna(0.0)) - 1.0),
+        "n_rebalances": len(rebalances),
+        "avg_turnover": float(rebalances["turnover"].mean()),
+        "ann_turnover": float(rebalances["turnover"].sum()) / years,
+    }
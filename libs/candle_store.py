@@ -0,0 +1,220 @@
+"""
+libs/candle_store.py
+
+종목별 증분(append-only) 일봉 저장소.
+
+레이아웃
+  data/raw/kis_daily/<SYM>/1d/<첫날짜>_<마지막날짜>.parquet
+  스키마: libs.daily_candle.CANDLE_SCHEMA (date32 / dictionary symbol / int32·int64)
+
+- 파일명에 포함된 마지막 날짜로 종목별 최종 저장일을 알 수 있음 (별도 인덱스 불필요)
+- append(): 이미 저장된 날짜 이후의 행만 새 파트 파일로 기록 (기록한 행 반환)
+- read(): 전체(또는 일부 종목/기간)를 하나의 DataFrame으로 조회
+- compact(): 파트 파일이 많아진 종목을 단일 파일로 병합
+- replace(): 수정주가 이벤트로 과거가 바뀐 종목의 이력을 통째로 교체 (다른 종목은 그대로)
+
+사용 예시
+    from libs.candle_store import CandleStore
+
+    store = CandleStore()
+    last = store.last_date("005930")      # Timestamp 또는 None
+    store.append("005930", df_new)
+    df = store.read(symbols=["005930"], start="20250101")
+"""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from libs.daily_candle import CANDLE_SCHEMA
+from libs.io_util import atomic_write, ymd
+from libs.parquet_stream import to_table
+
+DEFAULT_ROOT = Path("data/raw/kis_daily")
+FREQ = "1d"
+COMPACT_AT = 64  # 종목별 파트 파일이 이 개수를 넘으면 append 시 자동 병합
+
+
+class CandleStore:
+    def __init__(self, root: Path | str = DEFAULT_ROOT, freq: str = FREQ, schema: pa.Schema = CANDLE_SCHEMA):
+        self.root = Path(root)
+        self.freq = freq
+        self.schema = schema
+        self._last: dict[str, Optional[pd.Timestamp]] = {}
+        self._lock = threading.Lock()
+
+    # ---- 경로 ----
+    def _dir(self, symbol: str) -> Path:
+        return self.root / str(symbol).zfill(6) / self.freq
+
+    def _parts(self, symbol: str) -> list[Path]:
+        d = self._dir(symbol)
+        if not d.exists():
+            return []
+        return sorted(p for p in d.glob("*.parquet"))
+
+    def symbols(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.parent.name for p in self.root.glob(f"*/{self.freq}") if any(p.glob("*.parquet")))
+
+    # ---- 메타 ----
+    def last_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        """종목의 마지막 저장일. 저장된 데이터가 없으면 None."""
+        symbol = str(symbol).zfill(6)
+        with self._lock:
+            if symbol in self._last:
+                return self._last[symbol]
+        parts = self._parts(symbol)
+        last = max((pd.Timestamp(p.stem.split("_")[-1]) for p in parts), default=None)
+        with self._lock:
+            self._last[symbol] = last
+        return last
+
+    def first_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        """종목의 첫 저장일. 저장된 데이터가 없으면 None."""
+        return min((pd.Timestamp(p.stem.split("_")[0]) for p in self._parts(symbol)), default=None)
+
+    def last_dates(self, symbols: Optional[Iterable[str]] = None) -> pd.Series:
+        """종목별 마지막 저장일 (symbol → Timestamp/NaT)."""
+        syms = self.symbols() if symbols is None else [str(s).zfill(6) for s in symbols]
+        return pd.Series({s: self.last_date(s) for s in syms}, dtype="datetime64[ns]")
+
+    def row_counts(self, symbols: Optional[Iterable[str]] = None) -> pd.Series:
+        """종목별 저장 행 수 (parquet 푸터만 읽음)."""
+        syms = self.symbols() if symbols is None else [str(s).zfill(6) for s in symbols]
+        return pd.Series({s: sum(pq.read_metadata(p).num_rows for p in self._parts(s)) for s in syms},
+                         dtype="int64")
+
+    def missing_range(
+        self, symbol: str, default_start: str, end: str, overlap: bool = False
+    ) -> Optional[tuple[str, str]]:
+        """
+        수집이 필요한 (start, end) 구간 (YYYYMMDD). 이미 최신이면 None.
+        저장된 데이터가 없으면 default_start부터.
+        overlap=True 면 마지막 저장일부터 (저장된 봉 1개를 다시 받아 수정주가 변경 여부 대조용).
+        """
+        last = self.last_date(symbol)
+        start = default_start if last is None else ymd(last + pd.Timedelta(days=1))
+        if start > end:
+            return None
+        if overlap and last is not None:
+            start = ymd(last)
+        return start, end
+
+    # ---- 쓰기 ----
+    def append(self, symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        마지막 저장일 이후의 행만 새 파트로 기록. 기록한 행(DataFrame) 반환.
+        """
+        if df is None or df.empty:
+            return pd.DataFrame()
+        symbol = str(symbol).zfill(6)
+        new = df.copy()
+        new["date"] = pd.to_datetime(new["date"])
+        last = self.last_date(symbol)
+        if last is not None:
+            new = new[new["date"] > last]
+        if new.empty:
+            return new
+        new = new.sort_values("date").drop_duplicates("date", keep="last")
+        new["symbol"] = pd.Categorical([symbol] * len(new))
+
+        d = self._dir(symbol)
+        d.mkdir(parents=True, exist_ok=True)
+        path = d / f"{ymd(new['date'].iloc[0])}_{ymd(new['date'].iloc[-1])}.parquet"
+        self._write_atomic(new, path)
+        with self._lock:
+            self._last[symbol] = new["date"].iloc[-1]
+
+        if len(self._parts(symbol)) > COMPACT_AT:
+            self.compact(symbol)
+        return new
+
+    def compact(self, symbol: str) -> None:
+        """종목의 파트 파일들을 하나로 병합."""
+        symbol = str(symbol).zfill(6)
+        parts = self._parts(symbol)
+        if len(parts) <= 1:
+            return
+        df = self.read(symbols=[symbol])
+        path = self._dir(symbol) / f"{ymd(df['date'].iloc[0])}_{ymd(df['date'].iloc[-1])}.parquet"
+        self._write_atomic(df, path)
+        for p in parts:
+            if p != path:
+                p.unlink()
+
+    def replace(self, symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        종목의 저장 이력을 df 로 통째로 교체 (수정주가 재수집용). 기록한 행 반환.
+        새 파일을 먼저 기록한 뒤 기존 파트를 지우므로 중간에 실패해도 이력이 비지 않음.
+        """
+        symbol = str(symbol).zfill(6)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        new = df.copy()
+        new["date"] = pd.to_datetime(new["date"])
+        new = new.sort_values("date").drop_duplicates("date", keep="last")
+        new["symbol"] = pd.Categorical([symbol] * len(new))
+
+        old = self._parts(symbol)
+        d = self._dir(symbol)
+        d.mkdir(parents=True, exist_ok=True)
+        path = d / f"{ymd(new['date'].iloc[0])}_{ymd(new['date'].iloc[-1])}.parquet"
+        self._write_atomic(new, path)
+        for p in old:
+            if p != path:
+                p.unlink()
+        with self._lock:
+            self._last[symbol] = new["date"].iloc[-1]
+        return new
+
+    def _write_atomic(self, df: pd.DataFrame, path: Path) -> None:
+        with atomic_write(path) as f:
+            pq.write_table(to_table(df, self.schema), f)
+
+    # ---- 읽기 ----
+    def read(
+        self,
+        symbols: Optional[Iterable[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        columns: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        저장소 전체를 하나의 논리 테이블로 조회 (symbol, date 정렬).
+        start/end(YYYYMMDD)는 파일 내 date 필터로 적용.
+        date 는 datetime64, symbol 은 (사전순 카테고리) category 로 반환.
+        """
+        syms = self.symbols() if symbols is None else [str(s).zfill(6) for s in symbols]
+        paths = [str(p) for s in syms for p in self._parts(s)]
+        if not paths:
+            return pd.DataFrame(columns=columns or ["date", "symbol"])
+
+        dataset = ds.dataset(paths, schema=self.schema, format="parquet")
+        flt = None
+        if start is not None:
+            flt = ds.field("date") >= pd.Timestamp(start).date()
+        if end is not None:
+            cond = ds.field("date") <= pd.Timestamp(end).date()
+            flt = cond if flt is None else flt & cond
+        if columns is not None:
+            columns = list(dict.fromkeys(["symbol", "date", *columns]))
+        df = dataset.to_table(columns=columns, filter=flt).to_pandas(date_as_object=False)
+
+        df["date"] = pd.to_datetime(df["date"])
+        if isinstance(df["symbol"].dtype, pd.CategoricalDtype):
+            df["symbol"] = df["symbol"].cat.set_categories(sorted(df["symbol"].cat.categories))
+        df = (
+            df.sort_values(["symbol", "date"], kind="stable")
+              .drop_duplicates(["symbol", "date"], keep="last")
+              .reset_index(drop=True)
+        )
+        return df
@@ -0,0 +1,129 @@
+"""
+libs/collect.py
+
+종목 단위 수집 루프 (run_collect_daily / run_collect_flow 공용).
+
+- fetch(sym) → 기록한 행 수. 종목별로 호출 한도 초과(KisRateLimitError)면 rate_retries 회까지 다시 시도
+- collect_async: asyncio 워커 (appkey 수 × concurrency_per_key)개로 병렬 호출 (스레드 풀에서 fetch 실행)
+  collect_sync: 순차 호출 (같은 클라이언트 풀 사용)
+- collect: 위 루프 + 실패 종목 재시도 라운드(retry_rounds 회, 라운드 전 retry_wait 초 대기)
+  라운드마다 RunManifest.flush() → 중간에 죽어도 재실행 시 완료 종목은 건너뜀
+
+사용 예시
+    from functools import partial
+    from libs.collect import collect
+    from libs.kis_client import get_client
+    from libs.run_manifest import RunManifest
+
+    client = get_client("real")
+    manifest = RunManifest.for_run("collect_daily", "20250923")
+    n_rows = collect(manifest.pending(symbols), partial(fetch_and_store, store), manifest, client)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from libs.rate_limit import KisRateLimitError
+
+CONCURRENCY_PER_KEY = 8  # appkey 1개당 동시 요청 수 (스레드 워커 수)
+RATE_LIMIT_RETRIES = 5   # 한도 초과 시 종목당 재시도 횟수
+RETRY_ROUNDS = 2         # 실패 종목 재시도 라운드 수
+RETRY_WAIT = 10          # 재시도 라운드 전 대기(초)
+PROGRESS_EVERY = 50      # 진행률 출력 주기(종목 수)
+
+
+def fetch_with_retry(fetch: Callable[[str], int], sym: str, rate_retries: int = RATE_LIMIT_RETRIES) -> int:
+    """fetch(sym) 를 호출 한도 초과일 때만 rate_retries 회까지 다시 시도."""
+    for _ in range(rate_retries + 1):
+        try:
+            return fetch(sym)
+        except KisRateLimitError:
+            continue
+    raise KisRateLimitError(f"{sym}: 호출 한도 초과 재시도 소진")
+
+
+def collect_sync(symbols, fetch, manifest, client, rate_retries: int = RATE_LIMIT_RETRIES) -> int:
+    """종목을 순서대로 수집 → 기록한 행 수 합계. 성공/실패는 manifest 에 기록."""
+    n_rows = 0
+    for i, sym in enumerate(symbols, 1):
+        try:
+            n_rows += fetch_with_retry(fetch, sym, rate_retries)
+            manifest.mark_done(sym)
+        except Exception as e:
+            print(f"⚠️ {sym} 실패:", e)
+            manifest.mark_failed(sym, e)
+
+        if i % PROGRESS_EVERY == 0:
+            print(f"진행률: {i}/{len(symbols)} ({client})")
+    return n_rows
+
+
+async def collect_async(
+    symbols,
+    fetch,
+    manifest,
+    client,
+    concurrency_per_key: int = CONCURRENCY_PER_KEY,
+    rate_retries: int = RATE_LIMIT_RETRIES,
+) -> int:
+    """종목을 (appkey 수 × concurrency_per_key)개 워커로 병렬 수집 → 기록한 행 수 합계."""
+    concurrency = concurrency_per_key * len(client)
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    sem = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def _one(sym):
+        nonlocal done
+        async with sem:
+            try:
+                n = await asyncio.to_thread(fetch_with_retry, fetch, sym, rate_retries)
+                manifest.mark_done(sym)
+                return n
+            except Exception as e:
+                print(f"⚠️ {sym} 실패:", e)
+                manifest.mark_failed(sym, e)
+            finally:
+                done += 1
+                if done % PROGRESS_EVERY == 0:
+                    print(f"진행률: {done}/{len(symbols)} ({client})")
+        return 0
+
+    results = await asyncio.gather(*(_one(s) for s in symbols))
+    return sum(results)
+
+
+def collect(
+    symbols,
+    fetch,
+    manifest,
+    client,
+    async_mode: bool = True,
+    retry_rounds: int = RETRY_ROUNDS,
+    retry_wait: float = RETRY_WAIT,
+    concurrency_per_key: int = CONCURRENCY_PER_KEY,
+    rate_retries: int = RATE_LIMIT_RETRIES,
+) -> int:
+    """
+    symbols 수집 후 실패 종목(manifest.retry_queue())을 retry_rounds 회까지 다시 수집.
+    라운드마다 manifest.flush(). 기록한 행 수 합계 반환.
+    """
+    todo = list(symbols)
+    n_rows = 0
+    for rnd in range(retry_rounds + 1):
+        if rnd > 0:
+            todo = manifest.retry_queue()
+            if not todo:
+                break
+            print(f"🔁 재시도 {rnd}/{retry_rounds}: {len(todo)} 종목")
+            time.sleep(retry_wait)
+        if async_mode:
+            n_rows += asyncio.run(collect_async(todo, fetch, manifest, client, concurrency_per_key, rate_retries))
+        else:
+            n_rows += collect_sync(todo, fetch, manifest, client, rate_retries)
+        manifest.flush()
+    return n_rows
@@ -2,20 +2,121 @@
 apps/collector/kis/daily_candle.py
 
 단일 종목의 일봉(OHLCV) 데이터를 KIS API에서 조회하는 모듈.
+- 조회 구간이 길면 CHUNK_DAYS 단위로 나눠 순서대로 조회 후 병합
+  (itemchartprice 는 1회 최대 약 100봉만 반환. 병렬성은 수집기의 종목 단위 워커가 담당 —
+   종목마다 스레드 풀을 만들지 않음. 필요하면 공유 executor 를 넘겨 구간을 병렬 조회)
+- 수집 시점에 한 번만 타입 변환 → 고정 스키마(CANDLE_SCHEMA)
+  date: date32 / symbol: dictionary / OHLC: int32 / volume, value: int64
+- 수정주가 이벤트 필드(mod_yn / flng_cls_code / split_ratio)는 저장 스키마 밖의 컬럼으로 함께 반환
+  → adjustment_events() 로 분할/권리락 등 과거 수정주가가 바뀌는 날을 판별 (수집기가 해당 종목만 재수집)
 """
 
-import os
-import requests
 import pandas as pd
-from datetime import datetime
-from typing import Optional
+import pyarrow as pa
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from libs.kis_client import KisClient, KisClientPool, get_client
+from libs.rate_limit import TokenBucket
+
+CHUNK_DAYS = 100          # 1회 요청 구간(달력일) → 거래일 기준 100봉 미만
+CHUNK_RETRIES = 3         # 구간별 호출 한도 초과 재시도 횟수 (limiter 사용 시)
+ITEMCHART_PATH = "/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice"
+
+PRICE_COLS = ["open", "high", "low", "close"]
+QTY_COLS = ["volume", "value"]
+EVENT_COLS = ["mod_yn", "flng_cls_code", "split_ratio"]   # 저장하지 않는 수정주가 이벤트 필드
+# 락 구분 중 주식 수가 바뀌는 이벤트 (01 권리락, 04 권배락, 06 권리중간배당락, 07 권리분기배당락)
+# 현금 배당락(02/03/05)은 수정주가에 반영되지 않으므로 제외
+ADJ_LOCK_CODES = {"01", "04", "06", "07"}
+
+# 일봉 저장 스키마 (CandleStore)
+CANDLE_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("symbol", pa.dictionary(pa.int32(), pa.string())),
+    ("open", pa.int32()),
+    ("high", pa.int32()),
+    ("low", pa.int32()),
+    ("close", pa.int32()),
+    ("volume", pa.int64()),
+    ("value", pa.int64()),
+])
+
+
+def date_chunks(start: str, end: str, span: int = CHUNK_DAYS) -> Iterator[tuple[str, str]]:
+    """[start, end] (YYYYMMDD) 를 span 일 단위 구간으로 분할."""
+    d0 = datetime.strptime(start, "%Y%m%d").date()
+    d1 = datetime.strptime(end, "%Y%m%d").date()
+    cur = d0
+    while cur <= d1:
+        nxt = min(cur + timedelta(days=span - 1), d1)
+        yield cur.strftime("%Y%m%d"), nxt.strftime("%Y%m%d")
+        cur = nxt + timedelta(days=1)
+
+
+def to_candle_frame(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """
+    KIS 원문(문자열) → 타입 고정 프레임.
+    가격 int32, 수량/대금 int64, date datetime64, symbol category.
+    종가가 없는 행은 버리고, 나머지 결측(거래정지일 시가 등)은 0.
+    원문에 EVENT_COLS 가 있으면 그대로 붙여 반환 (CANDLE_SCHEMA 로 저장할 때 빠짐).
+    """
+    out = pd.DataFrame({"date": pd.to_datetime(df["date"], format="%Y%m%d", errors="coerce")})
+    for c in PRICE_COLS + QTY_COLS:
+        out[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else float("nan")
+    for c in EVENT_COLS:
+        if c in df.columns:
+            out[c] = df[c]
+    out = out.dropna(subset=["date", "close"])
+    for c in PRICE_COLS:
+        out[c] = out[c].fillna(0).astype("int32")
+    for c in QTY_COLS:
+        out[c] = out[c].fillna(0).astype("int64")
+    out["symbol"] = pd.Categorical([symbol] * len(out))
+    return out
+
+
+def adjustment_events(df: pd.DataFrame) -> pd.Series:
+    """
+    행별 수정주가 이벤트 여부: 수정주가 반영일(mod_yn=Y), 주식 수가 바뀌는 락(ADJ_LOCK_CODES),
+    분할 비율(split_ratio ≠ 0). 이벤트 필드가 없으면 전부 False.
+    """
+    flag = pd.Series(False, index=df.index)
+    if "mod_yn" in df.columns:
+        flag |= df["mod_yn"].astype(str).str.strip().str.upper().eq("Y")
+    if "flng_cls_code" in df.columns:
+        flag |= df["flng_cls_code"].astype(str).str.strip().isin(ADJ_LOCK_CODES)
+    if "split_ratio" in df.columns:
+        ratio = pd.to_numeric(df["split_ratio"], errors="coerce")
+        flag |= ratio.notna() & ratio.ne(0)
+    return flag
+
+
+def _fetch_chunk(
+    client: KisClient | KisClientPool,
+    tr_id: str,
+    params: dict,
+    access_token: Optional[str],
+    limiter: Optional[TokenBucket],
+) -> list:
+    """구간 1개 조회 → output2 레코드 목록."""
+    retries = CHUNK_RETRIES if (limiter or client.limiter) is not None else 0
+    data = client.get(ITEMCHART_PATH, tr_id, params, access_token=access_token, limiter=limiter,
+                      rate_retries=retries)
+    # 데이터 없는 구간은 빈 dict 가 섞여 올 수 있음
+    return [r for r in (data.get("output2") or []) if r]
+
 
 def get_daily_candle(
     symbol: str,
     start_date: str,
     end_date: str,
-    access_token: str,
+    access_token: Optional[str] = None,
     env: str = "real",
+    limiter: Optional[TokenBucket] = None,
+    client: Optional[KisClient | KisClientPool] = None,
+    executor: Optional[Executor] = None,
 ) -> pd.DataFrame:
     """
     KIS API: 일봉 조회 (inquire-daily-itemchartprice)
@@ -28,48 +129,57 @@ def get_daily_candle(
         조회 시작일 (YYYYMMDD)
     end_date : str
         조회 종료일 (YYYYMMDD)
-    access_token : str
-        KIS 인증 토큰
+    access_token : str, optional
+        KIS 인증 토큰 (없으면 client 가 토큰 캐시에서 조회)
     env : str
         "real" (실전) 또는 "mock" (모의)
+    limiter : TokenBucket, optional
+        주어지면 클라이언트의 키별 버킷 대신 이 버킷을 사용 (여러 스레드가 공유)
+        구간 분할 시 각 구간 요청도 같은 limiter 를 사용
+    client : KisClient | KisClientPool, optional
+        공용 HTTP 클라이언트 (기본: env 별 공유 풀 — appkey 가 여러 개면 키별로 분산)
+    executor : Executor, optional
+        구간이 여러 개일 때 구간 조회를 맡길 공유 executor (기본: 순차 조회).
+        이 함수를 실행 중인 워커와 같은 풀을 넘기면 교착될 수 있으므로 별도 풀을 사용
 
     Returns
     -------
     pd.DataFrame
-        일봉 데이터 (date, open, high, low, close, volume, value, symbol)
+        일봉 데이터 (date, open, high, low, close, volume, value, symbol) — CANDLE_SCHEMA 타입
+        + 응답에 있으면 EVENT_COLS (수정주가 이벤트 판별용, 저장 시 제외)
+
+    Raises
+    ------
+    KisRateLimitError
+        KIS가 초당 거래건수 초과(EGW00201)를 응답한 경우
     """
-    base_url = (
-        "https://openapi.koreainvestment.com:9443"
-        if env == "real"
-        else "https://openapivts.koreainvestment.com:29443"
-    )
+    client = client or get_client(env)
     tr_id = "FHKST03010100" if env == "real" else "VTKST03010100"
+    chunk_params = [
+        {
+            "fid_cond_mrkt_div_code": "J",   # J=주식
+            "fid_input_iscd": symbol,
+            "fid_org_adj_prc": "1",          # 수정주가
+            "fid_period_div_code": "D",      # 일봉
+            "fid_input_date_1": s,
+            "fid_input_date_2": e,
+        }
+        for s, e in date_chunks(start_date, end_date)
+    ]
+
+    def fetch(params: dict) -> list:
+        return _fetch_chunk(client, tr_id, params, access_token, limiter)
+
+    if executor is not None and len(chunk_params) > 1:
+        chunks = list(executor.map(fetch, chunk_params))
+    else:
+        chunks = [fetch(p) for p in chunk_params]
 
-    url = f"{base_url}/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice"
-    headers = {
-        "content-type": "application/json",
-        "authorization": f"Bearer {access_token}",
-        "appkey": os.getenv("KIS_API_KEY"),
-        "appsecret": os.getenv("KIS_API_SECRET"),
-        "tr_id": tr_id,
-    }
-    params = {
-        "fid_cond_mrkt_div_code": "J",   # J=주식
-        "fid_input_iscd": symbol,
-        "fid_org_adj_prc": "1",          # 수정주가
-        "fid_period_div_code": "D",      # 일봉
-        "fid_input_date_1": start_date,
-        "fid_input_date_2": end_date,
-    }
-
-    res = requests.get(url, headers=headers, params=params, timeout=10)
-    res.raise_for_status()
-    data = res.json()
-
-    if "output2" not in data:
+    rows = [r for chunk in chunks for r in chunk]
+    if not rows:
         return pd.DataFrame()
 
-    df = pd.DataFrame(data["output2"])
+    df = pd.DataFrame(rows)
     df = df.rename(
         columns={
             "stck_bsop_date": "date",
@@ -79,9 +189,9 @@ def get_daily_candle(
             "stck_clpr": "close",
             "acml_vol": "volume",
             "acml_tr_pbmn": "value",
+            "prtt_rate": "split_ratio",
         }
     )
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.sort_values("date")
-    df["symbol"] = symbol
+    df = to_candle_frame(df, symbol)
+    df = df.drop_duplicates("date", keep="last").sort_values("date").reset_index(drop=True)
     return df
@@ -0,0 +1,114 @@
+"""
+libs/factors.py
+
+일봉 기반 팩터 계산 (패널 연산).
+
+- 종목별 groupby.apply 대신 (봉 순번 × 종목) wide 패널에서 rolling/ewm/pct_change 를
+  전 종목에 한 번에 적용 → 종목 수만큼의 파이썬 호출/정렬/복사가 사라짐
+- 각 종목 컬럼에 같은 pandas 커널이 같은 순서로 적용되므로 종목별 계산과 결과가 비트 단위로 동일
+- 결과는 (symbol, date) 정렬 순서의 long 프레임
+- 증분 계산: 이전 런의 종목별 꼬리(factor_state)에 새 봉을 붙여 넘기면
+  EMA 는 꼬리에 저장된 마지막 값에서 이어서 계산 (ewm 재귀식의 시작값으로 사용)
+  수익률/rolling 창은 꼬리 STATE_BARS 봉으로 충분하므로 새 봉의 팩터만 O(신규 봉)으로 계산
+- 팩터 정의는 libs.indicators 레지스트리에 등록 → ret_1d / 이동평균 등 공통 중간값은 한 번만 계산,
+  extra 로 보조지표(MA 괴리율, ATR, RV 등)를 같은 패스에서 함께 계산
+
+사용 예시
+    from libs.factors import compute_factors
+
+    df_feat = compute_factors(df)   # df: symbol, date, open, high, low, close, volume, value
+    df_feat = compute_factors(df, extra=["atr_14", "rv_20"])
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from libs.indicators import iter_compute, register
+from libs.panel import Panel
+
+BASE_COLS = ["date", "open", "high", "low", "close", "volume", "value"]
+
+RET_LAGS = [1, 5, 20, 60, 120]
+EMA_SPANS = [20, 60, 120]
+ROLL_WINDOWS = {20: 10, 60: 20}  # window: min_periods
+STATE_BARS = max(RET_LAGS) + 1   # 마지막 봉의 팩터를 다시 계산하는 데 필요한 꼬리 길이
+
+FACTOR_COLS = (
+    [f"ret_{n}d" for n in RET_LAGS]
+    + [f"ema_{n}" for n in EMA_SPANS]
+    + ["momentum", "volatility_20d", "volatility_60d",
+       "val_ma20", "val_ma60", "value_traded",
+       "vol_ma20", "vol_ma60", "volume_mean_ratio",
+       "target_ret_1d"]
+)
+
+
+# ---- 팩터 지표 등록 (libs.indicators 레지스트리, ret_1d / target_ret_1d 는 공용 지표) ----
+for _n in RET_LAGS[1:]:
+    register(f"ret_{_n}d", ["close"], lambda c, n=_n: c.pct_change(n))
+for _n in EMA_SPANS:
+    register(f"ema_{_n}", ["close"], lambda c, n=_n: c.ewm(span=n, adjust=False).mean())
+register("momentum", ["close", "ema_120"], lambda c, ema: c / ema - 1)
+for _w, _mp in ROLL_WINDOWS.items():
+    register(f"volatility_{_w}d", ["ret_1d"], lambda r, w=_w, mp=_mp: r.rolling(w, min_periods=mp).std())
+    register(f"val_ma{_w}", ["value"], lambda v, w=_w, mp=_mp: v.rolling(w, min_periods=mp).mean())
+    register(f"vol_ma{_w}", ["volume"], lambda v, w=_w, mp=_mp: v.rolling(w, min_periods=mp).mean())
+register("value_traded", ["val_ma20"], np.log1p)
+register("volume_mean_ratio", ["vol_ma20", "vol_ma60"], lambda a, b: a / b)
+
+
+def _seeded_ema(close: pd.DataFrame, known: pd.DataFrame, span: int) -> pd.DataFrame:
+    """
+    known(이전 런에서 계산된 EMA, 새 봉은 NaN)의 종목별 마지막 값부터 EMA 를 이어서 계산.
+    ewm(adjust=False)은 첫 관측값을 그대로 시작값으로 쓰므로 앞쪽을 NaN 으로 가리고
+    마지막 known 위치에 EMA 값을 넣으면 전체 이력으로 계산한 것과 같은 재귀가 됨.
+    """
+    k = known.to_numpy()
+    has = ~np.isnan(k)
+    n_pos = k.shape[0]
+    last = np.where(has.any(axis=0), n_pos - 1 - np.argmax(has[::-1], axis=0), -1)
+    rows = np.arange(n_pos)[:, None]
+
+    x = close.to_numpy().copy()
+    x[rows < last] = np.nan
+    seeded = np.flatnonzero(last >= 0)
+    x[last[seeded], seeded] = k[last[seeded], seeded]
+    ema = pd.DataFrame(x).ewm(span=span, adjust=False).mean().to_numpy()
+    return pd.DataFrame(np.where(rows <= last, k, ema), columns=close.columns)
+
+
+def compute_factors(df: pd.DataFrame, extra: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    df 의 전 종목에 대해 팩터 (+ extra 로 요청한 libs.indicators 지표) 계산.
+    df 에 ema_* 컬럼이 있으면(이전 런의 꼬리 + 새 봉) 그 값에서 EMA 를 이어서 계산.
+    반환: symbol + BASE_COLS + FACTOR_COLS + extra, (symbol, date) 정렬, 인덱스 0..n-1
+    """
+    p = Panel(df)
+    out = p.frame(df[["symbol"] + BASE_COLS]).reset_index(drop=True)
+    names = list(dict.fromkeys([*FACTOR_COLS, *extra]))
+
+    given = {}
+    seeded = [n for n in EMA_SPANS if f"ema_{n}" in df.columns]
+    if seeded:
+        close = p.wide(df["close"])
+        for n in seeded:
+            given[f"ema_{n}"] = _seeded_ema(close, p.wide(df[f"ema_{n}"]), n)
+        del close
+
+    # 공통 중간값(ret_1d, 이동평균 등)은 한 번만 계산, wide 결과는 long 으로 바꾸는 즉시 해제
+    f = {name: p.long(w) for name, w in iter_compute(lambda c: p.wide(df[c]), names, given)}
+    return pd.concat([out, pd.DataFrame({c: f[c] for c in names})], axis=1)
+
+
+def factor_state(feat: pd.DataFrame, keep: int = STATE_BARS) -> pd.DataFrame:
+    """
+    다음 증분 계산용 종목별 꼬리: 마지막 keep 봉의 원본 컬럼 + EMA + bar_no(종목 내 봉 번호).
+    feat 은 compute_factors 결과 + bar_no 컬럼.
+    """
+    cols = ["symbol"] + BASE_COLS + [f"ema_{n}" for n in EMA_SPANS] + ["bar_no"]
+    tail = feat.groupby("symbol", observed=True, sort=False).cumcount(ascending=False) < keep
+    return feat.loc[tail, cols].reset_index(drop=True)
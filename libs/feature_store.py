@@ -0,0 +1,145 @@
+"""
+libs/feature_store.py
+
+날짜 파티션 피처 저장소.
+
+레이아웃
+  data/proc/feature_store/dt=<YYYYMMDD>/part-0.parquet   (날짜 1개 = 파일 1개)
+
+- 조회할 날짜(또는 구간)의 디렉터리만 골라 읽고, 필요한 컬럼만 읽음
+  → 최신 1일 스코어링은 패널 전체 이력과 무관하게 하루치만 읽음
+- 날짜 목록은 디렉터리 이름으로 확인 (파일을 열지 않음)
+- write(df): df 에 있는 날짜의 파티션만 교체 / write(df, replace=True): 저장소 전체 교체
+  전체 교체는 임시 디렉터리에 기록 후 rename 으로 바꿔치기 (읽는 쪽이 반쯤 쓴 저장소를 보지 않도록)
+- 여러 번에 나눠 쓴 뒤 한 번에 교체: staged = store.staging() → staged.write(...) 반복 → store.publish(staged)
+
+사용 예시
+    from libs.feature_store import FeatureStore, load_features
+
+    cs = load_features(columns=["symbol", "date", "ret_60d"])          # 최신 날짜 단면
+    df = load_features(start="20250101", end="20250923")               # 기간
+    df = load_features(dates=reb_dates, columns=cols)                  # 날짜 목록 (리밸런스일)
+    FeatureStore().write(df_feat, replace=True)
+"""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from libs.io_util import ymd
+
+DEFAULT_ROOT = Path("data/proc/feature_store")
+PART_KEY = "dt"
+
+
+class FeatureStore:
+    def __init__(self, root: Path | str = DEFAULT_ROOT):
+        self.root = Path(root)
+
+    # ---- 메타 ----
+    def _part_dirs(self) -> dict[str, Path]:
+        if not self.root.exists():
+            return {}
+        return {
+            p.name.split("=", 1)[1]: p
+            for p in self.root.glob(f"{PART_KEY}=*")
+            if p.is_dir() and any(p.glob("*.parquet"))
+        }
+
+    def dates(self) -> list[pd.Timestamp]:
+        return [pd.Timestamp(d) for d in sorted(self._part_dirs())]
+
+    def latest_date(self) -> Optional[pd.Timestamp]:
+        parts = self._part_dirs()
+        return pd.Timestamp(max(parts)) if parts else None
+
+    # ---- 쓰기 ----
+    def write(self, df: pd.DataFrame, replace: bool = False) -> None:
+        """날짜별 파티션으로 기록. replace=True 면 기존 저장소 전체를 교체."""
+        if df is None or df.empty:
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        codes, uniq = pd.factorize(pd.to_datetime(df["date"]))
+        dt = pa.array(uniq.strftime("%Y%m%d").to_numpy()[codes], type=pa.string())   # 날짜 문자열은 고유값만 변환
+        # 날짜 순으로 정렬해 파티션별로 한 번에 기록 (종목 순 그대로면 열린 파일 수가 max_open_files 를 넘어 파일이 잘게 쪼개짐)
+        table = table.append_column(PART_KEY, dt).sort_by([(PART_KEY, "ascending")])
+
+        staged = self.staging() if replace else self
+        ds.write_dataset(
+            table,
+            staged.root,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([(PART_KEY, pa.string())]), flavor="hive"),
+            basename_template="part-{i}.parquet",
+            existing_data_behavior="delete_matching",
+            max_rows_per_group=1 << 20,
+            max_partitions=1 << 20,   # 기본값 1024 → 10년치(약 2,500일)도 한 번에
+        )
+        if replace:
+            self.publish(staged)
+
+    def staging(self) -> "FeatureStore":
+        """비어 있는 임시 저장소 (<root>.tmp) — 다 쓴 뒤 publish 로 교체."""
+        staged = FeatureStore(self.root.with_name(self.root.name + ".tmp"))
+        if staged.root.exists():
+            shutil.rmtree(staged.root)
+        return staged
+
+    def publish(self, staged: "FeatureStore") -> None:
+        """staged 저장소로 통째로 교체 (rename)."""
+        staged.root.mkdir(parents=True, exist_ok=True)
+        old = self.root.with_name(self.root.name + ".old")
+        if self.root.exists():
+            self.root.rename(old)
+        staged.root.rename(self.root)
+        shutil.rmtree(old, ignore_errors=True)
+
+    # ---- 읽기 ----
+    def read(
+        self,
+        date=None,
+        start=None,
+        end=None,
+        columns: Optional[Iterable[str]] = None,
+        dates: Optional[Iterable] = None,
+    ) -> pd.DataFrame:
+        """
+        date 하나, dates 목록, 또는 [start, end] 구간을 조회. 모두 None 이면 최신 날짜.
+        columns 중 저장소에 없는 컬럼은 무시.
+        """
+        parts = self._part_dirs()
+        if dates is not None:
+            keys = sorted({ymd(d) for d in dates} & parts.keys())
+        elif date is None and start is None and end is None:
+            keys = [max(parts)] if parts else []
+        elif date is not None:
+            keys = [k for k in [ymd(date)] if k in parts]
+        else:
+            lo = ymd(start) if start is not None else ""
+            hi = ymd(end) if end is not None else "99999999"
+            keys = sorted(k for k in parts if lo <= k <= hi)
+
+        files = [str(f) for k in keys for f in sorted(parts[k].glob("*.parquet"))]
+        if not files:
+            return pd.DataFrame(columns=list(columns) if columns is not None else ["date", "symbol"])
+
+        # 날짜에 따라 전부 결측이던 컬럼(null 타입)이 있을 수 있어 스키마를 넓혀서 통일
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+        if columns is not None:
+            columns = [c for c in dict.fromkeys(columns) if c in schema.names]
+        df = ds.dataset(files, schema=schema, format="parquet").to_table(columns=columns).to_pandas()
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        return df
+
+
+def load_features(date=None, start=None, end=None, columns: Optional[Iterable[str]] = None,
+                  dates: Optional[Iterable] = None, root: Path | str = DEFAULT_ROOT) -> pd.DataFrame:
+    return FeatureStore(root).read(date=date, start=start, end=end, columns=columns, dates=dates)
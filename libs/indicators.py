@@ -0,0 +1,177 @@
+"""
+libs/indicators.py
+
+일봉 기술적 지표 레지스트리 (의존성 기반 패널 계산).
+
+- 지표마다 이름 / 의존 지표(또는 원본 컬럼) / wide 프레임 계산 함수를 등록
+- 요청한 지표 목록을 의존성 순서(후위 순회)로 펼쳐 공통 중간값(전일 종가, 수익률, TR, 이동평균 등)은
+  패널 전체에 대해 한 번만 계산 → 마지막으로 쓰는 지표가 끝나면 바로 해제 (요청하지 않은 중간값은 반환 안 함)
+- 계산은 libs.panel 의 (봉 순번 × 종목) wide 프레임 위에서 종목 전체에 한 번에 적용
+  → 종목별 groupby.apply 와 같은 pandas 커널이라 결과가 비트 단위로 동일
+- 외부에서 이미 가진 값(이어서 계산한 EMA, 원본의 prdy_close 등)은 given 으로 넘기면 그 값을 사용
+
+사용 예시
+    from libs.indicators import TECHNICAL_COLS, add_indicators
+
+    df = add_indicators(df, TECHNICAL_COLS)          # df: symbol, date, open, high, low, close, ...
+    df = add_indicators(df, ["atr_14", "rv_20"])     # TR / 로그수익률은 필요한 만큼만 계산
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from libs.panel import Panel
+
+INPUT_COLS = ["open", "high", "low", "close", "volume", "value"]
+
+MA_WINDOWS = [5, 10, 20]
+MA_SLOPES = [10, 20]
+ATR_WINDOWS = [5, 14]
+RV_WINDOWS = [10, 20]
+
+# 일봉 보조지표 (가격/추세 + 변동성)
+TECHNICAL_COLS = (
+    [f"ma_{n}" for n in MA_WINDOWS]
+    + [f"dist_ma{n}" for n in MA_WINDOWS]
+    + [f"ma{n}_slope" for n in MA_SLOPES]
+    + ["tr"] + [f"atr_{n}" for n in ATR_WINDOWS]
+    + ["ln_return"] + [f"rv_{n}" for n in RV_WINDOWS]
+    + ["range_pct", "gap_pct"]
+)
+
+
+@dataclass(frozen=True)
+class Indicator:
+    name: str
+    deps: tuple[str, ...]
+    fn: Callable[..., pd.DataFrame]   # deps 순서의 wide 프레임 → wide 프레임
+
+
+REGISTRY: dict[str, Indicator] = {}
+
+
+def register(name: str, deps: Iterable[str], fn: Callable[..., pd.DataFrame]) -> None:
+    deps = tuple(deps)
+    unknown = [d for d in deps if d not in REGISTRY and d not in INPUT_COLS]
+    if unknown:
+        raise ValueError(f"{name}: 등록되지 않은 의존 지표 {unknown}")
+    REGISTRY[name] = Indicator(name, deps, fn)
+
+
+# ---- 기본 중간값 ----
+register("prev_close", ["close"], lambda c: c.shift(1))
+register("ret_1d", ["close"], lambda c: c.pct_change(1))
+register("ln_return", ["close", "prev_close"], lambda c, pc: np.log(c / pc))
+register("tr", ["high", "low", "prev_close"],
+         lambda h, l, pc: pd.DataFrame(np.fmax(np.fmax(h - l, (h - pc).abs()), (l - pc).abs()),
+                                       columns=h.columns))
+register("range_pct", ["high", "low", "close"], lambda h, l, c: (h - l) / c)
+register("gap_pct", ["open", "prev_close"], lambda o, pc: (o - pc) / pc)
+register("target_ret_1d", ["close"], lambda c: c.shift(-1) / c - 1)
+
+# ---- 가격/추세 ----
+for _n in MA_WINDOWS:
+    register(f"ma_{_n}", ["close"], lambda c, n=_n: c.rolling(n).mean())
+    register(f"dist_ma{_n}", ["close", f"ma_{_n}"], lambda c, ma: c / ma - 1)
+for _n in MA_SLOPES:
+    register(f"ma{_n}_slope", [f"ma_{_n}"], lambda ma: ma - ma.shift(1))
+
+# ---- 변동성 ----
+for _n in ATR_WINDOWS:
+    register(f"atr_{_n}", ["tr"], lambda tr, n=_n: tr.rolling(n).mean())
+for _n in RV_WINDOWS:
+    register(f"rv_{_n}", ["ln_return"], lambda r, n=_n: r.rolling(n).std())
+
+
+def plan(names: Iterable[str], given: Iterable[str] = ()) -> list[str]:
+    """요청 지표 + 의존 지표를 계산 순서대로 (given / 원본 컬럼은 계산하지 않으므로 제외)."""
+    given = set(given)
+    order: list[str] = []
+    seen: set[str] = set()
+
+    def visit(name: str, path: tuple[str, ...]) -> None:
+        if name in seen or name in given or name in INPUT_COLS:
+            return
+        if name in path:
+            raise ValueError(f"순환 의존: {' → '.join(path + (name,))}")
+        if name not in REGISTRY:
+            raise KeyError(f"등록되지 않은 지표: {name}")
+        for d in REGISTRY[name].deps:
+            visit(d, path + (name,))
+        seen.add(name)
+        order.append(name)
+
+    for n in names:
+        visit(n, ())
+    return order
+
+
+def iter_compute(
+    load: Callable[[str], pd.DataFrame],
+    names: Iterable[str],
+    given: Optional[Mapping[str, pd.DataFrame]] = None,
+) -> Iterator[tuple[str, pd.DataFrame]]:
+    """
+    load(원본 컬럼) → wide 프레임. 요청한 지표를 계산되는 대로 (이름, wide 프레임) 으로 반환.
+    중간값/원본은 마지막으로 쓰는 지표가 끝나면 해제 (요청 지표는 반환 후 호출 쪽이 보관).
+    """
+    names = list(dict.fromkeys(names))
+    given = dict(given or {})
+    order = plan(names, given)
+
+    # 남은 사용 횟수 (요청 지표 반환도 한 번의 사용으로 셈)
+    uses: dict[str, int] = {n: 1 for n in names}
+    for n in order:
+        for d in REGISTRY[n].deps:
+            uses[d] = uses.get(d, 0) + 1
+
+    memo: dict[str, pd.DataFrame] = {}
+
+    def get(name: str) -> pd.DataFrame:
+        if name not in memo:
+            memo[name] = given.pop(name) if name in given else load(name)
+        return memo[name]
+
+    def release(name: str) -> None:
+        uses[name] -= 1
+        if uses[name] == 0:
+            memo.pop(name, None)
+
+    for name in [n for n in names if n in given or n in INPUT_COLS]:
+        yield name, get(name)
+        release(name)
+    for name in order:
+        ind = REGISTRY[name]
+        memo[name] = ind.fn(*(get(d) for d in ind.deps))
+        for d in ind.deps:
+            release(d)
+        if name in names:
+            yield name, memo[name]
+            release(name)
+
+
+def compute(
+    load: Callable[[str], pd.DataFrame],
+    names: Iterable[str],
+    given: Optional[Mapping[str, pd.DataFrame]] = None,
+) -> dict[str, pd.DataFrame]:
+    return dict(iter_compute(load, names, given))
+
+
+def add_indicators(df: pd.DataFrame, names: Iterable[str]) -> pd.DataFrame:
+    """
+    long(symbol, date) 프레임에 지표 컬럼 추가. 반환은 (symbol, date) 정렬, 인덱스 0..n-1.
+    df 에 prdy_close(전일 종가) 컬럼이 있으면 종목 내 직전 봉 종가 대신 그 값을 사용.
+    """
+    names = list(names)
+    p = Panel(df)
+    out = p.frame(df).reset_index(drop=True)
+    given = {"prev_close": p.wide(df["prdy_close"])} if "prdy_close" in df.columns else None
+    cols = {name: p.long(w) for name, w in iter_compute(lambda c: p.wide(df[c]), names, given)}
+    return pd.concat([out.drop(columns=[c for c in names if c in out.columns]),
+                      pd.DataFrame({c: cols[c] for c in names})], axis=1)
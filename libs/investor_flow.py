@@ -0,0 +1,193 @@
+"""
+libs/investor_flow.py
+
+종목별 투자자 매매동향(일별) 조회 + 저장 + 집단 내부 비율.
+
+- 조회: investor-trade-by-stock-daily (FHPTJ04160001)
+  기준일(anchor)부터 과거로 응답 헤더 tr_cont 연속조회 → 받은 최소 영업일 이전으로 anchor 를 옮겨 반복
+- 수집 시점에 한 번만 타입 변환 → 고정 스키마(FLOW_SCHEMA)
+  date: date32 / symbol: dictionary / 거래량(주)·거래대금(백만원): int64 (결측은 null)
+- 저장: CandleStore(freq="flow") → data/raw/kis_daily/<SYM>/flow/*.parquet (일봉과 같은 append-only 파트)
+  → 종목별 마지막 저장일 이후만 요청 (flow_store().missing_range)
+- 비율: 개인/외국인/기관 3집단 내부 매수·매도 비중과 순매수 비율을 프레임 전체에 한 번에 계산
+  (분모가 0 이거나 결측이면 NaN)
+
+사용 예시
+    from libs.investor_flow import flow_ratios, flow_store, get_investor_flow
+
+    df = get_investor_flow("005930", "20250101", "20250923")
+    store = flow_store()
+    store.append("005930", df)
+    ratios = flow_ratios(store.read(start="20250101"))
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from libs.candle_store import DEFAULT_ROOT, CandleStore
+from libs.kis_client import KisClient, KisClientPool, get_client
+
+FLOW_PATH = "/uapi/domestic-stock/v1/quotations/investor-trade-by-stock-daily"
+FLOW_TR_ID = "FHPTJ04160001"
+FLOW_FREQ = "flow"        # CandleStore 하위 디렉터리 (일봉은 "1d")
+MAX_ANCHORS = 200         # 종목 1개 조회 시 anchor 이동 최대 횟수
+MAX_PAGES = 200           # anchor 1개당 연속조회 최대 횟수
+RETRIES = 3               # 호출 한도 초과 재시도 횟수
+
+GROUPS = ["prsn", "frgn", "orgn"]   # 개인 / 외국인 / 기관
+
+# 원문 → 컬럼 (필요 필드만)
+INV_DAILY_KEEP = {
+    "stck_bsop_date": "date",
+    "acml_vol": "total_volume",          # (전체) 거래량(주) - 참고용
+    "acml_tr_pbmn": "total_value_mn",    # (전체) 거래대금(백만원) - 참고용
+    "prsn_shnu_vol": "prsn_buy_vol",
+    "prsn_seln_vol": "prsn_sell_vol",
+    "prsn_shnu_tr_pbmn": "prsn_buy_val_mn",
+    "prsn_seln_tr_pbmn": "prsn_sell_val_mn",
+    "frgn_shnu_vol": "frgn_buy_vol",
+    "frgn_seln_vol": "frgn_sell_vol",
+    "frgn_shnu_tr_pbmn": "frgn_buy_val_mn",
+    "frgn_seln_tr_pbmn": "frgn_sell_val_mn",
+    "orgn_shnu_vol": "orgn_buy_vol",
+    "orgn_seln_vol": "orgn_sell_vol",
+    "orgn_shnu_tr_pbmn": "orgn_buy_val_mn",
+    "orgn_seln_tr_pbmn": "orgn_sell_val_mn",
+}
+FLOW_NUM = [c for c in INV_DAILY_KEEP.values() if c != "date"]
+
+# 투자자 일별 저장 스키마 (CandleStore(freq="flow"))
+FLOW_SCHEMA = pa.schema(
+    [("date", pa.date32()), ("symbol", pa.dictionary(pa.int32(), pa.string()))]
+    + [(c, pa.int64()) for c in FLOW_NUM]
+)
+
+RATIO_COLS = [
+    f"{g}_{side}_{kind}_ratio"
+    for g in GROUPS
+    for kind in ["val", "vol"]
+    for side in ["buy", "sell", "net"]
+]
+
+
+def flow_store(root: Path | str = DEFAULT_ROOT) -> CandleStore:
+    return CandleStore(root, freq=FLOW_FREQ, schema=FLOW_SCHEMA)
+
+
+def to_flow_frame(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """KIS 원문(문자열) → 타입 고정 프레임 (date datetime64, 수치 float64 — 결측 NaN, symbol category)."""
+    out = pd.DataFrame({"date": pd.to_datetime(df["date"], format="%Y%m%d", errors="coerce")})
+    for c in FLOW_NUM:
+        out[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else np.nan
+    out = out.dropna(subset=["date"])
+    out["symbol"] = pd.Categorical([symbol] * len(out))
+    return out
+
+
+def _fetch_anchor(client, symbol: str, anchor: str) -> list[dict]:
+    """anchor(YYYYMMDD) 기준 연속조회 전체 → output2 레코드."""
+    params = {
+        "fid_cond_mrkt_div_code": "J",
+        "fid_input_iscd": symbol,
+        "fid_input_date_1": anchor,
+        "fid_org_adj_prc": "",
+        "fid_etc_cls_code": "",
+    }
+    rows: list[dict] = []
+    tr_cont = ""
+    for _ in range(MAX_PAGES):
+        data, headers = client.get_with_headers(FLOW_PATH, FLOW_TR_ID, params, tr_cont=tr_cont,
+                                                rate_retries=RETRIES)
+        rows += [r for r in (data.get("output2") or []) if r and r.get("stck_bsop_date")]
+        if (headers.get("tr_cont") or "").strip() not in ("F", "M"):
+            break
+        tr_cont = "N"
+    return rows
+
+
+def get_investor_flow(
+    symbol: str,
+    start_date: str,
+    end_date: str,
+    env: str = "real",
+    client: Optional[KisClient | KisClientPool] = None,
+) -> pd.DataFrame:
+    """
+    KIS API: 종목별 투자자 매매동향 일별 (investor-trade-by-stock-daily)
+
+    Parameters
+    ----------
+    symbol : str
+        종목코드 (예: "005930")
+    start_date, end_date : str
+        조회 구간 (YYYYMMDD, 양 끝 포함)
+    client : KisClient | KisClientPool, optional
+        공용 HTTP 클라이언트 (기본: env 별 공유 풀 — 키별 토큰 버킷으로 속도 제한)
+
+    Returns
+    -------
+    pd.DataFrame
+        date, symbol + FLOW_NUM (date 정렬, 날짜 중복 없음). 데이터가 없으면 빈 프레임
+
+    Raises
+    ------
+    KisRateLimitError
+        재시도 후에도 초당 거래건수 초과(EGW00201) 응답인 경우
+    """
+    client = client or get_client(env)
+    symbol = str(symbol).zfill(6)
+    start = pd.Timestamp(start_date)
+    rows: list[dict] = []
+    anchor = end_date
+    for _ in range(MAX_ANCHORS):
+        batch = _fetch_anchor(client, symbol, anchor)
+        if not batch:
+            break
+        rows += batch
+        min_d = pd.Timestamp(min(r["stck_bsop_date"] for r in batch))
+        if min_d <= start:
+            break
+        anchor = (min_d - pd.Timedelta(days=1)).strftime("%Y%m%d")
+    if not rows:
+        return pd.DataFrame()
+
+    df = to_flow_frame(pd.DataFrame(rows).rename(columns=INV_DAILY_KEEP), symbol)
+    df = df[(df["date"] >= start) & (df["date"] <= pd.Timestamp(end_date))]
+    return df.drop_duplicates("date", keep="first").sort_values("date").reset_index(drop=True)
+
+
+def flow_ratios(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    3집단(개인/외국인/기관) 내부 비율 — 프레임 전체(여러 종목/날짜) 한 번에 계산:
+      buy_ratio  = 집단 매수 / 3집단 매수 합
+      sell_ratio = 집단 매도 / 3집단 매도 합
+      net_ratio  = (집단 매수 − 집단 매도) / (매수 합 + 매도 합)
+    대금(val)/거래량(vol) 각각. 날짜별 buy/sell 비율은 3집단 합이 1, net 은 [-1, 1].
+    반환: symbol, date + RATIO_COLS ((symbol, date) 정렬)
+    """
+    out = {"symbol": df["symbol"].to_numpy(), "date": df["date"].to_numpy()}
+
+    def _div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(b != 0, a / b, np.nan)
+
+    for kind, suffix in [("val", "val_mn"), ("vol", "vol")]:
+        buy = df[[f"{g}_buy_{suffix}" for g in GROUPS]].to_numpy(np.float64)
+        sell = df[[f"{g}_sell_{suffix}" for g in GROUPS]].to_numpy(np.float64)
+        # 합계는 결측 제외 (모두 결측이면 NaN)
+        buy_sum = np.where(np.isnan(buy).all(axis=1), np.nan, np.nansum(buy, axis=1))[:, None]
+        sell_sum = np.where(np.isnan(sell).all(axis=1), np.nan, np.nansum(sell, axis=1))[:, None]
+        b, s, n = _div(buy, buy_sum), _div(sell, sell_sum), _div(buy - sell, buy_sum + sell_sum)
+        for i, g in enumerate(GROUPS):
+            out[f"{g}_buy_{kind}_ratio"] = b[:, i]
+            out[f"{g}_sell_{kind}_ratio"] = s[:, i]
+            out[f"{g}_net_{kind}_ratio"] = n[:, i]
+
+    res = pd.DataFrame(out)[["symbol", "date"] + RATIO_COLS]
+    return res.sort_values(["symbol", "date"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,72 @@
+"""
+libs/io_util.py
+
+파일 기록/날짜 문자열 공용 유틸.
+
+- atomic_write(path, mode): 같은 디렉터리의 임시파일에 쓰고 flush + fsync 후 os.replace
+  → 중간에 죽어도 path 에는 이전 내용 또는 새 내용만 남음 (반쯤 쓴 파일 없음)
+  임시파일 이름에 pid/스레드 ID 를 붙여 여러 프로세스·스레드가 같은 파일을 써도 충돌하지 않음
+- ymd(d): 날짜(문자열/정수 20250923/Timestamp/date) → "YYYYMMDD"
+
+사용 예시
+    from libs.io_util import atomic_write, ymd
+
+    with atomic_write("data/meta/x.parquet") as f:
+        df.to_parquet(f, index=False)
+
+    ymd("2025-09-23")   # "20250923"
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+import numpy as np
+import pandas as pd
+
+
+def ymd(d) -> str:
+    """날짜 → "YYYYMMDD" (정수 20250923 도 허용)."""
+    return pd.Timestamp(str(d) if isinstance(d, (int, np.integer)) else d).strftime("%Y%m%d")
+
+
+def _fsync_dir(path: Path) -> None:
+    """os.replace 결과(디렉터리 엔트리)까지 디스크에 반영. 디렉터리를 열 수 없는 OS 는 건너뜀."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path: Path | str, mode: str = "wb", encoding: str | None = None) -> Iterator[IO]:
+    """
+    path 를 원자적으로 교체하는 쓰기용 파일 객체를 제공.
+    블록이 정상 종료되면 fsync 후 os.replace, 예외면 임시파일을 지우고 예외를 그대로 전달.
+    텍스트 모드("w")는 encoding 기본값 utf-8.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if "b" not in mode and encoding is None:
+        encoding = "utf-8"
+    try:
+        with open(tmp, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
@@ -5,9 +5,12 @@ kis_auth.py
 
 기능
 - get_access_token(env): 실시간 토큰 발급 (실전/모의)
-- get_or_load_access_token(env, force_refresh=False): .env에 저장된 토큰을 날짜 기준 재사용,
-  필요 시 새 토큰 발급 후 .env 갱신
-- is_token_fresh_today(env): 오늘 날짜의 토큰인지 확인
+- get_or_load_access_token(env, force_refresh=False): 토큰 캐시(libs.token_cache)에서 재사용,
+  만료(expires_in 기준) 임박 시 백그라운드에서 1회만 갱신
+  캐시 파일: .kis_tokens/<env>.json (여러 프로세스가 파일 락으로 공유)
+- has_valid_token(env): 만료되지 않은 캐시 토큰이 있는지 확인 (is_token_fresh_today 는 폐기 예정 별칭)
+- credential_ids(env): 사용 가능한 자격증명(appkey) 세트 목록 → ["real", "real_2", ...]
+  위 함수들의 env 인자에 자격증명 ID("real_2" 등)를 넘기면 해당 세트의 토큰을 사용
 
 환경 변수(.env)
 # == 한국 투자 증권 API 실전 키 ==
@@ -18,11 +21,11 @@ KIS_API_SECRET=...
 KIS_API_KEY_MOCK=...
 KIS_API_SECRET_MOCK=...
 
-# == 토큰(실전/모의)
-KIS_ACCESS_TOKEN=...
-KIS_ACCESS_TOKEN_DATE=YYYYMMDD
-KIS_ACCESS_TOKEN_MOCK=...
-KIS_ACCESS_TOKEN_MOCK_DATE=YYYYMMDD
+# == (선택) 추가 appkey 세트: 접미사 _2, _3, ... 연속 번호 ==
+KIS_API_KEY_2=...
+KIS_API_SECRET_2=...
+KIS_API_KEY_MOCK_2=...
+KIS_API_SECRET_MOCK_2=...
 
 사용 예시
     from packages.core.kis_auth import get_or_load_access_token
@@ -33,12 +36,14 @@ KIS_ACCESS_TOKEN_MOCK_DATE=YYYYMMDD
 from __future__ import annotations
 
 import os
-from datetime import datetime
+import threading
+import warnings
 from typing import Tuple
 
-import requests
 from dotenv import load_dotenv
 
+from libs.token_cache import TokenCache
+
 # .env 로드 (다른 모듈에서 이미 load_dotenv() 호출해도 무해)
 load_dotenv()
 
@@ -48,36 +53,50 @@ _ENV_TABLE = {
         "BASE_URL": "https://openapi.koreainvestment.com:9443",
         "APPKEY": "KIS_API_KEY",
         "APPSECRET": "KIS_API_SECRET",
-        "TOKEN": "KIS_ACCESS_TOKEN",
-        "TOKEN_DATE": "KIS_ACCESS_TOKEN_DATE",
     },
     "mock": {
         "BASE_URL": "https://openapivts.koreainvestment.com:29443",
         "APPKEY": "KIS_API_KEY_MOCK",
         "APPSECRET": "KIS_API_SECRET_MOCK",
-        "TOKEN": "KIS_ACCESS_TOKEN_MOCK",
-        "TOKEN_DATE": "KIS_ACCESS_TOKEN_MOCK_DATE",
     },
 }
 
 
-def _today_str() -> str:
-    return datetime.now().strftime("%Y%m%d")
+MAX_KEY_SETS = 16
+
+
+def _split_cred(cred: str) -> Tuple[str, int]:
+    """자격증명 ID → (env, 번호). "real" → ("real", 1), "real_2" → ("real", 2)"""
+    env, _, idx = cred.partition("_")
+    if env not in _ENV_TABLE or (idx and not idx.isdigit()):
+        raise ValueError(f"env must be 'real' or 'mock' (optionally '<env>_<n>'), got: {cred}")
+    return env, int(idx) if idx else 1
 
 
-def _get_env_keys(env: str) -> Tuple[str, str, str, str, str]:
-    if env not in _ENV_TABLE:
-        raise ValueError(f"env must be 'real' or 'mock', got: {env}")
+def _get_env_keys(env: str) -> Tuple[str, str, str]:
+    env, idx = _split_cred(env)
     cfg = _ENV_TABLE[env]
+    suffix = "" if idx == 1 else f"_{idx}"
     return (
         cfg["BASE_URL"],
-        cfg["APPKEY"],
-        cfg["APPSECRET"],
-        cfg["TOKEN"],
-        cfg["TOKEN_DATE"],
+        cfg["APPKEY"] + suffix,
+        cfg["APPSECRET"] + suffix,
     )
 
 
+def credential_ids(env: str = "real") -> list[str]:
+    """
+    env 의 appkey 세트 목록. 기본 세트 + 접미사 _2, _3, ... 가 연속으로 설정된 만큼.
+    """
+    ids = [env]
+    for i in range(2, MAX_KEY_SETS + 1):
+        _, appkey_key, appsecret_key = _get_env_keys(f"{env}_{i}")
+        if not (os.getenv(appkey_key) and os.getenv(appsecret_key)):
+            break
+        ids.append(f"{env}_{i}")
+    return ids
+
+
 def _require_env(name: str) -> str:
     val = os.getenv(name)
     if not val:
@@ -88,64 +107,55 @@ def _require_env(name: str) -> str:
     return val
 
 
-def _upsert_env(k: str, v: str) -> None:
-    """
-    .env 파일에서 키 k를 값 v로 upsert.
-    - 기존 라인 있으면 교체
-    - 없으면 마지막에 추가
-    - 따옴표 없이 순수값으로 저장 (KIS 토큰은 '='/공백 없음)
-    """
-    lines = []
-    if os.path.exists(".env"):
-        with open(".env", "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-    found = False
-    out = []
-    for line in lines:
-        if line.startswith(f"{k}="):
-            out.append(f"{k}={v}\n")
-            found = True
-        else:
-            out.append(line)
+_CACHES: dict[str, TokenCache] = {}
+_CACHES_LOCK = threading.Lock()
 
-    if not found:
-        out.append(f"{k}={v}\n")
 
-    with open(".env", "w", encoding="utf-8") as f:
-        f.writelines(out)
+def _token_cache(env: str) -> TokenCache:
+    with _CACHES_LOCK:
+        if env not in _CACHES:
+            _CACHES[env] = TokenCache(env, issue=lambda: _issue_token(env))
+        return _CACHES[env]
 
 
-def is_token_fresh_today(env: str = "real") -> bool:
+def has_valid_token(env: str = "real") -> bool:
     """
-    오늘 날짜 기준으로 .env에 저장된 토큰이 유효(같은 날짜)한지 확인.
+    만료되지 않은 캐시 토큰이 있는지 확인 (발급하지 않음).
+    발급일과 무관 — 토큰 캐시의 expires_at 기준.
     """
-    _, _, _, token_key, token_date_key = _get_env_keys(env)
-    token = os.getenv(token_key)
-    token_date = os.getenv(token_date_key)
-    return bool(token and token_date == _today_str())
+    _get_env_keys(env)
+    return _token_cache(env).peek() is not None
 
 
-def get_access_token(env: str = "real") -> str:
-    """
-    KIS OAuth 토큰 발급 (실전/모의).
-    항상 원격으로 새 토큰을 요청한다.
-    """
-    base_url, appkey_key, appsecret_key, _, _ = _get_env_keys(env)
+def is_token_fresh_today(env: str = "real") -> bool:
+    """폐기 예정: has_valid_token() 을 사용 (오늘 발급 여부가 아니라 유효한 캐시 토큰 존재 여부)."""
+    warnings.warn("is_token_fresh_today() is deprecated; use has_valid_token()",
+                  DeprecationWarning, stacklevel=2)
+    return has_valid_token(env)
+
+
+def _issue_token(env: str) -> dict:
+    """토큰 발급 요청 → KIS 응답 JSON (access_token, expires_in, ...)."""
+    from libs.kis_client import get_client
+
+    _, appkey_key, appsecret_key = _get_env_keys(env)
     appkey = _require_env(appkey_key)
     appsecret = _require_env(appsecret_key)
 
-    url = f"{base_url}/oauth2/tokenP"
-    headers = {"content-type": "application/json"}
     body = {
         "grant_type": "client_credentials",
         "appkey": appkey,
         "appsecret": appsecret,
     }
+    return get_client(_split_cred(env)[0]).post("/oauth2/tokenP", json=body, timeout=20)
+
 
-    res = requests.post(url, headers=headers, json=body, timeout=20)
-    res.raise_for_status()
-    data = res.json()
+def get_access_token(env: str = "real") -> str:
+    """
+    KIS OAuth 토큰 발급 (실전/모의).
+    항상 원격으로 새 토큰을 요청한다. (캐시를 거치지 않음)
+    """
+    data = _issue_token(env)
 
     # API 표준 응답에 'access_token' 키가 반드시 존재
     token = data.get("access_token")
@@ -158,29 +168,17 @@ def get_access_token(env: str = "real") -> str:
 
 def get_or_load_access_token(env: str = "real", force_refresh: bool = False) -> str:
     """
-    .env의 토큰을 오늘 날짜 기준으로 재사용.
-    - 오늘자면 그대로 반환
-    - 아니면 새로 발급 후 .env에 저장
+    캐시 토큰 재사용.
+    - 메모리 → 캐시 파일 순으로 조회, 만료 전이면 그대로 반환
+    - 만료 REFRESH_AHEAD 전부터는 백그라운드에서 갱신 (프로세스 전체에서 1회)
+    - 유효 토큰이 없으면 파일 락을 잡고 발급 (다른 워커가 먼저 발급했으면 그 토큰 사용)
 
-    force_refresh=True 이면 날짜와 무관하게 무조건 새 발급.
+    force_refresh=True 이면 만료와 무관하게 새 발급.
     """
-    base_url, appkey_key, appsecret_key, token_key, token_date_key = _get_env_keys(env)
+    _, appkey_key, appsecret_key = _get_env_keys(env)
 
     # 키 유효성 선검사
     _require_env(appkey_key)
     _require_env(appsecret_key)
 
-    if not force_refresh:
-        token = os.getenv(token_key)
-        token_date = os.getenv(token_date_key)
-        if token and token_date == _today_str():
-            # 재사용
-            print(f"✅ reuse {env} token:", token[:20], "...")
-            return token
-
-    # 새 발급
-    new_token = get_access_token(env=env)
-    _upsert_env(token_key, new_token)
-    _upsert_env(token_date_key, _today_str())
-    print(f"🔄 refreshed {env} token and saved to .env")
-    return new_token
+    return _token_cache(env).get(force_refresh=force_refresh)
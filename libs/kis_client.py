@@ -0,0 +1,352 @@
+"""
+libs/kis_client.py
+
+KIS REST 호출 공용 클라이언트.
+
+- requests.Session + HTTPAdapter 커넥션 풀(keep-alive) → 요청마다 TLS 핸드셰이크 반복 방지
+- 헤더 구성(authorization, appkey, appsecret, tr_id, custtype) 일원화
+- 연결 오류/5xx(502/503/504) 재시도(GET 만, 지터 백오프 + 시도마다 버킷 토큰 획득), 기본 timeout
+- TokenBucket 연동 + KIS 호출 한도 초과(EGW00201) 시 KisRateLimitError
+  (get/get_with_headers 의 rate_retries 로 한도 초과만 다시 시도 — 버킷이 속도를 낮춘 뒤
+   지터 백오프를 두고 재요청 → 여러 워커가 한꺼번에 재시도하지 않음)
+- KisClientPool: appkey 세트(kis_auth.credential_ids) 별 KisClient(토큰/버킷 각각)를 묶어
+  요청마다 여유가 가장 큰 키로 분산. 한도 초과로 느려진 키는 덜 받고,
+  오류가 난 키는 잠시 제외 → 키 N개면 처리량 약 N배
+
+사용 예시
+    from libs.kis_client import get_client
+
+    client = get_client("real")           # env 별 공유 풀 (키 1개면 멤버 1개)
+    data = client.get(
+        "/uapi/domestic-stock/v1/quotations/inquire-price",
+        tr_id="FHKST01010100",
+        params={"fid_cond_mrkt_div_code": "J", "fid_input_iscd": "005930"},
+        rate_retries=3,                   # 한도 초과 시 3회까지 재시도
+    )
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from libs.kis_auth import _get_env_keys, _require_env, _split_cred, credential_ids
+from libs.rate_limit import KisRateLimitError, TokenBucket, is_rate_limit_response
+
+POOL_SIZE = 32           # keep-alive 커넥션 수 (동시 요청 스레드 수 이상)
+TIMEOUT = 10             # 초
+RETRIES = 3              # 연결 오류/게이트웨이 오류 재시도
+RETRY_STATUS = (502, 503, 504)
+BACKOFF = 0.3            # 연결 오류/게이트웨이 오류 재시도 백오프 기준(초)
+RATE_BACKOFF = 0.5       # 호출 한도 초과 재시도 백오프 기준(초)
+BACKOFF_MAX = 8.0        # 백오프 상한(초)
+CUSTTYPE = "P"           # 개인
+RATE_PER_KEY = 18        # appkey 별 초당 요청 수 (실전 쿼터 20건/초보다 약간 낮게)
+MOCK_RATE_PER_KEY = 2    # 모의투자 쿼터
+ERROR_COOLDOWN_MAX = 60  # 오류 키 최대 제외 시간(초)
+
+
+def _sleep_backoff(base: float, attempt: int) -> None:
+    """지수 백오프 + 전체 지터: 0 ~ min(BACKOFF_MAX, base·2^attempt) 초 중 임의로 대기."""
+    time.sleep(random.uniform(0.0, min(BACKOFF_MAX, base * 2 ** attempt)))
+
+
+def _retry_rate_limited(call, rate_retries: int):
+    """
+    call() 을 호출 한도 초과(KisRateLimitError)일 때만 rate_retries 회까지 다시 시도 (마지막 시도의 예외는 그대로).
+    재시도 사이에 지터 백오프 → 같은 키를 쓰는 워커들이 cooldown 직후 동시에 몰리지 않음.
+    """
+    for attempt in range(rate_retries):
+        try:
+            return call()
+        except KisRateLimitError:
+            _sleep_backoff(RATE_BACKOFF, attempt)
+    return call()
+
+
+class KisClient:
+    """
+    env 하나(실전/모의)의 KIS 호출을 담당하는 클라이언트.
+
+    Parameters
+    ----------
+    env : str
+        "real" (실전) 또는 "mock" (모의). 자격증명 ID("real_2" 등)도 가능
+    limiter : TokenBucket, optional
+        요청마다 토큰을 획득할 버킷 (호출 시 limiter 인자로 덮어쓸 수 있음)
+    pool_size : int
+        커넥션 풀 크기
+    timeout : float
+        요청 timeout(초)
+    retries : int
+        연결 오류 및 502/503/504 재시도 횟수 (GET 만 재시도, 토큰 발급 POST 는 제외).
+        urllib3 Retry 대신 request() 에서 직접 재시도 → 재시도마다 limiter 토큰을 획득
+    """
+
+    def __init__(
+        self,
+        env: str = "real",
+        limiter: Optional[TokenBucket] = None,
+        pool_size: int = POOL_SIZE,
+        timeout: float = TIMEOUT,
+        retries: int = RETRIES,
+    ):
+        base_url, appkey_key, appsecret_key = _get_env_keys(env)
+        self.cred = env
+        self.env = _split_cred(env)[0]
+        self.base_url = base_url
+        self.appkey_key = appkey_key
+        self.appsecret_key = appsecret_key
+        self.limiter = limiter
+        self.timeout = timeout
+        self.retries = retries
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+
+    # ---- 헤더/토큰 ----
+    def access_token(self) -> str:
+        from libs.kis_auth import get_or_load_access_token
+
+        return get_or_load_access_token(env=self.cred)
+
+    def headers(self, tr_id: Optional[str] = None, access_token: Optional[str] = None, tr_cont: str = "") -> dict:
+        h = {
+            "content-type": "application/json; charset=utf-8",
+            "appkey": _require_env(self.appkey_key),
+            "appsecret": _require_env(self.appsecret_key),
+            "custtype": CUSTTYPE,
+        }
+        if tr_id is not None:
+            h["authorization"] = f"Bearer {access_token or self.access_token()}"
+            h["tr_id"] = tr_id
+        if tr_cont:
+            h["tr_cont"] = tr_cont
+        return h
+
+    def _url(self, path: str) -> str:
+        return path if path.startswith("http") else f"{self.base_url}{path}"
+
+    # ---- 요청 ----
+    def request(
+        self,
+        method: str,
+        path: str,
+        headers: dict,
+        params: Optional[dict] = None,
+        json: Optional[dict] = None,
+        limiter: Optional[TokenBucket] = None,
+        timeout: Optional[float] = None,
+    ) -> tuple[dict, requests.structures.CaseInsensitiveDict]:
+        """
+        공통 요청 → (응답 JSON, 응답 헤더).
+        GET 은 연결 오류/502·503·504 를 retries 회까지 지터 백오프로 재시도 (시도마다 limiter.acquire()).
+        호출 한도 초과 응답이면 limiter.throttle() 후 KisRateLimitError.
+        """
+        limiter = limiter or self.limiter
+        retries = self.retries if method.upper() == "GET" else 0
+        for attempt in range(retries + 1):
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                res = self.session.request(method, self._url(path), headers=headers, params=params,
+                                           json=json, timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+                _sleep_backoff(BACKOFF, attempt)
+                continue
+            if res.status_code in RETRY_STATUS and attempt < retries:
+                _sleep_backoff(BACKOFF, attempt)
+                continue
+            break
+        try:
+            data = res.json()
+        except ValueError:
+            data = {}
+        if is_rate_limit_response(data):
+            if limiter is not None:
+                limiter.throttle()
+            raise KisRateLimitError(f"{path}: {data.get('msg1', 'rate limited')}")
+        res.raise_for_status()
+        if limiter is not None:
+            limiter.reward()
+        return data, res.headers
+
+    def get(
+        self,
+        path: str,
+        tr_id: str,
+        params: dict,
+        access_token: Optional[str] = None,
+        limiter: Optional[TokenBucket] = None,
+        tr_cont: str = "",
+        rate_retries: int = 0,
+    ) -> dict:
+        data, _ = self.get_with_headers(path, tr_id, params, access_token=access_token,
+                                        limiter=limiter, tr_cont=tr_cont, rate_retries=rate_retries)
+        return data
+
+    def get_with_headers(
+        self,
+        path: str,
+        tr_id: str,
+        params: dict,
+        access_token: Optional[str] = None,
+        limiter: Optional[TokenBucket] = None,
+        tr_cont: str = "",
+        rate_retries: int = 0,
+    ) -> tuple[dict, requests.structures.CaseInsensitiveDict]:
+        """GET + 응답 헤더 (tr_cont 연속조회용). 호출 한도 초과는 rate_retries 회까지 재시도."""
+        def _once():
+            headers = self.headers(tr_id, access_token=access_token, tr_cont=tr_cont)
+            return self.request("GET", path, headers, params=params, limiter=limiter)
+
+        return _retry_rate_limited(_once, rate_retries)
+
+    def post(self, path: str, json: dict, tr_id: Optional[str] = None, timeout: Optional[float] = None) -> dict:
+        """POST. tr_id 가 없으면 인증 헤더 없이 호출 (토큰 발급 등)."""
+        headers = self.headers(tr_id) if tr_id else {"content-type": "application/json; charset=utf-8"}
+        data, _ = self.request("POST", path, headers, json=json, timeout=timeout)
+        return data
+
+
+class KisClientPool:
+    """
+    appkey 세트별 KisClient 묶음. KisClient 와 같은 get/get_with_headers/post 인터페이스.
+
+    - 요청마다 (진행 중 요청 수 + 1) / 현재 버킷 속도 가 가장 작은 키를 선택
+      → 한도 초과로 throttle 된 키는 자연히 덜 받음
+    - 연결 오류/HTTP 오류가 난 키는 2^연속실패 초(최대 ERROR_COOLDOWN_MAX) 동안 제외
+    - 호출자가 넘긴 access_token 은 기본 키에만 사용 (다른 키는 각자의 토큰 캐시 사용)
+    """
+
+    def __init__(self, env: str = "real", rate_per_key: Optional[float] = None):
+        if rate_per_key is None:
+            rate_per_key = RATE_PER_KEY if env == "real" else MOCK_RATE_PER_KEY
+        self.env = env
+        self.members = [
+            KisClient(env=cred, limiter=TokenBucket(rate=rate_per_key))
+            for cred in credential_ids(env)
+        ]
+        self.base_url = self.members[0].base_url
+        self._inflight = [0] * len(self.members)
+        self._fails = [0] * len(self.members)
+        self._down_until = [0.0] * len(self.members)
+        self._ok = [0] * len(self.members)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    @property
+    def limiter(self) -> TokenBucket:
+        return self.members[0].limiter
+
+    def access_token(self) -> str:
+        return self.members[0].access_token()
+
+    def _pick(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            up = [i for i in range(len(self.members)) if self._down_until[i] <= now]
+            if not up:
+                up = [min(range(len(self.members)), key=lambda i: self._down_until[i])]
+            i = min(up, key=lambda i: (self._inflight[i] + 1) / self.members[i].limiter.rate)
+            self._inflight[i] += 1
+            return i
+
+    def _release(self, i: int, ok: Optional[bool]) -> None:
+        with self._lock:
+            self._inflight[i] -= 1
+            if ok:
+                self._ok[i] += 1
+                self._fails[i] = 0
+            elif ok is False:
+                self._fails[i] += 1
+                self._down_until[i] = time.monotonic() + min(ERROR_COOLDOWN_MAX, 2 ** self._fails[i])
+
+    def get_with_headers(
+        self,
+        path: str,
+        tr_id: str,
+        params: dict,
+        access_token: Optional[str] = None,
+        limiter: Optional[TokenBucket] = None,
+        tr_cont: str = "",
+        rate_retries: int = 0,
+    ) -> tuple[dict, requests.structures.CaseInsensitiveDict]:
+        """GET + 응답 헤더. 호출 한도 초과는 rate_retries 회까지 재시도 (시도마다 여유가 가장 큰 키를 다시 선택)."""
+        return _retry_rate_limited(
+            lambda: self._get_once(path, tr_id, params, access_token, limiter, tr_cont), rate_retries
+        )
+
+    def _get_once(
+        self,
+        path: str,
+        tr_id: str,
+        params: dict,
+        access_token: Optional[str],
+        limiter: Optional[TokenBucket],
+        tr_cont: str,
+    ) -> tuple[dict, requests.structures.CaseInsensitiveDict]:
+        """키 하나를 골라 1회 요청 (오류 키는 잠시 제외)."""
+        i = self._pick()
+        ok = None
+        try:
+            out = self.members[i].get_with_headers(
+                path, tr_id, params,
+                access_token=access_token if i == 0 else None,
+                limiter=limiter, tr_cont=tr_cont,
+            )
+            ok = True
+            return out
+        except KisRateLimitError:
+            raise                      # 해당 키 버킷이 이미 속도를 낮춤
+        except (requests.RequestException, RuntimeError):
+            ok = False
+            raise
+        finally:
+            self._release(i, ok)
+
+    def get(
+        self,
+        path: str,
+        tr_id: str,
+        params: dict,
+        access_token: Optional[str] = None,
+        limiter: Optional[TokenBucket] = None,
+        tr_cont: str = "",
+        rate_retries: int = 0,
+    ) -> dict:
+        data, _ = self.get_with_headers(path, tr_id, params, access_token=access_token,
+                                        limiter=limiter, tr_cont=tr_cont, rate_retries=rate_retries)
+        return data
+
+    def post(self, path: str, json: dict, tr_id: Optional[str] = None, timeout: Optional[float] = None) -> dict:
+        return self.members[0].post(path, json, tr_id=tr_id, timeout=timeout)
+
+    def __repr__(self) -> str:
+        parts = [
+            f"{m.cred}:{m.limiter.rate:.1f}/s ok={self._ok[i]}" + (" down" if self._down_until[i] > time.monotonic() else "")
+            for i, m in enumerate(self.members)
+        ]
+        return f"KisClientPool({', '.join(parts)})"
+
+
+_CLIENTS: dict[str, KisClientPool] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(env: str = "real") -> KisClientPool:
+    """env 별 공유 KisClientPool (프로세스당 appkey 세트별 커넥션 풀/버킷 1개씩)."""
+    with _CLIENTS_LOCK:
+        if env not in _CLIENTS:
+            _CLIENTS[env] = KisClientPool(env=env)
+        return _CLIENTS[env]
@@ -0,0 +1,69 @@
+"""
+libs/panel.py
+
+long(symbol, date) 프레임 ↔ wide(봉 순번 × 종목) 배열 변환.
+
+- 종목별로 날짜순 정렬한 뒤 각 종목의 k번째 봉을 행 k에 배치 (종목마다 길이가 달라 뒤쪽은 NaN 패딩)
+- groupby("symbol") 후 Series 에 rolling/ewm/shift 를 거는 것과 동일한 결과를
+  wide DataFrame 한 번의 연산으로 모든 종목에 대해 계산 (행 기준 shift 의미 그대로 유지)
+- 날짜 축을 맞춘 격자(date × symbol)가 아니므로 결측 거래일이 있어도 종목별 연산과 정확히 일치
+
+사용 예시
+    from libs.panel import Panel
+
+    p = Panel(df)                          # df: symbol, date 포함 long 프레임
+    close = p.wide(df["close"])            # (n_pos × n_sym) DataFrame
+    ret = p.long(close.pct_change(1))      # p.index 순서의 1차원 배열
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+class Panel:
+    """
+    Attributes
+    ----------
+    index : pd.Index
+        (symbol, date) 정렬 순서의 원본 행 인덱스 — long() 결과가 이 순서를 따름
+    symbols : pd.Index
+        정렬된 종목 목록 (wide 컬럼 순서)
+    pos, code : np.ndarray
+        정렬 순서 기준 각 행의 봉 순번 / 종목 번호
+    """
+
+    def __init__(self, df: pd.DataFrame, symbol_col: str = "symbol", date_col: str = "date"):
+        code, symbols = pd.factorize(df[symbol_col], sort=True)
+        order = np.lexsort((df[date_col].to_numpy(), code))
+        code = code[order]
+
+        counts = np.bincount(code, minlength=len(symbols))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.pos = np.arange(len(code)) - starts[code]
+        self.code = code
+        self.order = order
+        self.index = df.index[order]
+        self.symbols = pd.Index(symbols)
+        self.counts = counts
+        self.n_pos = int(counts.max()) if len(counts) else 0
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def wide(self, values, dtype=np.float64) -> pd.DataFrame:
+        """원본 행 순서의 값 → (봉 순번 × 종목) wide DataFrame (NaN 패딩)."""
+        v = np.asarray(values, dtype=dtype)[self.order]
+        arr = np.full((self.n_pos, len(self.symbols)), np.nan, dtype=dtype)
+        arr[self.pos, self.code] = v
+        return pd.DataFrame(arr, columns=self.symbols)
+
+    def long(self, wide) -> np.ndarray:
+        """wide 결과 → 정렬 순서(self.index)의 1차원 배열."""
+        arr = wide.to_numpy() if isinstance(wide, pd.DataFrame) else np.asarray(wide)
+        return arr[self.pos, self.code]
+
+    def frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """원본 프레임을 (symbol, date) 정렬 순서로 재배열 (long() 결과와 행이 일치)."""
+        return df.iloc[self.order]
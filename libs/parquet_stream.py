@@ -0,0 +1,29 @@
+"""
+libs/parquet_stream.py
+
+DataFrame → 고정 스키마 Arrow 테이블 변환 (CandleStore 기록용).
+
+- 스키마에 없는 컬럼은 버리고(EVENT_COLS 등), 프레임에 없는 컬럼은 null 로 채움
+- 컬럼마다 스키마 타입으로 cast → 파트 파일마다 같은 스키마 보장
+
+사용 예시
+    from libs.parquet_stream import to_table
+
+    pq.write_table(to_table(df, CANDLE_SCHEMA), path)
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import pyarrow as pa
+
+
+def to_table(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    """DataFrame → 고정 스키마 Arrow 테이블 (스키마에 없는 컬럼은 버리고, 없는 컬럼은 null)."""
+    cols = {}
+    for field in schema:
+        if field.name in df.columns:
+            cols[field.name] = pa.array(df[field.name], from_pandas=True).cast(field.type)
+        else:
+            cols[field.name] = pa.nulls(len(df), type=field.type)
+    return pa.table(cols, schema=schema)
@@ -0,0 +1,161 @@
+"""
+libs/quotes.py
+
+현재가 스냅샷 일괄 조회.
+
+- 멀티종목 시세(intstock-multprice, FHKST11300006): 요청 1회에 최대 MULTI_MAX(30) 종목
+  → 50 종목 스냅샷은 요청 2회 (종목별 inquire-price 50회 대신)
+- 멀티 조회를 쓸 수 없으면(모의투자 env / 응답 오류 / 응답에서 빠진 종목)
+  해당 종목만 단건 시세(inquire-price, FHKST01010100)를 스레드로 동시 조회
+- 배치/단건 모두 client(KisClientPool)의 키별 토큰 버킷으로 속도 제한, 한도 초과 응답은 재시도
+- 결과: QUOTE_KEEP 컬럼의 타입 고정 프레임 (symbol 6자리 문자열, 숫자 컬럼 float64, 종목당 1행)
+  멀티 응답에 없는 필드(업종, 시가총액)는 NaN → 필요하면 full=True 로 단건 조회
+
+사용 예시
+    from libs.quotes import get_quotes
+
+    qdf = get_quotes(["005930", "000660", ...])          # 30 종목당 요청 1회
+    qdf = get_quotes(symbols, full=True)                # 업종/시가총액까지 (종목당 요청 1회)
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from libs.kis_client import KisClient, KisClientPool, get_client
+
+MULTI_PATH = "/uapi/domestic-stock/v1/quotations/intstock-multprice"
+MULTI_TR_ID = "FHKST11300006"     # 실전 전용 (모의투자 미지원)
+MULTI_MAX = 30                    # 멀티 조회 1회당 최대 종목 수
+QUOTE_PATH = "/uapi/domestic-stock/v1/quotations/inquire-price"
+QUOTE_TR_ID = "FHKST01010100"
+MAX_WORKERS = 8                   # 동시 요청 스레드 수 (배치/단건 공통)
+RETRIES = 3                       # 호출 한도 초과 재시도 횟수
+
+# 단건 시세(inquire-price) 원문 → 컬럼
+QUOTE_KEEP = {
+    "stck_shrn_iscd": "symbol",
+    "rprs_mrkt_kor_name": "market",
+    "bstp_kor_isnm": "industry",
+    "stck_prpr": "price_now",
+    "acml_vol": "volume_now",
+    "acml_tr_pbmn": "value_now",
+    "stck_mxpr": "upper_limit",
+    "stck_llam": "lower_limit",
+    "hts_avls": "market_cap",
+    "prdy_vrss": "change",
+    "prdy_ctrt": "change_rate",
+}
+
+# 멀티종목 시세 원문 → 같은 컬럼 (업종/시가총액 필드는 없음)
+MULTI_KEEP = {
+    "inter_shrn_iscd": "symbol",
+    "kospi_kosdaq_cls_name": "market",
+    "inter2_prpr": "price_now",
+    "acml_vol": "volume_now",
+    "acml_tr_pbmn": "value_now",
+    "inter2_mxpr": "upper_limit",
+    "inter2_llam": "lower_limit",
+    "inter2_prdy_vrss": "change",
+    "prdy_ctrt": "change_rate",
+}
+
+QUOTE_COLS = list(QUOTE_KEEP.values())
+QUOTE_NUMERIC = ["price_now", "volume_now", "value_now", "upper_limit", "lower_limit",
+                 "market_cap", "change", "change_rate"]
+
+
+def _fetch_multi(client, symbols: list[str]) -> list[dict]:
+    """멀티종목 시세 1회 (≤ MULTI_MAX 종목) → QUOTE_KEEP 컬럼 레코드. 응답 오류면 빈 목록."""
+    params = {}
+    for i, s in enumerate(symbols, 1):
+        params[f"FID_COND_MRKT_DIV_CODE_{i}"] = "J"
+        params[f"FID_INPUT_ISCD_{i}"] = s
+    data = client.get(MULTI_PATH, MULTI_TR_ID, params, rate_retries=RETRIES)
+    if str(data.get("rt_cd", "0")) != "0":
+        return []
+    rows = data.get("output") or []
+    return [{dst: r.get(src) for src, dst in MULTI_KEEP.items()} for r in rows if r and r.get("inter_shrn_iscd")]
+
+
+def _fetch_single(client, symbol: str) -> dict:
+    data = client.get(QUOTE_PATH, QUOTE_TR_ID, {"fid_cond_mrkt_div_code": "J", "fid_input_iscd": symbol},
+                      rate_retries=RETRIES)
+    out = data.get("output") or {}
+    rec = {dst: out.get(src) for src, dst in QUOTE_KEEP.items()}
+    rec["symbol"] = rec["symbol"] or symbol
+    return rec
+
+
+def to_quote_frame(records: list[dict]) -> pd.DataFrame:
+    """원문 레코드 → QUOTE_COLS 타입 고정 프레임 (콤마 제거 후 숫자 변환, 종목당 마지막 값)."""
+    df = pd.DataFrame.from_records(records, columns=QUOTE_COLS)
+    df["symbol"] = df["symbol"].astype(str).str.strip().str.zfill(6)
+    for c in ["market", "industry"]:
+        df[c] = df[c].astype("string")
+    for c in QUOTE_NUMERIC:
+        df[c] = pd.to_numeric(df[c].astype("string").str.replace(",", "", regex=False),
+                              errors="coerce").astype("float64")
+    return df.drop_duplicates("symbol", keep="last").reset_index(drop=True)
+
+
+def get_quotes(
+    symbols: Iterable[str],
+    env: str = "real",
+    client: Optional[KisClient | KisClientPool] = None,
+    full: bool = False,
+    max_workers: int = MAX_WORKERS,
+) -> pd.DataFrame:
+    """
+    현재가 스냅샷 (입력 순서, 종목당 1행).
+
+    Parameters
+    ----------
+    symbols : Iterable[str]
+        종목코드 (6자리로 맞춤, 중복 제거)
+    env : str
+        "real" 이면 멀티종목 조회, "mock" 이면 단건 조회만 사용
+    client : KisClient | KisClientPool, optional
+        공용 HTTP 클라이언트 (기본: env 별 공유 풀)
+    full : bool
+        True 면 멀티 조회 대신 단건 조회 (업종/시가총액 포함)
+    max_workers : int
+        동시 요청 스레드 수
+
+    Returns
+    -------
+    pd.DataFrame
+        QUOTE_COLS. 조회에 실패한 종목은 빠짐 (오류는 경고 출력)
+    """
+    client = client or get_client(env)
+    symbols = list(dict.fromkeys(str(s).zfill(6) for s in symbols))
+    if not symbols:
+        return to_quote_frame([])
+
+    records: list[dict] = []
+    todo = symbols
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        if env == "real" and not full:
+            batches = [symbols[i:i + MULTI_MAX] for i in range(0, len(symbols), MULTI_MAX)]
+            futures = [ex.submit(_fetch_multi, client, b) for b in batches]
+            for b, fut in zip(batches, futures):
+                try:
+                    records += fut.result()
+                except Exception as e:
+                    print(f"⚠️ 멀티 시세 실패 ({b[0]} 외 {len(b) - 1}) → 단건 조회:", e)
+            got = {str(r["symbol"]).strip().zfill(6) for r in records}
+            todo = [s for s in symbols if s not in got]
+
+        futures = {s: ex.submit(_fetch_single, client, s) for s in todo}
+        for s, fut in futures.items():
+            try:
+                records.append(fut.result())
+            except Exception as e:
+                print(f"⚠️ {s} 시세 실패:", e)
+
+    df = to_quote_frame(records)
+    order = pd.Series(range(len(symbols)), index=symbols)
+    return df.sort_values("symbol", key=lambda s: s.map(order)).reset_index(drop=True)
@@ -0,0 +1,131 @@
+"""
+libs/rate_limit.py
+
+KIS API 호출량 제어용 토큰 버킷.
+
+- TokenBucket(rate, capacity): 초당 rate개 토큰, 최대 capacity개까지 누적(버스트)
+- acquire(): 토큰 1개를 얻을 때까지 대기 (스레드 안전 → asyncio.to_thread 워커에서 공유 가능)
+- throttle(): KIS "초당 거래건수 초과" 응답 시 호출 → 속도를 즉시 낮추고 잠시 정지
+- reward(): 정상 응답 시 호출 → 목표 속도까지 천천히 회복 (AIMD)
+
+사용 예시
+    from libs.rate_limit import TokenBucket
+
+    limiter = TokenBucket(rate=18, capacity=18)
+    limiter.acquire()
+    ... 요청 ...
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+# KIS 초당 거래건수 초과 응답 코드
+RATE_LIMIT_MSG_CODES = {"EGW00201"}
+
+
+class KisRateLimitError(RuntimeError):
+    """KIS가 초당 호출 한도 초과(EGW00201)를 응답했을 때 발생."""
+
+
+def is_rate_limit_response(data: dict) -> bool:
+    """KIS 응답 JSON이 호출 한도 초과 에러인지 판별."""
+    if not isinstance(data, dict):
+        return False
+    if data.get("msg_cd") in RATE_LIMIT_MSG_CODES:
+        return True
+    return "초당 거래건수" in str(data.get("msg1", ""))
+
+
+class TokenBucket:
+    """
+    스레드 안전 토큰 버킷 + 적응형 속도 조절.
+
+    Parameters
+    ----------
+    rate : float
+        목표 초당 요청 수 (계정 쿼터보다 약간 낮게 설정 권장)
+    capacity : float, optional
+        최대 누적 토큰 수. 기본값은 rate (1초치 버스트)
+    min_rate : float
+        throttle() 로 내려갈 수 있는 최저 속도
+    backoff : float
+        throttle() 1회당 속도 감소 배율
+    recover_step : float
+        reward() 누적 recover_every 회마다 회복하는 초당 요청 수
+    recover_every : int
+        회복 주기(정상 응답 수)
+    cooldown : float
+        throttle() 직후 모든 요청을 멈추는 시간(초)
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        min_rate: float = 1.0,
+        backoff: float = 0.7,
+        recover_step: float = 0.5,
+        recover_every: int = 50,
+        cooldown: float = 1.0,
+    ):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got: {rate}")
+        self.target_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.min_rate = float(min(min_rate, rate))
+        self.backoff = backoff
+        self.recover_step = recover_step
+        self.recover_every = recover_every
+        self.cooldown = cooldown
+
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._ok_count = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """토큰을 얻을 때까지 블로킹 대기."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return
+                    wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self) -> None:
+        """한도 초과 응답 → 속도 감소 + cooldown 동안 정지 + 누적 토큰 폐기."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            self._tokens = 0.0
+            self._ok_count = 0
+            self._last = time.monotonic()
+            self._paused_until = self._last + self.cooldown
+
+    def reward(self) -> None:
+        """정상 응답 → recover_every 회마다 목표 속도 쪽으로 조금씩 회복."""
+        with self._lock:
+            if self.rate >= self.target_rate:
+                return
+            self._ok_count += 1
+            if self._ok_count >= self.recover_every:
+                self._ok_count = 0
+                self.rate = min(self.target_rate, self.rate + self.recover_step)
+
+    def __repr__(self) -> str:
+        return f"TokenBucket(rate={self.rate:.2f}/{self.target_rate:.2f}, capacity={self.capacity:.0f})"
@@ -0,0 +1,292 @@
+"""
+libs/risk.py
+
+EWMA 공분산 리스크 모델 + 상한(cap) 있는 최소분산 / 리스크 패리티 비중.
+
+- 공분산: 일수익률(평균 0 가정)의 EWMA 2차 모멘트 Σ λ^k r rᵀ 를 종목쌍별 관측 가중치 합으로 나눔
+  (거래정지/상장 전 결측은 해당 쌍에서만 빠짐)
+  → 새 날짜 T 개는 λ^T × 기존 + (가중 수익률)ᵀ 수익률 행렬곱 한 번으로 갱신 (전체 이력 재계산 없음)
+- 축소(shrinkage): 상관행렬을 단위행렬 쪽으로 SHRINK 만큼 당김, 이력이 짧은 종목은 분산 중앙값 + 상관 0
+- 상태(모멘트 행렬, 종목 목록, 마지막 종가/날짜)는 data/proc/risk/ 에 캐시 → 매일 새 날짜만 반영
+  캐시의 마지막 종가가 저장소의 같은 날 종가와 다른 종목(수정주가 재수집으로 이력이 바뀜)은
+  모멘트를 비우고 마지막 종가를 저장소 값으로 교체 → 분할이 −50% 수익률로 들어가지 않음
+- 최소분산: 상한 있는 단체(0 ≤ w ≤ cap, Σw = 1) 위 가속 투영 경사법 (투영은 정렬된 분기점으로 정확히 계산)
+- 리스크 패리티: 볼록 정식화(½wᵀΣw − Σ log w / n)를 뉴턴법으로 풀어 합 1 로 정규화 (상한은 호출 쪽에서 적용)
+
+사용 예시
+    from libs.risk import update_risk_model, min_variance
+
+    model = update_risk_model(FeatureStore())       # 캐시 로드 → 새 날짜만 갱신 → 저장
+    S = model.cov(["005930", "000660", "035420"])
+    w = min_variance(S, cap=0.05)
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from libs.io_util import atomic_write
+
+RISK_DIR = Path("data/proc/risk")
+CACHE_PATH = RISK_DIR / "ewma_cov.npz"
+HALFLIFE = 60          # EWMA 반감기 (거래일)
+SHRINK = 0.20          # 상관행렬 축소 강도 (0: 표본 그대로, 1: 상관 0)
+LOOKBACK = 504         # 캐시가 없을 때 초기 구축에 쓰는 최근 거래일 수
+MIN_OBS = 20           # 이보다 관측이 적은 종목은 분산 중앙값 + 상관 0 으로 대체
+
+
+class EwmaCovariance:
+    def __init__(self, halflife: float = HALFLIFE, symbols: Iterable[str] = ()):
+        self.halflife = float(halflife)
+        self.decay = 0.5 ** (1.0 / self.halflife)
+        self.symbols: list[str] = []
+        self._pos: dict[str, int] = {}
+        self.xx = np.zeros((0, 0))        # Σ λ^k r_i r_j
+        self.nn = np.zeros((0, 0))        # Σ λ^k m_i m_j  (m: 관측 여부)
+        self.n_obs = np.zeros(0, dtype=np.int64)
+        self.last_close = np.zeros(0)
+        self.last_date: Optional[pd.Timestamp] = None
+        self._extend(symbols)
+
+    def _extend(self, symbols: Iterable[str]) -> None:
+        add = [s for s in dict.fromkeys(map(str, symbols)) if s not in self._pos]
+        if not add:
+            return
+        n0, n1 = len(self.symbols), len(self.symbols) + len(add)
+        for name in ("xx", "nn"):
+            m = np.zeros((n1, n1))
+            m[:n0, :n0] = getattr(self, name)
+            setattr(self, name, m)
+        self.n_obs = np.r_[self.n_obs, np.zeros(len(add), dtype=np.int64)]
+        self.last_close = np.r_[self.last_close, np.full(len(add), np.nan)]
+        self.symbols += add
+        self._pos.update({s: n0 + i for i, s in enumerate(add)})
+
+    # ---- 갱신 ----
+    def update(self, returns: pd.DataFrame) -> "EwmaCovariance":
+        """(date × symbol) 일수익률 중 last_date 이후 행만 반영."""
+        if self.last_date is not None:
+            returns = returns[returns.index > self.last_date]
+        if returns.empty:
+            return self
+        self._extend(returns.columns)
+        R = returns.reindex(columns=self.symbols).to_numpy(np.float64)
+        M = ~np.isnan(R)
+        X = np.where(M, R, 0.0)
+        Mf = M.astype(np.float64)
+
+        T = len(R)
+        w = self.decay ** np.arange(T - 1, -1, -1)[:, None]
+        carry = self.decay ** T
+        self.xx = carry * self.xx + (X * w).T @ X
+        self.nn = carry * self.nn + (Mf * w).T @ Mf
+        self.n_obs += M.sum(axis=0)
+        self.last_date = pd.Timestamp(returns.index[-1])
+        return self
+
+    def update_prices(self, prices: pd.DataFrame) -> "EwmaCovariance":
+        """
+        prices: date, symbol, close (last_date 이후 날짜) → 직전 종가에 이어 일수익률 계산 후 update.
+        거래정지/결측일은 직전 종가 유지 (libs.backtest.daily_returns 와 같은 규칙).
+        """
+        close = prices.pivot(index="date", columns="symbol", values="close").sort_index().astype(np.float64)
+        if self.last_date is not None:
+            close = close[close.index > self.last_date]
+        if close.empty:
+            return self
+        close.columns = close.columns.astype(str)
+        self._extend(close.columns)
+        close = close.reindex(columns=self.symbols)
+
+        prev = pd.DataFrame([self.last_close], columns=self.symbols,
+                            index=[self.last_date if self.last_date is not None else close.index[0] - pd.Timedelta(days=1)])
+        full = pd.concat([prev, close]).ffill()
+        self.update(full.pct_change(fill_method=None).iloc[1:])
+        self.last_close = full.iloc[-1].to_numpy(np.float64)
+        return self
+
+    def reset(self, last_close: pd.Series) -> "EwmaCovariance":
+        """
+        last_close(symbol → 종가) 종목의 모멘트(분산·공분산·관측 수)를 비우고 마지막 종가를 교체.
+        수정주가로 과거 종가가 바뀐 종목용 — 이후 새 날짜부터 다시 누적.
+        """
+        idx = np.array([self._pos[s] for s in last_close.index if s in self._pos], dtype=np.int64)
+        if not len(idx):
+            return self
+        for m in (self.xx, self.nn):
+            m[idx, :] = 0.0
+            m[:, idx] = 0.0
+        self.n_obs[idx] = 0
+        self.last_close[idx] = last_close[[s for s in last_close.index if s in self._pos]].to_numpy(np.float64)
+        return self
+
+    # ---- 조회 ----
+    def cov(self, symbols: Iterable[str], shrink: float = SHRINK) -> np.ndarray:
+        """symbols 순서의 (n × n) 축소 공분산 (일간)."""
+        idx = np.array([self._pos.get(str(s), -1) for s in symbols], dtype=np.int64)
+        known = idx >= 0
+        n = len(idx)
+        S = np.zeros((n, n))
+        nn = np.zeros((n, n))
+        k = idx[known]
+        S[np.ix_(known, known)] = self.xx[np.ix_(k, k)]
+        nn[np.ix_(known, known)] = self.nn[np.ix_(k, k)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            S = np.where(nn > 0, S / nn, 0.0)
+
+        var = np.diag(S).copy()
+        obs = np.zeros(n, dtype=np.int64)
+        obs[known] = self.n_obs[k]
+        ok = (obs >= MIN_OBS) & (var > 0)
+        fill = float(np.median(var[ok])) if ok.any() else 1e-4
+        var = np.where(ok, var, fill)
+
+        sd = np.sqrt(var)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = np.clip(S / np.outer(sd, sd), -1.0, 1.0)
+        corr[~ok, :] = 0.0
+        corr[:, ~ok] = 0.0
+        corr *= 1.0 - shrink
+        np.fill_diagonal(corr, 1.0)
+        return corr * np.outer(sd, sd)
+
+    # ---- 캐시 ----
+    def save(self, path: Path | str = CACHE_PATH) -> None:
+        with atomic_write(path) as fh:
+            np.savez(
+                fh,
+                halflife=self.halflife,
+                symbols=np.array(self.symbols, dtype=str),
+                xx=self.xx, nn=self.nn, n_obs=self.n_obs, last_close=self.last_close,
+                last_date=np.array("" if self.last_date is None else self.last_date.strftime("%Y%m%d")),
+            )
+
+    @classmethod
+    def load(cls, path: Path | str = CACHE_PATH) -> "EwmaCovariance":
+        with np.load(path) as z:
+            model = cls(float(z["halflife"]))
+            model.symbols = [str(s) for s in z["symbols"]]
+            model._pos = {s: i for i, s in enumerate(model.symbols)}
+            model.xx, model.nn = z["xx"], z["nn"]
+            model.n_obs, model.last_close = z["n_obs"], z["last_close"]
+            d = str(z["last_date"])
+            model.last_date = pd.Timestamp(d) if d else None
+        return model
+
+
+def _changed_closes(model: EwmaCovariance, store) -> pd.Series:
+    """캐시의 last_close 와 저장소의 last_date 종가가 다른 종목 → 저장소 종가 (둘 다 있는 종목만 비교)."""
+    now = store.read(date=model.last_date, columns=["symbol", "close"])
+    if now.empty:
+        return pd.Series(dtype="float64")
+    now = now.set_index(now["symbol"].astype(str))["close"].astype(np.float64)
+    cached = pd.Series(model.last_close, index=model.symbols).reindex(now.index)
+    known = cached.notna() & now.notna()
+    return now[known & ~np.isclose(cached, now, rtol=1e-12, atol=0.0)]
+
+
+def update_risk_model(
+    store,
+    path: Path | str = CACHE_PATH,
+    halflife: float = HALFLIFE,
+    lookback: int = LOOKBACK,
+    end=None,
+) -> EwmaCovariance:
+    """
+    캐시된 모델을 불러와 피처 저장소의 새 날짜 종가만 반영 후 저장.
+    캐시가 없거나(반감기가 다르거나) end 보다 앞서 있으면 최근 lookback 거래일로 새로 구축
+    (end 이전 기준으로 새로 만든 모델은 캐시에 덮어쓰지 않음).
+    캐시를 이어 쓸 때 마지막 종가가 저장소와 다른 종목은 모멘트를 비우고 저장소 종가에서 다시 시작.
+    """
+    dates = pd.DatetimeIndex(store.dates())
+    if end is not None:
+        dates = dates[dates <= pd.Timestamp(str(end))]
+
+    model, save = None, True
+    if Path(path).exists():
+        model = EwmaCovariance.load(path)
+        if model.halflife != float(halflife):
+            model = None
+        elif model.last_date is not None and len(dates) and model.last_date > dates[-1]:
+            model, save = None, False
+
+    reset = pd.Series(dtype="float64")
+    if model is None or model.last_date is None:
+        model = EwmaCovariance(halflife)
+        new = dates[-(lookback + 1):]
+    else:
+        new = dates[dates > model.last_date]
+        reset = _changed_closes(model, store)
+        if len(reset):
+            print(f"🔁 리스크 모델: 종가가 바뀐 종목 {len(reset)}개 모멘트 초기화 "
+                  f"({', '.join(reset.index[:10])}{' 외' if len(reset) > 10 else ''})")
+            model.reset(reset)
+    if len(new):
+        model.update_prices(store.read(dates=new, columns=["date", "symbol", "close"]))
+    if save and (len(new) or len(reset)):
+        model.save(path)
+    return model
+
+
+# ---- 비중 최적화 ----
+def project_capped_simplex(v: np.ndarray, cap: float, total: float = 1.0) -> np.ndarray:
+    """v 를 {0 ≤ w ≤ cap, Σw = total} 위로 유클리드 투영. n × cap ≤ total 이면 (상한 완화) 동일가중 total/n."""
+    v = np.asarray(v, dtype=np.float64)
+    n = len(v)
+    if n * float(cap) <= total:
+        # 상한을 다 채워야 합이 total → 가능한 해는 동일가중 하나뿐
+        return np.full(n, total / n)
+    # w(τ) = clip(v − τ, 0, cap) 의 합은 τ 에 대해 감소하는 구간별 선형 → 분기점에서 값 계산 후 보간
+    bp = np.sort(np.r_[v, v - cap])
+    s = np.clip(v[None, :] - bp[:, None], 0.0, cap).sum(axis=1)
+    hit = np.flatnonzero(s >= total)
+    k = hit[-1] if len(hit) else 0   # n·cap 이 total 을 반올림 오차만큼만 넘으면 s 가 total 에 못 미칠 수 있음
+    if k + 1 < len(bp) and s[k] > s[k + 1]:
+        tau = bp[k] + (s[k] - total) / (s[k] - s[k + 1]) * (bp[k + 1] - bp[k])
+    else:
+        tau = bp[k]
+    return np.clip(v - tau, 0.0, cap)
+
+
+def min_variance(S: np.ndarray, cap: float = 1.0, max_iter: int = 2000, tol: float = 1e-10) -> np.ndarray:
+    """min wᵀSw  s.t. 0 ≤ w ≤ cap, Σw = 1  (가속 투영 경사법, 동일가중에서 시작)."""
+    n = len(S)
+    if n == 0:
+        return np.zeros(0)
+    step = 1.0 / max(float(np.linalg.eigvalsh(S)[-1]), 1e-18)
+    w = project_capped_simplex(np.full(n, 1.0 / n), cap)
+    y, t = w, 1.0
+    for _ in range(max_iter):
+        w_new = project_capped_simplex(y - step * (S @ y), cap)
+        if np.abs(w_new - w).sum() < tol:
+            w = w_new
+            break
+        t_new = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        y = w_new + (t - 1.0) / t_new * (w_new - w)
+        w, t = w_new, t_new
+    return w
+
+
+def risk_parity(S: np.ndarray, max_iter: int = 100, tol: float = 1e-12) -> np.ndarray:
+    """위험기여도 균등 비중 (합 1, 상한 없음): min ½xᵀSx − Σ log x / n 의 해를 정규화."""
+    n = len(S)
+    if n == 0:
+        return np.zeros(0)
+    b = np.full(n, 1.0 / n)
+    x = 1.0 / np.sqrt(np.diag(S))
+    x *= np.sqrt(1.0 / float(x @ S @ x))
+    for _ in range(max_iter):
+        g = S @ x - b / x
+        H = S + np.diag(b / (x * x))
+        dx = np.linalg.solve(H, g)
+        a = 1.0
+        while np.any(x - a * dx <= 0):
+            a *= 0.5
+        x = x - a * dx
+        if np.abs(dx).max() * a < tol * np.abs(x).max():
+            break
+    return x / x.sum()
@@ -0,0 +1,106 @@
+"""
+libs/run_manifest.py
+
+장시간 수집 작업의 진행 상황 기록(체크포인트).
+
+- 완료 종목(done)과 실패 종목(failed: 오류/시도 횟수)을 JSON 매니페스트로 보관
+- FLUSH_EVERY 건마다 libs.io_util.atomic_write(임시파일 + fsync + os.replace)로 원자적으로 기록
+  → 프로세스가 죽어도 마지막 flush 시점까지의 진행은 보존
+- 같은 날 재실행 시 pending()이 실패 종목을 먼저, 이어서 미완료 종목을 반환
+
+사용 예시
+    from libs.run_manifest import RunManifest
+
+    m = RunManifest.for_run("collect_daily", "20250923")
+    for sym in m.pending(symbols):
+        ...
+        m.mark_done(sym)          # 또는 m.mark_failed(sym, e)
+    m.flush()
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+from libs.io_util import atomic_write
+
+DEFAULT_DIR = Path("data/raw/kis_daily/_runs")
+FLUSH_EVERY = 50
+
+
+class RunManifest:
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.done: set[str] = set()
+        self.failed: dict[str, dict] = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def for_run(cls, name: str, run_date: str, root: Path | str = DEFAULT_DIR) -> "RunManifest":
+        return cls(Path(root) / f"{name}_{run_date}.json")
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        self.done = set(d.get("done", []))
+        self.failed = dict(d.get("failed", {}))
+
+    # ---- 상태 ----
+    def pending(self, symbols: Iterable[str]) -> list[str]:
+        """실패 종목(재시도 큐) 먼저, 그다음 아직 처리하지 않은 종목 순."""
+        symbols = list(symbols)
+        with self._lock:
+            retry = [s for s in symbols if s in self.failed]
+            rest = [s for s in symbols if s not in self.done and s not in self.failed]
+        return retry + rest
+
+    def retry_queue(self) -> list[str]:
+        with self._lock:
+            return sorted(self.failed)
+
+    def mark_done(self, symbol: str) -> None:
+        with self._lock:
+            self.done.add(symbol)
+            self.failed.pop(symbol, None)
+            self._dirty += 1
+            flush = self._dirty >= FLUSH_EVERY
+        if flush:
+            self.flush()
+
+    def mark_failed(self, symbol: str, error: BaseException | str) -> None:
+        with self._lock:
+            prev = self.failed.get(symbol, {})
+            self.failed[symbol] = {
+                "error": str(error)[:300],
+                "attempts": int(prev.get("attempts", 0)) + 1,
+                "at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._dirty += 1
+            flush = self._dirty >= FLUSH_EVERY
+        if flush:
+            self.flush()
+
+    # ---- 기록 ----
+    def flush(self) -> None:
+        with self._lock:
+            payload = {
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+                "n_done": len(self.done),
+                "n_failed": len(self.failed),
+                "done": sorted(self.done),
+                "failed": self.failed,
+            }
+            self._dirty = 0
+            with atomic_write(self.path, "w") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1)
+
+    def __repr__(self) -> str:
+        return f"RunManifest({self.path}, done={len(self.done)}, failed={len(self.failed)})"
@@ -0,0 +1,137 @@
+"""
+libs/scoring.py
+
+섹터 중립 멀티팩터 스코어 (여러 날짜를 한 번에).
+
+- 섹터키: sector → industry → market → symbol (날짜별로 선택, 단면 1개 기준 규칙과 동일)
+- z-score: (date, 섹터키) 그룹별 합/제곱합을 np.bincount 한 번으로 모든 팩터에 대해 계산
+  (팩터마다 groupby.transform(파이썬 함수)을 돌리지 않음)
+- 그룹 표준편차가 0/계산 불가면 0, 결측 팩터도 0 으로 처리 후 가중합 → score
+
+사용 예시
+    from libs.scoring import compute_scores
+
+    scored = compute_scores(panel)   # panel: date, symbol, 팩터 컬럼 (여러 날짜 가능)
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# 사용할 팩터 컬럼
+FACTOR_COLS = {
+    "momentum": "ret_60d",          # 또는 "momentum"
+    "volatility": "volatility_20d",
+    "liquidity": "value_traded",
+    "size": "log_mcap",
+    "turnover": "turnover",
+    "value_per": "per",
+    "value_pbr": "pbr",
+}
+
+# 스코어 키 → (팩터 종류, 부호)
+SCORE_TERMS = {
+    "mom":     ("momentum",   1),
+    "lvol":    ("volatility", -1),
+    "liq":     ("liquidity",  1),
+    "size":    ("size",       1),
+    "val_per": ("value_per",  -1),
+    "val_pbr": ("value_pbr",  -1),
+}
+
+# 스코어 가중치 (존재하는 팩터끼리 합이 1 이 되도록 재정규화)
+SCORE_WEIGHTS = {"mom": 0.30, "lvol": 0.25, "liq": 0.20, "size": 0.15, "val_per": 0.05, "val_pbr": 0.05}
+
+
+def build_sector_key(df: pd.DataFrame, by: Optional[str] = "date") -> pd.Series:
+    """
+    섹터 결측 보정: sector -> industry -> market -> symbol.
+    컬럼 선택은 by(날짜) 단위 — 해당 날짜에 전부 결측인 컬럼은 건너뜀. by=None 이면 df 전체가 한 단면.
+    """
+    n = len(df)
+    groups = df[by] if by is not None and by in df.columns else np.zeros(n)
+    key = pd.Series(np.nan, index=df.index, dtype=object)
+    undecided = np.ones(n, dtype=bool)
+    for col in ("sector", "industry"):
+        if col not in df.columns:
+            continue
+        ok = df[col].notna().groupby(groups).transform("any").to_numpy()
+        take = undecided & ok
+        key[take] = df.loc[take, col].astype(object)
+        undecided &= ~ok
+    if "market" in df.columns:
+        key[undecided] = df.loc[undecided, "market"].astype(object)
+
+    sym = df["symbol"].astype(str)
+    blank = key.isna() | (key.astype(str).str.strip() == "")
+    key[blank] = sym[blank]
+    return key.astype(str)
+
+
+def grouped_zscore(values: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    values(n × k)의 각 열을 codes 그룹별로 z-score (모집단 표준편차).
+    결측은 0, 표준편차가 0 인 그룹(값이 모두 같거나 1개)은 0.
+    k 개 열을 (열 × 그룹) 평탄 인덱스로 묶어 bincount 한 번에 계산.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[:, None]
+    n, k = x.shape
+    valid = ~np.isnan(x)
+    idx = (codes[:, None] + n_groups * np.arange(k)[None, :]).ravel()
+    size = n_groups * k
+
+    # 그룹 첫 유효값 기준으로 이동 → 값이 모두 같은 그룹은 정확히 0, 큰 값의 상쇄 오차도 줄어듦
+    ref = np.zeros(size)
+    vi = np.flatnonzero(valid.ravel())[::-1]
+    ref[idx[vi]] = x.ravel()[vi]
+    d = np.where(valid, x - ref[idx].reshape(n, k), 0.0)
+
+    cnt = np.bincount(idx, weights=valid.ravel(), minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = np.bincount(idx, weights=d.ravel(), minlength=size) / cnt
+        c = np.where(valid, d - mu[idx].reshape(n, k), 0.0)
+        sigma = np.sqrt(np.bincount(idx, weights=(c * c).ravel(), minlength=size) / cnt)
+        sg = sigma[idx].reshape(n, k)
+        z = np.where(valid & np.isfinite(sg) & (sg > 0), c / sg, 0.0)
+    return z
+
+
+def compute_scores(
+    df: pd.DataFrame,
+    factor_cols: dict = FACTOR_COLS,
+    weights: dict = SCORE_WEIGHTS,
+    by: Optional[str] = "date",
+) -> pd.DataFrame:
+    """
+    섹터 중립 z-score 가중합 → score, sector_key 컬럼 추가 (by 단위 단면별로 독립 계산).
+    df 는 유니버스 필터를 거친 단면(들).
+    """
+    need = [factor_cols[k] for k in ["momentum", "volatility", "liquidity", "size"]
+            if factor_cols.get(k) in df.columns]
+    if len(need) < 3:
+        raise ValueError(f"필요 팩터 부족. 존재: {[c for c in factor_cols.values() if c in df.columns]}")
+
+    sector_key = build_sector_key(df, by=by)
+    if by is not None and by in df.columns:
+        codes, uniq = pd.MultiIndex.from_arrays([df[by], sector_key]).factorize()
+    else:
+        codes, uniq = pd.factorize(sector_key)
+
+    use = [k for k, (kind, _) in SCORE_TERMS.items()
+           if weights.get(k) and factor_cols.get(kind) in df.columns]
+    x = np.column_stack([pd.to_numeric(df[factor_cols[SCORE_TERMS[k][0]]], errors="coerce").to_numpy(np.float64)
+                         for k in use])
+    z = grouped_zscore(x, codes, len(uniq))
+
+    w = np.array([SCORE_TERMS[k][1] * weights[k] for k in use])
+    w_sum = sum(weights[k] for k in use)
+
+    out = df.copy()
+    out["score"] = z @ (w / w_sum)
+    out["sector_key"] = sector_key.to_numpy()
+    return out
@@ -0,0 +1,261 @@
+"""
+libs/selection.py
+
+유니버스 필터 → 섹터별 Top K → Top N(섹터 캡, 회전율 제한) → 가중치 (여러 날짜를 한 번에).
+가중치는 역변동성 계열 또는 공분산 기반(최소분산 / 리스크 패리티, libs.risk).
+
+- 모든 단계를 날짜(by) 그룹 연산으로 처리 → 최신 1일 선정과 백테스트(리밸런스일 전체)가 같은 코드 사용
+- 각 단계의 규칙은 단면 1개 기준 run_score_quant 의 기존 로직과 동일
+
+사용 예시
+    from libs.selection import build_portfolios
+
+    port = build_portfolios(panel, top_n=50, sector_top_k=5)   # 단계별: universe_mask / select_top_n / assign_weights
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from libs.risk import EwmaCovariance, min_variance, risk_parity
+from libs.scoring import FACTOR_COLS, SCORE_WEIGHTS, compute_scores
+
+RISK_METHODS = ("min_var", "risk_parity")
+
+
+def _num(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s, errors="coerce")
+
+
+def universe_mask(
+    df: pd.DataFrame,
+    top_n: int,
+    liquidity_cutoff: float = 0.20,
+    exclude_konex: bool = True,
+    use_index: bool = True,
+    by: str = "date",
+) -> np.ndarray:
+    """
+    날짜별 유니버스 (bool 배열).
+    1순위: is_kospi200 or is_kosdaq150 (편입 종목이 top_n 이상일 때만)
+    2순위: 시총 상위 50% (남은 종목이 top_n 초과일 때)
+    + 유동성 하위 liquidity_cutoff 제거 (남은 종목이 top_n 초과일 때)
+    + KONEX 제외
+    """
+    d = df[by].to_numpy()
+    base = pd.Series(True, index=df.index)
+
+    idx_cols = [c for c in ("is_kospi200", "is_kosdaq150") if c in df.columns]
+    if use_index and idx_cols:
+        member = pd.Series(False, index=df.index)
+        for c in idx_cols:
+            member |= df[c].fillna(False).astype(bool)
+        n_member = member.groupby(d).transform("sum")
+        base = member | (n_member < top_n)
+
+    for col, q in (("market_cap", 0.50), ("value_traded", liquidity_cutoff)):
+        if col not in df.columns:
+            continue
+        x = _num(df[col])
+        n_base = base.groupby(d).transform("sum")
+        cut = x.where(base).groupby(d).transform("quantile", q)
+        base &= (n_base <= top_n) | (x >= cut)
+
+    if exclude_konex and "market" in df.columns:
+        base &= df["market"] != "KONEX"
+    return base.to_numpy()
+
+
+def _select(s: pd.DataFrame, top_n: int, sector_cap, by: str, held=None, max_new=None) -> pd.DataFrame:
+    """
+    우선순위 정렬 + cumcount 로 선정 (s 에는 _pick 컬럼).
+    우선순위: _tier(0: 회전율 한도 안, 1: 부족분 보충용) → 섹터 선별(_pick) → score → symbol
+    """
+    s = s.sort_values([by, "_pick", "score", "symbol"], ascending=[True, False, False, True])
+    if held:
+        # 신규 편입은 우선순위 상위 max_new 개까지만 1순위, 나머지 신규는 보유 종목 다음 순위(부족분 보충용)
+        # 섹터 캡이 있으면 기존 종목이 남긴 섹터 자리에 들어가는 신규만 한도에 셈
+        new = ~s["symbol"].isin(held)
+        fits = pd.Series(True, index=s.index)
+        if sector_cap:
+            g = [s[by], s["sector_key"]]
+            n_held = (~new).astype(int).groupby(g).transform("sum")
+            fits = ~new | (new.astype(int).groupby(g).cumsum() <= sector_cap - n_held)
+        n_new = (new & fits).astype(int).groupby(s[by]).cumsum()
+        s = s.assign(_tier=(new & ~(fits & (n_new <= max_new))).astype(int), _new=new)
+    else:
+        s = s.assign(_tier=0, _new=False)
+    order = [by, "_tier", "_pick", "score", "symbol"]
+    asc = [True, True, False, False, True]
+
+    if sector_cap:
+        # 섹터 캡 자리는 기존 종목이 먼저 차지 (신규가 기존을 밀어내 보충 신규가 늘어나지 않게)
+        s = s.sort_values(order[:2] + ["_new"] + order[2:], ascending=asc[:2] + [True] + asc[2:])
+        s = s[s.groupby([by, "sector_key"], sort=False).cumcount() < sector_cap]
+    s = s.sort_values(order, ascending=asc)
+    s = s[s.groupby(by, sort=False).cumcount() < top_n]
+
+    port = s.drop(columns=["_pick", "_tier", "_new"]).sort_values([by, "score", "symbol"], ascending=[True, False, True])
+    port["rank"] = port.groupby(by, sort=False).cumcount() + 1
+    return port
+
+
+def select_top_n(
+    scored: pd.DataFrame,
+    top_n: int,
+    sector_top_k: int,
+    sector_cap: int | None = None,
+    max_turnover: float | None = None,
+    prev=None,
+    by: str = "date",
+) -> pd.DataFrame:
+    """
+    날짜별로 섹터(sector_key)마다 score 상위 sector_top_k 선별 → 전체 score 순 Top N.
+    - 섹터 선별이 top_n 에 못 미치면 선별 밖 종목에서 score 순으로 보충
+    - sector_cap: 최종 포트폴리오의 섹터당 최대 종목 수 (보충분 포함, 초과분은 다음 순위로 대체)
+    - max_turnover: 직전 선정 대비 신규 편입 비율 상한 (top_n 기준 종목 수).
+      한도를 넘는 신규 종목 대신 아직 후보에 남아 있는 기존 종목을 유지하고,
+      그래도 top_n 에 못 미치면 나머지 신규 종목으로 보충.
+      직전 선정은 prev(종목 목록) → 이후 날짜는 바로 앞 날짜 결과 (날짜 순으로 진행)
+    rank 컬럼(1..N) 추가. 동점(섹터 정보가 없어 단독 그룹이 된 종목은 score 가 0 으로 같음)은 symbol 순.
+    """
+    s = scored.sort_values([by, "sector_key", "score", "symbol"], ascending=[True, True, False, True])
+    s = s.assign(_pick=s.groupby([by, "sector_key"], sort=False).cumcount() < sector_top_k)
+
+    if max_turnover is None:
+        return _select(s, top_n, sector_cap, by)
+
+    # 회전율 제한은 앞 날짜 결과에 의존 → 날짜 순으로 진행 (날짜 안은 벡터 연산)
+    max_new = int(np.floor(max_turnover * top_n))
+    held = set(prev) if prev is not None else set()
+    out = []
+    for _, g in s.groupby(by, sort=True):
+        port = _select(g, top_n, sector_cap, by, held=held, max_new=max_new)
+        held = set(port["symbol"])
+        out.append(port)
+    return pd.concat(out) if out else _select(s, top_n, sector_cap, by)
+
+
+def _cap_weights(w: pd.Series, cap: float, g) -> pd.Series:
+    """
+    날짜별 합 1 비중에 상한 적용: 넘는 종목은 cap 으로 고정, 초과분은 나머지 종목에 비례 재분배 (넘는 종목이 없을 때까지).
+    종목 수 × cap < 1 이면 cap 을 지킬 수 없으므로 1/종목 수 (동일가중) 를 상한으로 사용.
+    """
+    w = w.astype(np.float64)
+    cap = np.maximum(cap, 1.0 / w.groupby(g).transform("size"))
+    fixed = pd.Series(False, index=w.index)
+    while True:
+        over = (w > cap * (1 + 1e-12)) & ~fixed
+        if not over.any():
+            return w
+        fixed |= over
+        rest = 1.0 - cap.where(fixed, 0.0).groupby(g).transform("sum")
+        free = w.where(~fixed, 0.0).groupby(g).transform("sum")
+        w = cap.where(fixed, w * rest / free)
+
+
+def _risk_weights(
+    port: pd.DataFrame,
+    method: str,
+    max_weight_cap: float,
+    by: str,
+    returns: pd.DataFrame | None,
+    risk_model: EwmaCovariance | None,
+) -> np.ndarray:
+    """
+    날짜별 공분산 → 최소분산(상한 포함) / 리스크 패리티 비중.
+    risk_model: 이미 기준일까지 갱신된 모델 (최신 1일 선정) / returns: 날짜 순으로 모델을 갱신하며 계산 (백테스트)
+    """
+    if returns is not None:
+        # 한 번이라도 선정된 종목만 (전 종목 공분산 불필요)
+        returns = returns.loc[:, returns.columns.isin(set(port["symbol"].astype(str)))]
+    if risk_model is None:
+        if returns is None:
+            raise ValueError(f"weighting_method={method!r} 에는 returns 또는 risk_model 이 필요")
+        risk_model = EwmaCovariance()
+
+    w = np.zeros(len(port))
+    pos = np.arange(len(port))
+    for d, idx in port.groupby(by, sort=True).indices.items():
+        if returns is not None:
+            risk_model.update(returns.loc[:d])
+        S = risk_model.cov(port["symbol"].to_numpy()[idx])
+        w[pos[idx]] = min_variance(S, max_weight_cap or 1.0) if method == "min_var" else risk_parity(S)
+    return w
+
+
+def assign_weights(
+    port: pd.DataFrame,
+    method: str = "inv_vol_liq",
+    max_weight_cap: float = 0.05,
+    by: str = "date",
+    returns: pd.DataFrame | None = None,
+    risk_model: EwmaCovariance | None = None,
+) -> pd.DataFrame:
+    """
+    날짜별 가중치: "equal" | "inv_vol" | "inv_vol_liq" (역변동성 × (1 + 유동성 0~1 스케일))
+                  | "min_var" | "risk_parity" (EWMA 축소 공분산, libs.risk).
+    상한 max_weight_cap: 넘는 종목을 고정하고 나머지에 재분배 (반복) — 재정규화 후에도 상한을 넘지 않음.
+    min_var 는 상한을 최적화 제약으로 직접 풂.
+    """
+    out = port.copy()
+    g = out[by].to_numpy()
+    vol_col = "volatility_60d" if "volatility_60d" in out.columns else "volatility_20d"
+
+    if method in RISK_METHODS:
+        w = pd.Series(_risk_weights(out, method, max_weight_cap, by, returns, risk_model), index=out.index)
+    elif method not in ("inv_vol", "inv_vol_liq") or vol_col not in out.columns:
+        out["weight"] = 1.0 / out.groupby(g)[by].transform("size")
+        return out
+    else:
+        inv = 1.0 / _num(out[vol_col]).replace(0, np.nan)
+        inv = inv.fillna(inv.groupby(g).transform("median"))
+        raw = inv
+
+        if method == "inv_vol_liq":
+            scale = pd.Series(0.0, index=out.index)
+            if "value_traded" in out.columns:
+                liq = _num(out["value_traded"])
+                gl = liq.groupby(g)
+                sd = gl.transform("std", ddof=0)
+                z = (liq - gl.transform("mean")) / sd
+                z = z - z.groupby(g).transform("min")
+                zmax = z.groupby(g).transform("max")
+                z = z.where(~(zmax > 0), z / zmax)
+                scale = z.where(np.isfinite(sd) & (sd > 0), 0.0)
+            raw = inv * (1 + scale)
+
+        w = raw / raw.groupby(g).transform("sum")
+    if max_weight_cap:
+        w = _cap_weights(w, max_weight_cap, g)
+    out["weight"] = w.to_numpy()
+    return out
+
+
+def build_portfolios(
+    df: pd.DataFrame,
+    top_n: int = 50,
+    sector_top_k: int = 5,
+    liquidity_cutoff: float = 0.20,
+    exclude_konex: bool = True,
+    use_index: bool = True,
+    factor_cols: dict = FACTOR_COLS,
+    score_weights: dict = SCORE_WEIGHTS,
+    weighting_method: str = "inv_vol_liq",
+    max_weight_cap: float = 0.05,
+    sector_cap: int | None = None,
+    max_turnover: float | None = None,
+    prev=None,
+    by: str = "date",
+    returns: pd.DataFrame | None = None,
+    risk_model: EwmaCovariance | None = None,
+) -> pd.DataFrame:
+    """
+    유니버스 → 스코어 → 섹터별 Top-K → Top-N(섹터 캡/회전율 제한) → 가중치 (날짜별).
+    weighting_method 가 min_var / risk_parity 면 returns(일수익률 행렬) 또는 risk_model 필요.
+    """
+    base = df[universe_mask(df, top_n, liquidity_cutoff, exclude_konex, use_index, by=by)]
+    scored = compute_scores(base, {**FACTOR_COLS, **factor_cols}, score_weights, by=by)
+    port = select_top_n(scored, top_n, sector_top_k, sector_cap, max_turnover, prev, by=by)
+    return assign_weights(port, weighting_method, max_weight_cap, by=by, returns=returns, risk_model=risk_model)
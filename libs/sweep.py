@@ -0,0 +1,203 @@
+"""
+libs/sweep.py
+
+스코어링/선정 파라미터 스윕 (프로세스 풀 병렬).
+
+- 탐색 공간: {파라미터: 후보 목록} → grid() 전체 조합 / random_search() 무작위 n개
+  (후보가 (lo, hi) 튜플이면 구간에서 균등 샘플)
+- 피처 패널과 일수익률 행렬을 컬럼별 .npy 로 한 번 기록 → 워커는 np.load(mmap_mode="r") 로 공유
+  (워커마다 parquet 을 다시 읽거나 패널을 피클로 전달받지 않음, OS 페이지 캐시 1벌)
+- 워커 1개가 설정 1개를 평가: libs.selection.build_portfolios → libs.backtest.run_backtest
+  (min_var / risk_parity 비중의 공분산도 같은 수익률 행렬에서 계산)
+- 결과: 설정별 파라미터(평탄화) + 성과 지표 테이블
+
+사용 예시
+    from libs.sweep import grid, run_sweep
+
+    configs = grid({"top_n": [30, 50], "weighting_method": ["equal", "inv_vol"]})
+    table = run_sweep(panel, returns, configs, base=strategy_params(), n_workers=8, cost_bps=15)
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from libs.backtest import run_backtest
+from libs.selection import build_portfolios
+
+SWEEP_DIR = Path("data/proc/sweep")
+PROGRESS_EVERY = 20
+
+
+# ---- 탐색 공간 ----
+def grid(space: dict) -> list[dict]:
+    keys = list(space)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space: dict, n: int, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        cfg = {}
+        for k, v in space.items():
+            if isinstance(v, tuple) and len(v) == 2:
+                lo, hi = v
+                cfg[k] = int(rng.integers(lo, hi + 1)) if isinstance(lo, int) and isinstance(hi, int) \
+                    else float(rng.uniform(lo, hi))
+            else:
+                cfg[k] = v[int(rng.integers(len(v)))]
+        out.append(cfg)
+    return out
+
+
+def _flatten(params: dict) -> dict:
+    flat = {}
+    for k, v in params.items():
+        if isinstance(v, dict):
+            flat.update({f"{k}.{kk}": vv for kk, vv in v.items()})
+        else:
+            flat[k] = v
+    return flat
+
+
+# ---- 공유 패널 (.npy + 메모리 맵) ----
+def dump_frame(df: pd.DataFrame, path: Path | str) -> None:
+    """DataFrame → 컬럼별 .npy + meta.json (문자열은 정렬된 코드/카테고리, 불리언 결측 허용은 float)."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    meta = {"columns": []}
+    for i, c in enumerate(df.columns):
+        s = df[c]
+        f = path / f"c{i}.npy"
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            np.save(f, s.to_numpy("datetime64[ns]").view("i8"))
+            meta["columns"].append({"name": c, "kind": "datetime"})
+        elif pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.infer_dtype(s, skipna=True) == "boolean":
+            np.save(f, s.astype("float64").to_numpy())
+            meta["columns"].append({"name": c, "kind": "numeric"})
+        elif pd.api.types.is_numeric_dtype(s.dtype):
+            np.save(f, s.to_numpy())
+            meta["columns"].append({"name": c, "kind": "numeric"})
+        else:
+            codes, cats = pd.factorize(s.astype(object), sort=True)
+            np.save(f, codes.astype(np.int32))
+            meta["columns"].append({"name": c, "kind": "category", "categories": [str(x) for x in cats]})
+    with open(path / "meta.json", "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, ensure_ascii=False)
+
+
+def load_frame(path: Path | str, mmap: bool = True) -> pd.DataFrame:
+    path = Path(path)
+    with open(path / "meta.json", "r", encoding="utf-8") as fh:
+        meta = json.load(fh)
+    mode = "r" if mmap else None
+    cols = {}
+    for i, m in enumerate(meta["columns"]):
+        arr = np.load(path / f"c{i}.npy", mmap_mode=mode)
+        if m["kind"] == "datetime":
+            cols[m["name"]] = np.asarray(arr).view("datetime64[ns]")
+        elif m["kind"] == "category":
+            cols[m["name"]] = pd.Categorical.from_codes(arr, categories=m["categories"])
+        else:
+            cols[m["name"]] = arr
+    return pd.DataFrame(cols, copy=False)
+
+
+def dump_matrix(df: pd.DataFrame, path: Path | str) -> None:
+    """(date × symbol) 행렬 → values.npy + 인덱스/컬럼."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / "values.npy", np.ascontiguousarray(df.to_numpy(np.float64)))
+    np.save(path / "index.npy", df.index.to_numpy("datetime64[ns]").view("i8"))
+    with open(path / "meta.json", "w", encoding="utf-8") as fh:
+        json.dump({"columns": [str(c) for c in df.columns]}, fh)
+
+
+def load_matrix(path: Path | str, mmap: bool = True) -> pd.DataFrame:
+    path = Path(path)
+    with open(path / "meta.json", "r", encoding="utf-8") as fh:
+        meta = json.load(fh)
+    values = np.load(path / "values.npy", mmap_mode="r" if mmap else None)
+    index = pd.DatetimeIndex(np.load(path / "index.npy").view("datetime64[ns]"), name="date")
+    return pd.DataFrame(values, index=index, columns=pd.Index(meta["columns"], name="symbol"), copy=False)
+
+
+# ---- 워커 ----
+_PANEL: Optional[pd.DataFrame] = None
+_RETURNS: Optional[pd.DataFrame] = None
+_BASE: dict = {}
+_COST_BPS = 0.0
+
+
+def _init(panel_dir: str, returns_dir: str, base: dict, cost_bps: float) -> None:
+    global _PANEL, _RETURNS, _BASE, _COST_BPS
+    _PANEL = load_frame(panel_dir)
+    _RETURNS = load_matrix(returns_dir)
+    _BASE = base
+    _COST_BPS = cost_bps
+
+
+def _evaluate(job: tuple[int, dict]) -> dict:
+    i, params = job
+    row = {"config_id": i, **_flatten(params)}
+    t0 = time.time()
+    try:
+        kwargs = {**_BASE, **params}
+        port = build_portfolios(_PANEL, **kwargs, returns=_RETURNS)
+        res = run_backtest(port[["date", "symbol", "weight"]], returns=_RETURNS, cost_bps=_COST_BPS)
+        row.update(res.stats)
+        row["avg_holdings"] = float(res.rebalances["n_holdings"].mean())
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"[:300]
+    row["seconds"] = time.time() - t0
+    return row
+
+
+def run_sweep(
+    panel: pd.DataFrame,
+    returns: pd.DataFrame,
+    configs: list[dict],
+    base: Optional[dict] = None,
+    n_workers: Optional[int] = None,
+    cost_bps: float = 0.0,
+    workdir: Path | str = SWEEP_DIR,
+) -> pd.DataFrame:
+    """
+    panel  : 리밸런스일 피처 단면 (date, symbol, 팩터/메타 컬럼)
+    returns: libs.backtest.daily_returns 결과 (date × symbol)
+    configs: 파라미터 dict 목록 (base 에 덮어씀)
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    Path(workdir).mkdir(parents=True, exist_ok=True)
+    shm = Path(tempfile.mkdtemp(prefix="_shared-", dir=workdir))
+    try:
+        dump_frame(panel.reset_index(drop=True), shm / "panel")
+        dump_matrix(returns, shm / "returns")
+
+        rows = []
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init,
+            initargs=(str(shm / "panel"), str(shm / "returns"), base or {}, cost_bps),
+        ) as ex:
+            futures = [ex.submit(_evaluate, (i, cfg)) for i, cfg in enumerate(configs)]
+            for n, fut in enumerate(as_completed(futures), 1):
+                rows.append(fut.result())
+                if n % PROGRESS_EVERY == 0:
+                    print(f"진행률: {n}/{len(configs)}")
+    finally:
+        shutil.rmtree(shm, ignore_errors=True)
+
+    return pd.DataFrame(rows).sort_values("config_id").reset_index(drop=True)
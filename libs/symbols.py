@@ -4,26 +4,67 @@ apps/collector/kis/symbols.py
 전 종목 심볼 마스터를 수집하여 저장.
 - FDR 'KRX' 기반 전체 상장종목 메타 확보 (섹터/산업/시총/주식수/밸류)
 - KOSPI200, KOSDAQ150 구성종목 플래그 추가 (가능한 경우)
+- TTL 캐시: 마지막 스냅샷이 TTL_HOURS 이내면 네트워크 호출 없이 그대로 사용
+  (수집 실패 시 마지막 정상 스냅샷 유지, 지수 조회만 실패하면 직전 스냅샷의 편입 플래그를 이어받음)
+- 새 스냅샷을 저장할 때 직전 스냅샷과의 차이(신규 상장/상장 폐지/지수 편입·편출)를 _diff/ 에 기록
+- 하위 스크립트는 load_symbol_master() 로 기준일 이하 마지막 스냅샷을 읽음 (당일 파일이 없어도 동작, 네트워크 없음)
 출력:
   data/raw/kis/symbol_master/{YYYYMMDD}.parquet
+  data/raw/kis/symbol_master/_diff/{YYYYMMDD}.parquet   symbol, name, market, change, index
+
+사용 예시
+    from libs.symbols import load_symbol_master, refresh_symbol_master
+
+    sm = refresh_symbol_master()          # TTL 이내면 캐시, 아니면 수집 → 스냅샷/차이 저장
+    sm = load_symbol_master("20250923")   # 해당일 이하 마지막 스냅샷 (없으면 None)
 """
 
 from __future__ import annotations
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
-import FinanceDataReader as fdr  # pip install finance-datareader
+
+from libs.io_util import atomic_write
+
+MASTER_DIR = Path("data/raw/kis/symbol_master")
+DIFF_DIR = MASTER_DIR / "_diff"
+TTL_HOURS = 20           # 마지막 스냅샷이 이보다 최근이면 다시 받지 않음
+
+NUMERIC_COLS = ["market_cap", "shares", "per", "pbr", "eps", "bps"]
+INDEX_FLAGS = {"KOSPI200": "is_kospi200", "KOSDAQ150": "is_kosdaq150"}
+MASTER_COLS = ["symbol", "name", "market", "sector", "industry", *NUMERIC_COLS, *INDEX_FLAGS.values()]
 
 
 def _safe_numeric(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(s):
+        return s
     return pd.to_numeric(
         s.astype(str).str.replace(",", "", regex=False).str.strip(),
         errors="coerce",
     )
 
 
-def get_symbol_master() -> pd.DataFrame:
+def _index_members(fdr, idx_name: str) -> Optional[set[str]]:
+    """지수 구성종목 코드 집합. 조회 실패 시 None (False 로 채우지 않음)."""
+    try:
+        idx_df = fdr.StockListing(idx_name)
+        sym_col = "Code" if "Code" in idx_df.columns else "Symbol"
+        return set(idx_df[sym_col].astype(str).str.zfill(6))
+    except Exception as e:
+        print(f"⚠️ {idx_name} 구성종목 조회 실패:", e)
+        return None
+
+
+def get_symbol_master(prev: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    FDR 로 심볼 마스터 수집 (KRX 전체 1회 + 지수 구성종목 지수당 1회).
+    지수 조회가 실패하면 prev(직전 스냅샷)의 플래그를 이어받음 (prev 가 없으면 결측).
+    """
+    import FinanceDataReader as fdr  # pip install finance-datareader
+
     # 1) 전체 상장(KRX)
     krx = fdr.StockListing("KRX")
     rename_map = {
@@ -39,26 +80,27 @@ def get_symbol_master() -> pd.DataFrame:
         "EPS": "eps",
         "BPS": "bps",
     }
-    for k, v in rename_map.items():
-        if k in krx.columns:
-            krx = krx.rename(columns={k: v})
-
-    cols = [c for c in ["symbol", "name", "market", "sector", "industry",
-                        "market_cap", "shares", "per", "pbr", "eps", "bps"] if c in krx.columns]
-    df = krx[cols].dropna(subset=["symbol"]).drop_duplicates("symbol")
-    for c in ["market_cap", "shares", "per", "pbr", "eps", "bps"]:
+    krx = krx.rename(columns={k: v for k, v in rename_map.items() if k in krx.columns})
+
+    cols = [c for c in MASTER_COLS if c in krx.columns]
+    df = krx[cols].dropna(subset=["symbol"]).copy()
+    df["symbol"] = df["symbol"].astype(str).str.zfill(6)
+    df = df.drop_duplicates("symbol").reset_index(drop=True)
+    for c in NUMERIC_COLS:
         if c in df.columns:
             df[c] = _safe_numeric(df[c])
 
     # 2) 지수 구성종목 플래그
-    for idx_name, colflag in [("KOSPI200", "is_kospi200"), ("KOSDAQ150", "is_kosdaq150")]:
-        try:
-            idx_df = fdr.StockListing(idx_name)
-            sym_col = "Code" if "Code" in idx_df.columns else "Symbol"
-            syms = set(idx_df[sym_col].astype(str).str.zfill(6))
-            df[colflag] = df["symbol"].astype(str).str.zfill(6).isin(syms)
-        except Exception:
-            df[colflag] = False
+    for idx_name, colflag in INDEX_FLAGS.items():
+        members = _index_members(fdr, idx_name)
+        if members is not None:
+            df[colflag] = df["symbol"].isin(members)
+        elif prev is not None and colflag in prev.columns:
+            carried = prev.set_index("symbol")[colflag]
+            df[colflag] = df["symbol"].map(carried).astype("boolean")
+            print(f"  → {colflag}: 직전 스냅샷 값 유지")
+        else:
+            df[colflag] = pd.array([pd.NA] * len(df), dtype="boolean")
 
     if "market" in df.columns:
         df["market"] = df["market"].astype(str)
@@ -66,15 +108,122 @@ def get_symbol_master() -> pd.DataFrame:
     return df
 
 
-def save_symbol_master():
+# ---- 스냅샷 ----
+def snapshots(root: Path | str = MASTER_DIR) -> list[tuple[str, Path]]:
+    """저장된 스냅샷 (YYYYMMDD, 경로) 날짜순."""
+    root = Path(root)
+    if not root.exists():
+        return []
+    return sorted((p.stem, p) for p in root.glob("*.parquet") if p.stem.isdigit() and len(p.stem) == 8)
+
+
+def load_symbol_master(asof: Optional[str] = None, root: Path | str = MASTER_DIR) -> Optional[pd.DataFrame]:
+    """
+    asof(YYYYMMDD, 기본 오늘) 이하 마지막 스냅샷 (MASTER_COLS 중 있는 컬럼, 종목당 1행).
+    스냅샷이 하나도 없으면 None. 당일 파일이 아니면 어느 날짜를 썼는지 출력.
+    """
+    asof = asof or datetime.now().strftime("%Y%m%d")
+    snaps = [(d, p) for d, p in snapshots(root) if d <= asof]
+    if not snaps:
+        return None
+    d, path = snaps[-1]
+    if d != asof:
+        print(f"ℹ️ symbol_master {asof} 없음 → {d} 스냅샷 사용")
+    sm = pd.read_parquet(path)
+    sm = sm[[c for c in MASTER_COLS if c in sm.columns]].drop_duplicates("symbol")
+    for c in NUMERIC_COLS:   # 예전 스냅샷은 문자열로 저장된 경우가 있음 (숫자면 그대로 통과)
+        if c in sm.columns:
+            sm[c] = _safe_numeric(sm[c])
+    return sm.reset_index(drop=True)
+
+
+def diff_symbol_master(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    두 스냅샷의 차이: change = listed / delisted / index_in / index_out
+    (index 컬럼은 지수 편입·편출일 때 지수명). 양쪽 중 결측인 플래그는 비교하지 않음.
+    """
+    meta = ["symbol", "name", "market"]
+    o = old.set_index("symbol")
+    n = new.set_index("symbol")
+    out = []
+
+    listed = n.index.difference(o.index)
+    delisted = o.index.difference(n.index)
+    for idx, frame, change in [(listed, n, "listed"), (delisted, o, "delisted")]:
+        if len(idx):
+            part = frame.loc[idx].reset_index().reindex(columns=meta)
+            part["change"], part["index"] = change, None
+            out.append(part)
+
+    both = n.index.intersection(o.index)
+    for idx_name, flag in INDEX_FLAGS.items():
+        if flag not in o.columns or flag not in n.columns:
+            continue
+        a = o.loc[both, flag].astype("boolean")
+        b = n.loc[both, flag].astype("boolean")
+        known = a.notna() & b.notna()
+        for change, mask in [("index_in", known & b & ~a), ("index_out", known & a & ~b)]:
+            syms = both[mask.fillna(False).to_numpy(bool)]
+            if len(syms):
+                part = n.loc[syms].reset_index().reindex(columns=meta)
+                part["change"], part["index"] = change, idx_name
+                out.append(part)
+
+    cols = meta + ["change", "index"]
+    if not out:
+        return pd.DataFrame(columns=cols)
+    return pd.concat(out, ignore_index=True)[cols].sort_values(["change", "symbol"]).reset_index(drop=True)
+
+
+def _write_atomic(df: pd.DataFrame, path: Path) -> None:
+    with atomic_write(path) as f:
+        df.to_parquet(f, index=False)
+
+
+def refresh_symbol_master(
+    ttl_hours: float = TTL_HOURS,
+    force: bool = False,
+    root: Path | str = MASTER_DIR,
+) -> Optional[pd.DataFrame]:
+    """
+    마지막 스냅샷이 ttl_hours 이내면 그대로 반환 (네트워크 없음).
+    아니면 수집 → 오늘 스냅샷 + 직전 스냅샷과의 차이 저장. 수집 실패 시 마지막 정상 스냅샷 반환.
+    """
+    root = Path(root)
     today = datetime.now().strftime("%Y%m%d")
-    outdir = Path("data/raw/kis/symbol_master")
-    outdir.mkdir(parents=True, exist_ok=True)
-    df = get_symbol_master()
-    path = outdir / f"{today}.parquet"
-    df.to_parquet(path, index=False)
+    snaps = snapshots(root)
+    last = snaps[-1] if snaps else None
+    if last is not None and not force:
+        age_h = (time.time() - last[1].stat().st_mtime) / 3600
+        if age_h < ttl_hours:
+            print(f"✅ Symbol master 캐시 사용: {last[1]} ({age_h:.1f}h 전)")
+            return load_symbol_master(last[0], root)
+
+    prev_date = next((d for d, _ in reversed(snaps) if d < today), None)
+    prev = load_symbol_master(prev_date, root) if prev_date else None
+    try:
+        df = get_symbol_master(prev)
+    except Exception as e:
+        if last is None:
+            raise
+        print(f"⚠️ Symbol master 수집 실패 → 마지막 스냅샷 {last[0]} 유지:", e)
+        return load_symbol_master(last[0], root)
+
+    path = root / f"{today}.parquet"
+    _write_atomic(df, path)
     print(f"✅ Symbol master 저장: {path} (종목 수: {len(df)})")
 
+    if prev is not None:
+        diff = diff_symbol_master(prev, df)
+        _write_atomic(diff, root / DIFF_DIR.name / f"{today}.parquet")
+        counts = diff["change"].value_counts().to_dict()
+        print(f"   {prev_date} 대비 변경: " + (", ".join(f"{k} {v}" for k, v in sorted(counts.items())) or "없음"))
+    return df
+
+
+def save_symbol_master(force: bool = False):
+    refresh_symbol_master(force=force)
+
 
 if __name__ == "__main__":
     save_symbol_master()
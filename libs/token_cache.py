@@ -0,0 +1,188 @@
+"""
+libs/token_cache.py
+
+프로세스 간 공유되는 만료시각 기반 KIS 토큰 캐시.
+
+- 발급 응답의 expires_in 으로 실제 만료시각(expires_at)을 저장
+- 파일(.kis_tokens/<key>.json) + 파일 락(fcntl.flock)으로 여러 수집 프로세스가 공유
+- 첫 로드 이후에는 메모리에서 반환 (요청마다 파일 I/O 없음)
+- 만료 REFRESH_AHEAD 초 전부터 백그라운드 스레드가 미리 갱신
+  → 락을 잡은 워커 1개만 발급, 나머지는 기존(아직 유효한) 토큰으로 계속 진행하다가
+    락이 풀리면 새 토큰을 채택
+- 락 안에서 파일을 다시 읽어(double-check) 다른 워커가 이미 갱신했으면 발급하지 않음
+
+사용 예시
+    from libs.token_cache import TokenCache
+
+    cache = TokenCache("real", issue=lambda: {"access_token": "...", "expires_in": 86400})
+    token = cache.get()
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 락 없이 동작 (단일 프로세스 사용 가정)
+    fcntl = None
+
+from libs.io_util import atomic_write
+
+CACHE_DIR = Path(".kis_tokens")
+REFRESH_AHEAD = 60 * 60    # 만료 1시간 전부터 백그라운드 갱신
+EXPIRY_MARGIN = 60         # 만료 1분 전부터는 만료된 것으로 취급
+DEFAULT_EXPIRES_IN = 86400  # 응답에 expires_in 이 없을 때 (KIS 기본 24시간)
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    access_token: str
+    expires_at: float
+    issued_at: float
+
+    def valid(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now < self.expires_at - EXPIRY_MARGIN
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """선제 갱신 구간에 들어섰는지 (수명이 짧은 토큰은 수명의 절반 시점부터)."""
+        now = time.time() if now is None else now
+        ahead = min(REFRESH_AHEAD, (self.expires_at - self.issued_at) / 2)
+        return now >= self.expires_at - ahead
+
+
+class TokenCache:
+    """
+    Parameters
+    ----------
+    key : str
+        캐시 파일 이름 (env/자격증명 단위)
+    issue : Callable[[], dict]
+        토큰 발급 함수. KIS 응답 JSON(access_token, expires_in)을 반환
+    cache_dir : Path
+        캐시 파일 디렉터리
+    """
+
+    def __init__(self, key: str, issue: Callable[[], dict], cache_dir: Path | str = CACHE_DIR):
+        self.key = key
+        self.issue = issue
+        self.path = Path(cache_dir) / f"{key}.json"
+        self._mem: Optional[CachedToken] = None
+        self._lock = threading.Lock()          # 프로세스 내 동기화
+        self._bg: Optional[threading.Thread] = None
+
+    # ---- 파일 ----
+    @contextmanager
+    def _file_lock(self, blocking: bool = True):
+        """프로세스 간 배타 락. blocking=False 에서 못 잡으면 False 를 yield."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a+") as fh:
+            if fcntl is None:
+                yield True
+                return
+            flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(fh, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_file(self) -> Optional[CachedToken]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                d = json.load(f)
+            return CachedToken(d["access_token"], float(d["expires_at"]), float(d["issued_at"]))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_file(self, tok: CachedToken) -> None:
+        with atomic_write(self.path, "w") as f:
+            json.dump({"access_token": tok.access_token, "expires_at": tok.expires_at,
+                       "issued_at": tok.issued_at}, f)
+
+    # ---- 발급 ----
+    def _issue(self) -> CachedToken:
+        data = self.issue()
+        token = data.get("access_token")
+        if not token:
+            raise RuntimeError(f"Token response missing 'access_token': {data}")
+        now = time.time()
+        expires_in = float(data.get("expires_in") or DEFAULT_EXPIRES_IN)
+        return CachedToken(token, now + expires_in, now)
+
+    def _refresh(self, seen: Optional[CachedToken], blocking: bool, force: bool = False) -> Optional[CachedToken]:
+        """
+        락을 잡고 파일 재확인 후 필요할 때만 발급.
+        seen 은 갱신을 결정할 때 보고 있던 토큰 — 파일에 그보다 새 토큰이 있으면
+        다른 워커가 이미 발급한 것이므로 그대로 사용.
+        blocking=False 에서 다른 워커가 갱신 중이면 None.
+        """
+        with self._file_lock(blocking=blocking) as locked:
+            if not locked:
+                return None
+            cur = self._read_file()
+            fresher = cur is not None and cur.valid() and (
+                seen is None or cur.issued_at > seen.issued_at or (not force and not cur.due())
+            )
+            if fresher:
+                tok = cur
+            else:
+                tok = self._issue()
+                self._write_file(tok)
+                print(f"🔄 refreshed {self.key} token (expires {time.strftime('%Y-%m-%d %H:%M', time.localtime(tok.expires_at))})")
+        with self._lock:
+            self._mem = tok
+        return tok
+
+    def _refresh_background(self, seen: CachedToken) -> None:
+        with self._lock:
+            if self._bg is not None and self._bg.is_alive():
+                return
+            self._bg = threading.Thread(target=self._bg_run, args=(seen,),
+                                        name=f"token-refresh-{self.key}", daemon=True)
+            self._bg.start()
+
+    def _bg_run(self, seen: CachedToken) -> None:
+        try:
+            # 백그라운드 스레드라 락 대기는 요청 경로를 막지 않음.
+            # 먼저 락을 잡은 워커가 발급하면 나머지는 락 해제 후 그 토큰을 채택.
+            self._refresh(seen, blocking=True)
+        except Exception as e:
+            print(f"⚠️ background token refresh failed ({self.key}):", e)
+
+    # ---- 조회 ----
+    def peek(self) -> Optional[CachedToken]:
+        """발급 없이 메모리/파일의 유효 토큰 조회."""
+        tok = self._mem if self._mem is not None and self._mem.valid() else self._read_file()
+        return tok if tok is not None and tok.valid() else None
+
+    def get(self, force_refresh: bool = False) -> str:
+        """유효 토큰 반환. 만료 임박이면 백그라운드 갱신을 걸고 현재 토큰을 그대로 반환."""
+        if force_refresh:
+            seen = self._mem or self._read_file()
+            return self._refresh(seen, blocking=True, force=True).access_token
+
+        tok = self._mem
+        if tok is None or not tok.valid():
+            tok = self._read_file()
+            if tok is not None and tok.valid():
+                with self._lock:
+                    self._mem = tok
+            else:
+                # 유효 토큰이 전혀 없을 때만 블로킹 (락 안에서 재확인하므로 중복 발급 없음)
+                tok = self._refresh(tok, blocking=True)
+
+        if tok.due():
+            self._refresh_background(tok)
+        return tok.access_token
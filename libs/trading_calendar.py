@@ -0,0 +1,198 @@
+"""
+libs/trading_calendar.py
+
+KRX 거래일(세션) 인덱스 — 저장된 일봉 날짜에서 만들어 data/meta 에 캐시 (API 호출 없음).
+
+- 세션: 저장소의 어느 종목이든 봉이 있는 날 (KIS 일봉은 휴장일 봉을 주지 않음)
+- 캐시 이후 저장소에 새로 쌓인 날짜만 읽어 갱신 (update_calendar)
+- 장 마감(MARKET_CLOSE, KST) 전의 당일 세션은 미마감 → last_closed_session() 은 직전 세션
+  (장중 수집이 부분 봉을 저장하지 않도록 수집기의 요청 끝으로 사용)
+- 캐시된 마지막 세션 이후(오늘/미래)는 평일 + HOLIDAYS_PATH(저장소에 포함된 KRX 휴장일 목록)에 없는 날을 세션으로 간주
+  → 주말/휴장일에는 수집기가 API 를 부르지 않고 종료
+  (목록에 없는 휴장일은 수집기가 대표 종목 1건 조회로 확인해 add_holiday() 로 목록에 추가)
+- 종목별 결측 세션(거래정지/수집 누락)과 연속 구간, (세션 × 종목) 밀집 격자 재배치 제공
+  (dense 는 분석/진단용 — 피처(libs.factors)는 종목별 봉 위치 기준 창이라 세션 격자로 재배치하지 않음)
+
+사용 예시
+    from libs.trading_calendar import update_calendar
+
+    cal = update_calendar(CandleStore())             # 캐시 로드 → 새 날짜만 반영 → 저장
+    cal.is_session("20251003")                      # 개천절 → False
+    end = cal.last_session("20251005")              # 일요일 → 직전 세션
+    end = cal.last_closed_session()                 # 장중이면 전 세션, 마감 후면 오늘
+    gaps = cal.gaps(store.read(["005930"])["date"])  # [(시작, 끝), ...] 결측 세션 구간
+    close = cal.dense(df, "close")                  # (세션 × 종목), 결측은 NaN
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, time
+from pathlib import Path
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from libs.io_util import atomic_write, ymd
+
+META_DIR = Path("data/meta")
+CACHE_PATH = META_DIR / "krx_sessions.parquet"
+HOLIDAYS_PATH = META_DIR / "krx_holidays.txt"    # 평일 휴장일 목록 (매년 갱신)
+MARKET_TZ = ZoneInfo("Asia/Seoul")
+MARKET_CLOSE = time(15, 30)                      # 정규장 마감 → 이후 당일 봉 종가 확정
+
+
+def _ts(d) -> pd.Timestamp:
+    return pd.Timestamp(str(d) if isinstance(d, (int, np.integer)) else d).normalize()
+
+
+def load_holidays(path: Path | str = HOLIDAYS_PATH) -> pd.DatetimeIndex:
+    path = Path(path)
+    if not path.exists():
+        return pd.DatetimeIndex([])
+    lines = [ln.split("#")[0].strip() for ln in path.read_text(encoding="utf-8").splitlines()]
+    return pd.DatetimeIndex(pd.to_datetime([ln for ln in lines if ln], format="%Y%m%d")).unique().sort_values()
+
+
+def add_holiday(d, path: Path | str = HOLIDAYS_PATH) -> None:
+    """휴장일 1개를 목록 파일 끝에 추가 (이미 있으면 무시)."""
+    path = Path(path)
+    d = _ts(d)
+    if d in load_holidays(path):
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"{ymd(d)}  # 수집기 확인\n")
+
+
+class TradingCalendar:
+    def __init__(self, sessions: Iterable = (), holidays: Iterable = ()):
+        self.sessions = pd.DatetimeIndex(pd.to_datetime(list(sessions))).normalize().unique().sort_values()
+        self.holidays = pd.DatetimeIndex(pd.to_datetime(list(holidays))).normalize()
+
+    def with_holiday(self, d) -> "TradingCalendar":
+        return TradingCalendar(self.sessions, self.holidays.append(pd.DatetimeIndex([_ts(d)])))
+
+    @property
+    def last_known(self) -> Optional[pd.Timestamp]:
+        """저장소 기준 마지막 세션 (이후는 평일/휴장일 규칙으로 추정)."""
+        return self.sessions[-1] if len(self.sessions) else None
+
+    # ---- 세션 조회 ----
+    def _projected(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+        days = pd.bdate_range(start, end)
+        return days.difference(self.holidays)
+
+    def sessions_between(self, start, end) -> pd.DatetimeIndex:
+        """[start, end] 의 세션 (마지막 세션 이후 구간은 평일 − 휴장일)."""
+        start, end = _ts(start), _ts(end)
+        known = self.sessions[(self.sessions >= start) & (self.sessions <= end)]
+        last = self.last_known
+        if last is None:
+            return self._projected(start, end)
+        if end > last:
+            known = known.append(self._projected(max(start, last + pd.Timedelta(days=1)), end))
+        return known
+
+    def is_session(self, d) -> bool:
+        d = _ts(d)
+        last = self.last_known
+        if last is not None and d <= last:
+            return d in self.sessions
+        return d.dayofweek < 5 and d not in self.holidays
+
+    def last_session(self, d) -> Optional[pd.Timestamp]:
+        """d 이하의 마지막 세션."""
+        d = _ts(d)
+        s = self.sessions_between(d - pd.Timedelta(days=30), d)
+        if len(s):
+            return s[-1]
+        s = self.sessions[self.sessions <= d]
+        return s[-1] if len(s) else None
+
+    def last_closed_session(self, now: Optional[datetime] = None) -> Optional[pd.Timestamp]:
+        """now(기본: 현재 KST) 기준 장이 마감된 마지막 세션 (마감 전이면 오늘은 제외)."""
+        now = datetime.now(MARKET_TZ) if now is None else now
+        if now.tzinfo is not None:
+            now = now.astimezone(MARKET_TZ)
+        d = pd.Timestamp(now.date())
+        if now.time() < MARKET_CLOSE:
+            d -= pd.Timedelta(days=1)
+        return self.last_session(d)
+
+    def next_session(self, d) -> pd.Timestamp:
+        """d 보다 뒤의 첫 세션."""
+        d = _ts(d)
+        s = self.sessions_between(d + pd.Timedelta(days=1), d + pd.Timedelta(days=30))
+        return s[0]
+
+    # ---- 결측 세션 ----
+    def missing(self, dates, end=None) -> pd.DatetimeIndex:
+        """종목의 저장 날짜 dates 기준, 첫 봉 ~ end(기본: 마지막 봉) 사이에 봉이 없는 세션."""
+        dates = pd.DatetimeIndex(pd.to_datetime(pd.Series(dates))).normalize().unique().sort_values()
+        if dates.empty:
+            return dates
+        end = dates[-1] if end is None else _ts(end)
+        return self.sessions_between(dates[0], end).difference(dates)
+
+    def gaps(self, dates, end=None) -> list[tuple[str, str]]:
+        """결측 세션을 세션 순서상 연속인 구간 (시작, 끝) YYYYMMDD 목록으로."""
+        dates = pd.DatetimeIndex(pd.to_datetime(pd.Series(dates))).normalize().unique().sort_values()
+        if dates.empty:
+            return []
+        end = dates[-1] if end is None else _ts(end)
+        grid = self.sessions_between(dates[0], end)
+        miss = ~grid.isin(dates)
+        if not miss.any():
+            return []
+        run = np.cumsum(np.r_[True, miss[1:] != miss[:-1]])
+        out = []
+        for r in np.unique(run[miss]):
+            seg = grid[run == r]
+            out.append((ymd(seg[0]), ymd(seg[-1])))
+        return out
+
+    def missing_table(self, df: pd.DataFrame, end=None) -> pd.DataFrame:
+        """long(symbol, date) 프레임 → 종목별 결측 구간 (symbol, start, end, n_sessions)."""
+        rows = []
+        for sym, d in df.groupby("symbol", observed=True, sort=True)["date"]:
+            for s, e in self.gaps(d, end):
+                rows.append((str(sym), s, e, len(self.sessions_between(s, e))))
+        return pd.DataFrame(rows, columns=["symbol", "start", "end", "n_sessions"])
+
+    # ---- 밀집 격자 ----
+    def dense(self, df: pd.DataFrame, column: str, start=None, end=None) -> pd.DataFrame:
+        """long(symbol, date) 의 column → (세션 × 종목) wide 프레임. 봉이 없는 세션은 NaN."""
+        start = df["date"].min() if start is None else start
+        end = df["date"].max() if end is None else end
+        grid = self.sessions_between(start, end)
+        wide = df.pivot_table(index="date", columns="symbol", values=column, aggfunc="last", observed=True)
+        wide = wide.reindex(grid)
+        wide.index.name = "date"
+        return wide
+
+    # ---- 캐시 ----
+    def save(self, path: Path | str = CACHE_PATH) -> None:
+        with atomic_write(path) as f:
+            pd.DataFrame({"date": self.sessions}).to_parquet(f, index=False)
+
+    @classmethod
+    def load(cls, path: Path | str = CACHE_PATH, holidays_path: Path | str = HOLIDAYS_PATH) -> "TradingCalendar":
+        sessions = pd.read_parquet(path)["date"] if Path(path).exists() else []
+        return cls(sessions, load_holidays(holidays_path))
+
+
+def update_calendar(
+    store,
+    path: Path | str = CACHE_PATH,
+    holidays_path: Path | str = HOLIDAYS_PATH,
+) -> TradingCalendar:
+    """캐시를 불러와 마지막 세션 이후 저장소에 새로 생긴 날짜만 반영 후 저장 (캐시가 없으면 전체 날짜로 구축)."""
+    cal = TradingCalendar.load(path, holidays_path)
+    last = cal.last_known
+    new = store.read(start=None if last is None else ymd(last + pd.Timedelta(days=1)), columns=["date"])
+    if len(new):
+        cal = TradingCalendar(cal.sessions.append(pd.DatetimeIndex(new["date"].unique())), cal.holidays)
+        cal.save(path)
+    return cal
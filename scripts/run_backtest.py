@@ -0,0 +1,76 @@
+"""
+scripts/run_backtest.py
+
+run_score_quant 의 선정 파이프라인(유니버스 → 스코어 → 섹터별 Top-K → Top-N → 가중치)을
+피처 이력 전체에 리밸런스 주기마다 재현해 성과를 계산하는 워크포워드 백테스트.
+
+- 리밸런스일 단면만 읽어 모든 날짜를 한 번에 선정 (날짜별 main() 반복 없음)
+- 성과: 다음 종가 기준 일수익률(거래정지일은 0), 보유 구간 중 비중 표류 반영
+- 리포트: 누적수익/CAGR/변동성/샤프/MDD/회전율 (+ 동일가중 전 종목 벤치마크)
+
+입력:
+  data/proc/feature_store/dt=*/
+출력:
+  data/proc/backtest/{START}_{END}_{REBALANCE}_daily.parquet      일별 수익률/NAV/낙폭/회전율
+  data/proc/backtest/{START}_{END}_{REBALANCE}_holdings.parquet   리밸런스일별 선정 종목/비중
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from libs.backtest import daily_returns, rebalance_dates, run_backtest
+from libs.feature_store import FeatureStore
+from scripts.run_score_quant import LOAD_COLS, build_portfolios
+
+# ==== 설정 ====
+START = None          # YYYYMMDD, None 이면 저장소 처음부터
+END = None            # YYYYMMDD, None 이면 저장소 끝까지
+REBALANCE = "M"       # "D" | "W" | "M" | "Q" | 정수 N(N 거래일마다)
+COST_BPS = 15         # 편도 거래비용 (회전율 1 당 bp)
+RETURN_SOURCE = "close"  # "close": 다음 종가 기준 | "target": target_ret_1d (윈저라이즈된 값)
+
+
+def main():
+    store = FeatureStore()
+    dates = pd.DatetimeIndex(store.dates())
+    if START:
+        dates = dates[dates >= pd.Timestamp(START)]
+    if END:
+        dates = dates[dates <= pd.Timestamp(END)]
+    if len(dates) < 2:
+        raise RuntimeError(f"백테스트할 피처 날짜 부족: {len(dates)}")
+
+    # 1) 전체 기간 가격 로드 (성과 + 공분산 가중치일 때 리밸런스일까지의 종가 수익률)
+    prices = store.read(start=dates[0], end=dates[-1], columns=["date", "symbol", "close", "target_ret_1d"])
+    close_ret = daily_returns(prices)
+
+    # 2) 리밸런스일 단면만 로드 → 전 날짜 일괄 선정
+    reb = rebalance_dates(dates, REBALANCE)
+    panel = store.read(dates=reb, columns=LOAD_COLS)
+    holdings = build_portfolios(panel, returns=close_ret)
+    print(f"리밸런스 {len(reb)}회 ({reb[0].date()} ~ {reb[-1].date()}), 평균 보유 "
+          f"{holdings.groupby('date').size().mean():.1f} 종목")
+
+    # 3) 성과
+    res = run_backtest(holdings[["date", "symbol", "weight"]], prices, cost_bps=COST_BPS, source=RETURN_SOURCE,
+                       returns=close_ret if RETURN_SOURCE == "close" else None)
+
+    print("\n=== 백테스트 요약 ===")
+    for k, v in res.stats.items():
+        print(f"{k:>20}: {v:.4f}" if isinstance(v, float) else f"{k:>20}: {v}")
+
+    # 4) 저장
+    outdir = Path("data/proc/backtest")
+    outdir.mkdir(parents=True, exist_ok=True)
+    tag = f"{dates[0]:%Y%m%d}_{dates[-1]:%Y%m%d}_{REBALANCE}"
+    res.daily.reset_index().to_parquet(outdir / f"{tag}_daily.parquet", index=False)
+    cols = [c for c in ["date", "symbol", "name", "sector_key", "score", "rank", "weight"] if c in holdings.columns]
+    holdings[cols].to_parquet(outdir / f"{tag}_holdings.parquet", index=False)
+    print(f"\n✅ 저장 완료: {outdir}/{tag}_*.parquet")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,43 +5,89 @@ Daily OHLCV 기반 멀티팩터 피처 생성.
 - 심볼 마스터(섹터/시총/밸류 등) 병합
 - 모멘텀/변동성/유동성 + size/turnover + (가능시) PER/PBR/EPS/BPS
 - 유동성: 20일 평균 거래대금 로그로 안정화
+- 보조지표(INDICATOR_COLS): libs.indicators 레지스트리 지표를 팩터와 같은 패스에서 계산 (공통 중간값 공유)
 - 최소 거래일수 MIN_BARS (데이터 충분하면 252로 올려 운영 권장)
 
+- 증분 모드(INCREMENTAL): 지난 런의 종목별 꼬리(원본 STATE_BARS 봉 + EMA)를 저장해 두고
+  저장소에서 그 이후 봉만 읽어 새 봉의 팩터만 계산 → O(신규 봉)
+  (직전 마지막 봉은 target_ret_1d 가 채워지므로 다시 계산해 덮어씀)
+  상태가 없거나 VERIFY_INCREMENTAL 이면 전체 재계산 (검증 모드는 두 결과를 대조)
+  수정주가 재수집으로 이력이 바뀐 종목(꼬리 마지막 봉 종가 ≠ 저장소)은 그 종목만 상태를 버리고 전체 재계산
+- 윈저라이즈: 날짜별 단면 1%/99% → 증분 런은 새로 계산된 날짜의 파티션만 다시 씀
+  (심볼 마스터도 그 날짜에만 새로 병합, 이전 날짜 파티션은 기록 당시 값 유지)
+- 메모리 제한 모드(CHUNKED): 전체 재계산을 종목 묶음 단위로 → raw 에 바로 기록,
+  윈저라이즈/저장은 날짜 묶음 단위로 두 번째 패스 → 최대 메모리는 MEMORY_BUDGET_MB 로 결정 (데이터 크기 무관)
+
 입력:
-  data/raw/kis/daily/{YYYYMMDD}.parquet
-  data/raw/kis/symbol_master/{YYYYMMDD}.parquet
+  data/raw/kis_daily/<SYM>/1d/*.parquet  (CandleStore)
+  data/raw/kis/symbol_master/{YYYYMMDD}.parquet  (기준일 이하 마지막 스냅샷)
+상태:
+  data/proc/features/_state/tail.parquet   종목별 꼬리 (다음 증분 계산용)
+  data/proc/features/_state/raw/*.parquet  윈저라이즈 전 팩터 (append-only 파트, 파트 안은 날짜 순)
 출력:
-  data/proc/features/{YYYYMMDD}.parquet
+  data/proc/feature_store/dt={YYYYMMDD}/part-0.parquet  (날짜 파티션, libs.feature_store)
 """
 
 from __future__ import annotations
+import shutil
 from pathlib import Path
 from datetime import datetime
 
 import numpy as np
 import pandas as pd
 
+from libs.candle_store import CandleStore
+from libs.feature_store import FeatureStore
+from libs.factors import FACTOR_COLS, STATE_BARS, compute_factors, factor_state
+from libs.io_util import atomic_write
+from libs.symbols import load_symbol_master
+
 # ==== 설정 ====
 # 데이터가 아직 얕으면 120부터 시작 → 충분히 쌓이면 252로 변경 권장
 MIN_BARS = 120
+VERIFY_FACTORS = False   # True: 일부 종목을 종목별 add_factors 로 재계산해 패널 결과와 대조
+VERIFY_SAMPLE = 50
+INCREMENTAL = True         # 지난 런의 상태에서 새 봉만 계산
+VERIFY_INCREMENTAL = False # True: 전체 재계산 결과와 증분 결과를 대조 (저장은 전체 재계산 기준)
+INDICATOR_COLS: list[str] = []  # 함께 저장할 보조지표 (예: libs.indicators.TECHNICAL_COLS, 창이 STATE_BARS 이하여야 증분 가능)
+VERIFY_RTOL = 1e-9         # rolling 누적합 시작점이 달라 생기는 부동소수 오차 허용치
+
+STATE_DIR = Path("data/proc/features/_state")
+STATE_PATH = STATE_DIR / "tail.parquet"
+RAW_DIR = STATE_DIR / "raw"
+RAW_COMPACT_AT = 32        # 증분 raw 파트가 이 개수를 넘으면 하나로 병합
+RAW_ROW_GROUP = 65536      # raw 파트 row group 크기 (날짜 조건으로 읽을 때 건너뛰는 단위)
+
+# 메모리 제한 모드: 종목 묶음 단위로 팩터 계산 → raw 기록, 날짜 묶음 단위로 윈저라이즈 → 저장
+CHUNKED = False
+MEMORY_BUDGET_MB = 1024    # 묶음 하나가 쓰는 작업 메모리 목표
+ROW_BYTES = 2048           # 행당 작업 메모리 추정 (팩터 계산 중간 배열 포함)
+FLOAT32 = False            # True: 저장하는 실수 컬럼을 float32 로 (CHUNKED 운영 시 권장)
 
 NUMERIC_COLS = ["open", "high", "low", "close", "volume", "value"]
 BASE_COLS = ["date", "open", "high", "low", "close", "volume", "value"]
 
 
 def _coerce_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    문자열로 남아 있는 컬럼만 숫자로 변환.
+    CandleStore 데이터는 수집 시 이미 int32/int64 로 고정되어 있어 그대로 통과 (복사 없음).
+    """
+    todo = [c for c in NUMERIC_COLS if c in df.columns and not pd.api.types.is_numeric_dtype(df[c])]
+    need_date = "date" in df.columns and not np.issubdtype(df["date"].dtype, np.datetime64)
+    if not todo and not need_date:
+        return df
+
     out = df.copy()
-    if "date" in out.columns and not np.issubdtype(out["date"].dtype, np.datetime64):
+    if need_date:
         out["date"] = pd.to_datetime(out["date"], errors="coerce")
-
-    for c in NUMERIC_COLS:
-        if c in out.columns:
-            out[c] = out[c].astype(str).str.replace(",", "", regex=False).str.strip()
-            out[c] = pd.to_numeric(out[c], errors="coerce")
+    for c in todo:
+        out[c] = _safe_numeric(out[c])
     return out
 
 
 def add_factors(group: pd.DataFrame) -> pd.DataFrame:
+    """종목 1개 기준 참조 구현 (compute_factors 검증용)."""
     df = group.sort_values("date").copy()
 
     # 수익률(모멘텀)
@@ -77,70 +123,239 @@ def add_factors(group: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def winsorize(df: pd.DataFrame, cols: list[str], p: float = 0.01) -> pd.DataFrame:
-    out = df.copy()
-    for c in cols:
-        if c in out.columns:
-            q_low, q_high = out[c].quantile([p, 1 - p])
-            out[c] = out[c].clip(lower=q_low, upper=q_high)
-    return out
+def _verify_factors(df: pd.DataFrame, df_feat: pd.DataFrame, n: int = VERIFY_SAMPLE) -> None:
+    """표본 종목을 add_factors 로 재계산해 패널 결과와 완전 일치하는지 확인."""
+    syms = df_feat["symbol"].drop_duplicates()
+    syms = syms.sample(min(n, len(syms)), random_state=0)
+    for sym in syms:
+        ref = add_factors(df.loc[df["symbol"] == sym, BASE_COLS]).reset_index(drop=True)
+        got = df_feat.loc[df_feat["symbol"] == sym, BASE_COLS + FACTOR_COLS].reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, ref[BASE_COLS + FACTOR_COLS], check_exact=True)
+    print(f"🔎 팩터 검증 통과: {len(syms)} 종목")
 
 
-def _safe_numeric(s: pd.Series) -> pd.Series:
-    return pd.to_numeric(
-        s.astype(str).str.replace(",", "", regex=False).str.strip(),
-        errors="coerce"
-    )
-
+def _feature_cols() -> list[str]:
+    return FACTOR_COLS + [c for c in INDICATOR_COLS if c not in FACTOR_COLS]
 
-def main():
-    today = datetime.now().strftime("%Y%m%d")
-    daily_path = Path(f"data/raw/kis/daily/{today}.parquet")
-    if not daily_path.exists():
-        raise FileNotFoundError(f"Daily OHLCV 파일 없음: {daily_path}")
 
-    df = pd.read_parquet(daily_path)
-    print("원본 데이터:", df.shape)
+def _state_keep() -> int:
+    # MIN_BARS 미만 종목은 꼬리에 전체 이력이 남아 있어야 MIN_BARS 를 넘는 날 전 구간을 계산할 수 있음
+    return max(STATE_BARS, MIN_BARS)
 
-    # 1) 타입 정리
-    df = _coerce_numeric(df)
 
+def _check_required(df: pd.DataFrame) -> None:
     required = {"date", "symbol", "open", "high", "low", "close", "volume", "value"}
     missing = required - set(df.columns)
     if missing:
         raise ValueError(f"필수 컬럼 누락: {missing}")
 
-    # 2) 종목별 레코드 수 필터
-    cnt = df.groupby("symbol")["date"].count()
-    keep_syms = cnt[cnt >= MIN_BARS].index
-    df = df[df["symbol"].isin(keep_syms)]
-
-    # 3) 팩터 생성 (symbol 복원)
-    df_feat = (
-        df.sort_values(["symbol", "date"])
-          .groupby("symbol", group_keys=True)[BASE_COLS]
-          .apply(add_factors)
-          .reset_index(level=0)
-          .rename(columns={"level_0": "symbol"})
+
+def _build_full(store: CandleStore) -> pd.DataFrame:
+    """전 종목 전체 이력 재계산 (MIN_BARS 미만 종목 포함, bar_no 부여)."""
+    df = _coerce_numeric(store.read())
+    _check_required(df)
+    df["symbol"] = df["symbol"].astype(str)
+    feat = compute_factors(df, extra=INDICATOR_COLS)
+    feat["bar_no"] = feat.groupby("symbol", sort=False).cumcount() + 1
+    return feat
+
+
+def _tail_close_changed(state: pd.DataFrame, new: pd.DataFrame, prev_last: pd.Series) -> pd.Index:
+    """
+    꼬리(state)의 종목별 마지막 봉 종가와 저장소(new)의 같은 날 종가가 다른(또는 그 봉이 사라진) 종목.
+    꼬리가 없거나 어느 한쪽 종가가 NaN 인 종목은 비교할 수 없으므로 제외 (NaN != NaN 으로 잡히지 않게).
+    """
+    syms = pd.Index(new["symbol"].unique()).intersection(prev_last.index)
+    tail = state[state["date"] == state["symbol"].map(prev_last)].set_index("symbol")["close"]
+    tail = tail.astype("float64").reindex(syms).dropna()
+    now = new[new["date"] == new["symbol"].map(prev_last)].set_index("symbol")["close"].astype("float64")
+    gone = ~tail.index.isin(now.index)
+    cur = now.reindex(tail.index)
+    diff = cur.notna() & cur.ne(tail)
+    return tail.index[gone | diff.to_numpy()]
+
+
+def _read_since(store: CandleStore, since: pd.Series) -> pd.DataFrame:
+    """
+    종목별로 자기 since(symbol → 날짜) 이후(당일 포함)만 읽음.
+    since 가 같은 종목끼리 묶어 한 번씩 조회 → 오래 밀린 종목이 있어도 다른 종목은 새 봉만 읽음.
+    """
+    parts = [store.read(symbols=syms.index, start=d) for d, syms in since.groupby(since, sort=True)]
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["date", "symbol"])
+    df["symbol"] = df["symbol"].astype(str)
+    return df
+
+
+def _build_incremental(store: CandleStore, state: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    상태(종목별 꼬리) 이후의 새 봉만 계산.
+    반환: (다시 기록할 행 — 직전 마지막 봉 + 새 봉, MIN_BARS 를 막 넘은 종목은 전체 이력 / 새 상태)
+    """
+    prev_last = state.groupby("symbol")["date"].max()
+    prev_bars = state.groupby("symbol")["bar_no"].max()
+    stored = store.last_dates()
+    stored = stored[stored.notna()]
+
+    known = stored.index.intersection(prev_last.index)
+    updated = known[stored[known] > prev_last[known]]
+    added = stored.index.difference(prev_last.index)
+    if updated.empty and added.empty:
+        return pd.DataFrame(), state
+
+    parts = []
+    if len(updated):
+        new = _read_since(store, prev_last[updated])
+        # 수정주가로 이력이 교체된 종목: 꼬리의 마지막 봉 종가가 저장소와 다름 → 상태를 버리고 신규 종목처럼 전체 재계산
+        changed = _tail_close_changed(state, new, prev_last)
+        if len(changed):
+            print(f"🔁 이력이 바뀐 종목 {len(changed)}개 전체 재계산: {', '.join(changed[:10])}"
+                  f"{' 외' if len(changed) > 10 else ''}")
+            state = state[~state["symbol"].isin(changed)]
+            prev_bars = prev_bars.drop(changed)
+            updated = updated.difference(changed)
+            added = added.union(changed)
+        new = new[new["symbol"].isin(updated)]
+        new = new[new["date"] > new["symbol"].map(prev_last)]
+        parts += [state[state["symbol"].isin(updated)], new]
+    if len(added):
+        new = store.read(symbols=added)
+        new["symbol"] = new["symbol"].astype(str)
+        parts.append(new)
+    df = _coerce_numeric(pd.concat(parts, ignore_index=True))
+    _check_required(df)
+    if "bar_no" not in df.columns:  # 신규 종목만 있는 경우
+        df["bar_no"] = np.nan
+
+    feat = compute_factors(df, extra=INDICATOR_COLS)
+    first_bar = df.groupby("symbol")["bar_no"].min().fillna(1)
+    feat["bar_no"] = (feat["symbol"].map(first_bar)
+                      + feat.groupby("symbol", sort=False).cumcount()).astype("int64")
+
+    # 다시 기록할 행: 직전 마지막 봉 이후 / 신규 종목·MIN_BARS 를 막 넘은 종목은 전체
+    start_bar = feat["symbol"].map(prev_bars).fillna(0)
+    crossed = feat["symbol"].map(prev_bars < MIN_BARS).fillna(True).astype(bool)
+    emit = feat[(feat["bar_no"] >= start_bar) | crossed]
+
+    new_state = pd.concat(
+        [state[~state["symbol"].isin(feat["symbol"].unique())], factor_state(feat, _state_keep())],
+        ignore_index=True,
+    )
+    return emit, new_state
+
+
+def _min_bars_filter(feat: pd.DataFrame) -> pd.DataFrame:
+    return feat[feat["bar_no"].groupby(feat["symbol"]).transform("max") >= MIN_BARS]
+
+
+def _write_parquet_atomic(df: pd.DataFrame, path: Path) -> None:
+    with atomic_write(path) as f:
+        df.to_parquet(f, index=False)
+
+
+def _next_raw_path(run_id: str, tag: str = "") -> Path:
+    """raw 파트 경로: <순번>_<런ID>[태그].parquet (순번으로 정렬 = 기록 순서)."""
+    seq = max((int(p.stem.split("_")[0]) for p in RAW_DIR.glob("*.parquet")), default=0) + 1
+    return RAW_DIR / f"{seq:06d}_{run_id}{tag}.parquet"
+
+
+def _write_raw(df: pd.DataFrame, run_id: str, tag: str = "") -> None:
+    """
+    raw 파트 기록: 날짜 순 정렬 + 작은 row group → 날짜로 읽을 때 해당 row group 만 읽음.
+    전체 재계산 파트는 tag="-full<n>" (병합 대상에서 제외).
+    """
+    with atomic_write(_next_raw_path(run_id, tag)) as f:
+        df.sort_values("date", kind="stable").to_parquet(f, index=False, row_group_size=RAW_ROW_GROUP)
+
+
+def _raw_rows_by_date() -> pd.Series:
+    """raw 의 날짜별 행 수 (date 컬럼만 읽음, 중복 포함)."""
+    parts = sorted(RAW_DIR.glob("*.parquet"))
+    if not parts:
+        return pd.Series(dtype="int64")
+    d = pd.concat([pd.read_parquet(p, columns=["date"])["date"] for p in parts])
+    return d.value_counts().sort_index()
+
+
+def _read_raw(dates=None) -> pd.DataFrame:
+    """
+    raw 파트를 (dates 가 있으면 그 날짜만) 읽어 (symbol, date) 중복은 나중 파트 기준으로 정리.
+    증분 파트가 많으면 하나로 병합 (전체 재계산 파트는 그대로 — 병합해도 메모리 예산을 넘지 않게).
+    """
+    parts = sorted(RAW_DIR.glob("*.parquet"))
+    if not parts:
+        return pd.DataFrame()
+    filters = None
+    if dates is not None:
+        # 구간 조건이라야 row group 통계(min/max)로 건너뜀 → 정확한 날짜는 읽은 뒤 isin
+        dates = pd.DatetimeIndex(dates)
+        filters = [("date", ">=", dates.min()), ("date", "<=", dates.max())]
+    raw = pd.concat([pd.read_parquet(p, filters=filters) for p in parts], ignore_index=True)
+    if dates is not None:
+        raw = raw[raw["date"].isin(dates)]
+    raw = (
+        raw.drop_duplicates(["symbol", "date"], keep="last")
+           .sort_values(["symbol", "date"], kind="stable")
+           .reset_index(drop=True)
     )
+    inc = [p for p in parts if "-full" not in p.stem]
+    if len(inc) > RAW_COMPACT_AT:
+        merged = (pd.concat([pd.read_parquet(p) for p in inc], ignore_index=True)
+                    .drop_duplicates(["symbol", "date"], keep="last"))
+        with atomic_write(inc[-1]) as f:
+            merged.sort_values("date", kind="stable").to_parquet(f, index=False, row_group_size=RAW_ROW_GROUP)
+        for p in inc[:-1]:
+            p.unlink()
+    return raw
+
+
+def _assert_same_raw(got: pd.DataFrame, ref: pd.DataFrame) -> None:
+    cols = ["symbol"] + BASE_COLS + _feature_cols()
+    got = got[cols].reset_index(drop=True)
+    ref = ref[cols].reset_index(drop=True)
+    pd.testing.assert_frame_equal(got[["symbol", "date"]], ref[["symbol", "date"]], check_dtype=False)
+    pd.testing.assert_frame_equal(got, ref, check_exact=False, rtol=VERIFY_RTOL, check_dtype=False)
+    print(f"🔎 증분 결과 검증 통과: {len(got)} 행")
+
+
+def winsorize(df: pd.DataFrame, cols: list[str], p: float = 0.01, by: str = "date") -> pd.DataFrame:
+    """
+    날짜(by)별 단면 p / 1-p 분위수로 클립 (df 를 직접 수정해 반환).
+    모든 컬럼의 분위수를 groupby.quantile 한 번으로 구하고, 한 블록으로 모아 np.clip (컬럼별 전체 복사 없음).
+    """
+    cols = [c for c in cols if c in df.columns]
+    if not cols or df.empty:
+        return df
+    codes, uniq = pd.factorize(df[by], sort=True)
+    x = df[cols].to_numpy(np.float64, copy=True)
+    q = pd.DataFrame(x, columns=cols).groupby(codes).quantile([p, 1 - p])
+    lo = q.xs(p, level=1).reindex(range(len(uniq))).to_numpy()
+    hi = q.xs(1 - p, level=1).reindex(range(len(uniq))).to_numpy()
+    np.clip(x, lo[codes], hi[codes], out=x)
+    df[cols] = x
+    return df
 
-    if "symbol" not in df_feat.columns:
-        raise RuntimeError("팩터 생성 후 'symbol' 컬럼이 존재하지 않습니다.")
-
-    # 4) 심볼 마스터 병합(섹터/시총/밸류 등)
-    sym_path = Path(f"data/raw/kis/symbol_master/{today}.parquet")
-    if sym_path.exists():
-        sm = pd.read_parquet(sym_path)
-        cols = [c for c in ["symbol", "name", "market", "sector", "industry",
-                            "market_cap", "shares", "per", "pbr", "eps", "bps",
-                            "is_kospi200", "is_kosdaq150"] if c in sm.columns]
-        sm = sm[cols].drop_duplicates("symbol")
-        for c in ["market_cap", "shares", "per", "pbr", "eps", "bps"]:
-            if c in sm.columns:
-                sm[c] = _safe_numeric(sm[c])
-        df_feat = df_feat.merge(sm, on="symbol", how="left")
-    else:
+
+def _safe_numeric(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(s):
+        return s
+    return pd.to_numeric(
+        s.astype(str).str.replace(",", "", regex=False).str.strip(),
+        errors="coerce"
+    )
+
+
+def _load_master(today: str) -> pd.DataFrame | None:
+    sm = load_symbol_master(today)
+    if sm is None:
         print("⚠️ symbol_master가 없어 메타 병합 생략")
+    return sm
+
+
+def _finalize(df_feat: pd.DataFrame, sm: pd.DataFrame | None) -> pd.DataFrame:
+    """raw 팩터 → 심볼 마스터 병합 + size/turnover + 날짜별 윈저라이즈 (날짜 단위로 독립)."""
+    df_feat = df_feat[["symbol"] + BASE_COLS + _feature_cols()]
+    if sm is not None:
+        df_feat = df_feat.merge(sm, on="symbol", how="left")
 
     # 파생: size/turnover
     if "market_cap" in df_feat.columns:
@@ -150,7 +365,7 @@ def main():
         df_feat["log_mcap"] = np.nan
         df_feat["turnover"] = np.nan
 
-    # 5) 윈저라이즈
+    # 윈저라이즈 (날짜별 단면 1%/99%)
     clip_cols = [
         "ret_1d", "ret_5d", "ret_20d", "ret_60d", "ret_120d",
         "momentum", "volatility_20d", "volatility_60d",
@@ -159,12 +374,117 @@ def main():
     ]
     df_feat = winsorize(df_feat, clip_cols, p=0.01)
 
-    # 6) 저장
-    outdir = Path("data/proc/features")
-    outdir.mkdir(parents=True, exist_ok=True)
-    outfile = outdir / f"{today}.parquet"
-    df_feat.to_parquet(outfile, index=False)
-    print("✅ Factor 저장 완료:", outfile, "shape:", df_feat.shape)
+    if FLOAT32:
+        f64 = df_feat.select_dtypes("float64").columns
+        df_feat[f64] = df_feat[f64].astype(np.float32)
+    return df_feat
+
+
+def _budget_rows() -> int:
+    return max(int(MEMORY_BUDGET_MB * 2**20 // ROW_BYTES), 1)
+
+
+def _chunks(sizes: pd.Series, limit: int) -> list[list]:
+    """sizes(키 → 행 수)를 순서대로 묶어 묶음당 행 수가 limit 이하가 되도록 (키 하나가 넘으면 단독)."""
+    out, cur, n = [], [], 0
+    for k, v in sizes.items():
+        if cur and n + v > limit:
+            out.append(cur)
+            cur, n = [], 0
+        cur.append(k)
+        n += int(v)
+    if cur:
+        out.append(cur)
+    return out
+
+
+def _build_full_chunked(store: CandleStore, run_id: str) -> pd.DataFrame:
+    """
+    종목 묶음(행 수 합계 ≤ 메모리 예산) 단위로 전체 재계산 → raw 에 바로 기록. 새 상태 반환.
+    팩터는 종목별 시계열 연산이라 묶음 경계와 무관하게 전체 재계산과 같은 값.
+    """
+    batches = _chunks(store.row_counts(), _budget_rows())
+    states = []
+    for i, syms in enumerate(batches, 1):
+        df = _coerce_numeric(store.read(symbols=syms))
+        _check_required(df)
+        df["symbol"] = df["symbol"].astype(str)
+        feat = compute_factors(df, extra=INDICATOR_COLS)
+        del df
+        feat["bar_no"] = feat.groupby("symbol", sort=False).cumcount() + 1
+        if VERIFY_FACTORS:
+            _verify_factors(feat, feat)
+        _write_raw(_min_bars_filter(feat), run_id, f"-full{i}")
+        states.append(factor_state(feat, _state_keep()))
+        print(f"  묶음 {i}/{len(batches)}: {len(syms)} 종목, {len(feat)} 행")
+        del feat
+    return pd.concat(states, ignore_index=True)
+
+
+def main():
+    today = datetime.now().strftime("%Y%m%d")
+    run_id = f"{today}-{datetime.now().strftime('%H%M%S')}"
+    store = CandleStore()
+    if not store.symbols():
+        raise FileNotFoundError(f"일봉 저장소가 비어 있음: {store.root}")
+
+    # 1~3) 팩터 생성: 상태가 있으면 새 봉만, 없으면 전체 재계산 → raw(윈저라이즈 전) 날짜 파티션에 추가
+    state = pd.read_parquet(STATE_PATH) if INCREMENTAL and STATE_PATH.exists() else None
+    touched = None   # 증분: 새로 계산된 행이 있는 날짜 (이 날짜 파티션만 다시 씀) / None: 전체
+    if state is not None:
+        emit, new_state = _build_incremental(store, state)
+        print("증분 계산:", len(emit), "행")
+        emit = _min_bars_filter(emit)
+        touched = pd.DatetimeIndex(emit["date"].unique())
+        if not emit.empty:
+            _write_raw(emit, run_id)
+    if state is None or VERIFY_INCREMENTAL:
+        touched = None
+        if CHUNKED and state is None:
+            shutil.rmtree(RAW_DIR, ignore_errors=True)
+            print(f"전체 재계산 (묶음, 예산 {MEMORY_BUDGET_MB}MB ≈ {_budget_rows():,} 행)")
+            new_state = _build_full_chunked(store, run_id)
+        else:
+            full = _build_full(store)
+            print("전체 재계산:", full.shape)
+            if VERIFY_FACTORS:
+                _verify_factors(full, full)
+            full_raw = _min_bars_filter(full)
+            if state is not None:
+                _assert_same_raw(_read_raw(), full_raw)
+            shutil.rmtree(RAW_DIR, ignore_errors=True)
+            _write_raw(full_raw, run_id, "-full1")
+            new_state = factor_state(full, _state_keep())
+            del full, full_raw
+    # 상태는 raw 기록 후에 교체 → 중간에 죽으면 다음 런이 같은 봉을 다시 계산 (중복은 나중 파일 우선)
+    _write_parquet_atomic(new_state, STATE_PATH)
+
+    # 4~6) 날짜 묶음 단위로 raw → 마스터 병합/파생/윈저라이즈 → 저장
+    #   증분: 바뀐 날짜 파티션만 교체 (윈저라이즈가 날짜 단면 기준이라 다른 날짜 값은 그대로)
+    #   전체: 임시 저장소에 모두 쓴 뒤 한 번에 교체
+    rows = _raw_rows_by_date()
+    if touched is not None:
+        rows = rows[rows.index.isin(touched)]
+        if rows.empty:
+            print("새로 계산된 봉 없음 → 피처 저장소 유지")
+            return
+    elif rows.empty:
+        raise RuntimeError(f"MIN_BARS({MIN_BARS}) 이상인 종목이 없음")
+
+    sm = _load_master(today)
+    fstore = FeatureStore()
+    target = fstore if touched is not None else fstore.staging()
+    limit = _budget_rows() if CHUNKED else int(rows.sum())
+    n_rows, n_cols = 0, 0
+    for dates in _chunks(rows, limit):
+        df_feat = _finalize(_read_raw(dates), sm)
+        target.write(df_feat)
+        n_rows, n_cols = n_rows + len(df_feat), df_feat.shape[1]
+        del df_feat
+    if target is not fstore:
+        fstore.publish(target)
+    print("✅ Factor 저장 완료:", fstore.root, "shape:", (n_rows, n_cols),
+          "| 최신일:", fstore.latest_date().date())
 
 
 if __name__ == "__main__":
@@ -1,61 +1,163 @@
 """
 scripts/run_collect_daily.py
 
-심볼 마스터를 기반으로 최근 1년치 전 종목 일봉 수집 후 저장.
+심볼 마스터를 기반으로 전 종목 일봉을 종목별 증분 저장소(CandleStore)에 수집.
+- 종목별 마지막 저장일 이후 구간만 요청 (신규 종목은 최근 1년)
+- 저장: data/raw/kis_daily/<SYM>/1d/*.parquet (append-only, 종목 단위로 즉시 기록)
+  (받은 즉시 종목 파일로 기록 → 런 전체를 메모리에 모으지 않음, 별도 런 사본은 남기지 않음)
+- ASYNC_MODE=True: asyncio 워커 (appkey 수 × CONCURRENCY_PER_KEY)개로 병렬 수집
+  appkey 별 토큰 버킷(KisClientPool)이 초당 호출 수를 제한하고 요청을 키별로 분산
+  KIS "초당 거래건수 초과" 응답 시 해당 키의 버킷이 속도를 낮추고 해당 종목을 재시도
+- ASYNC_MODE=False: 기존 순차 수집 (같은 풀 사용)
+  (수집 루프/종목 재시도/재시도 라운드는 libs.collect — run_collect_flow 와 공용)
+- 체크포인트: data/raw/kis_daily/_runs/collect_daily_{YYYYMMDD}.json (요청 끝 세션 기준)
+  같은 세션으로 재실행하면 완료 종목은 건너뛰고 실패 종목(재시도 큐)부터 이어서 수집
+  실패 종목은 RETRY_ROUNDS 회까지 런 마지막에 다시 시도
+- 수정주가 이벤트(분할/권리락 등: mod_yn, flng_cls_code, split_ratio 또는 마지막 저장일 종가 불일치)가
+  감지된 종목만 저장된 첫날부터 다시 받아 이력을 교체 → 나머지 종목은 증분 수집 그대로
+  (run_build_features 는 종가가 바뀐 종목의 피처 상태를 버리고 해당 종목만 전체 재계산)
+- 거래일 캘린더(libs.trading_calendar, data/meta/krx_sessions.parquet): 요청 끝은 장이 마감된 마지막 세션
+  (15:30 KST 전에는 전 세션 → 장중 실행이 미마감 부분 봉을 저장하지 않음), 그 세션까지 이미 저장된 종목은 건너뜀
+  → 주말/휴장일(data/meta/krx_holidays.txt)에는 토큰 발급/API 호출 없이 종료
+  요청 끝이 캐시 이후의 추정 세션이면 PROBE_SYMBOL 1건으로 개장 여부 확인 → 목록에 없던 휴장일이면 기록 후 종료
 """
 
-import time
 from datetime import datetime, timedelta
-from pathlib import Path
-
+from functools import partial
 import pandas as pd
 
 from libs.kis_auth import get_or_load_access_token
-from libs.daily_candle import get_daily_candle
+from libs.candle_store import CandleStore
+from libs.collect import collect
+from libs.daily_candle import adjustment_events, get_daily_candle
+from libs.kis_client import get_client
+from libs.run_manifest import RunManifest
+from libs.symbols import MASTER_DIR, load_symbol_master
+from libs.trading_calendar import HOLIDAYS_PATH, add_holiday, update_calendar
+
+# ==== 설정 ====
+ASYNC_MODE = True
+CONCURRENCY_PER_KEY = 8  # appkey 1개당 동시 요청 수 (스레드 워커 수)
+RATE_LIMIT_RETRIES = 5   # 한도 초과 시 종목당 재시도 횟수
+HISTORY_DAYS = 365       # 저장소에 없는 신규 종목의 초기 수집 기간
+RETRY_ROUNDS = 2         # 실패 종목 재시도 라운드 수
+RETRY_WAIT = 10          # 재시도 라운드 전 대기(초)
+CHECK_OVERLAP = True     # 마지막 저장일 봉을 함께 받아 종가 대조 (이벤트 필드가 빠진 수정도 감지)
+PROBE_SYMBOL = "005930"  # 추정 세션의 개장 여부를 확인할 종목 (거래정지 가능성이 낮은 대형주)
+
+
+def _needs_rebackfill(store, sym, df, closed: str) -> bool:
+    """
+    새로 받은 봉에 수정주가 이벤트가 있거나, 다시 받은 마지막 저장일 종가가 저장값과 다르면 True
+    (수정주가 기준 과거 이력이 바뀌었으므로 증분 append 로는 맞출 수 없음).
+    종가 대조는 마지막 저장일이 마감된 세션(closed 이하)일 때만 — 장중 봉은 종가가 계속 바뀜.
+    """
+    last = store.last_date(sym)
+    if last is None or df.empty:
+        return False
+    if adjustment_events(df[df["date"] > last]).any():
+        return True
+    if not CHECK_OVERLAP or last > pd.Timestamp(closed):
+        return False
+    got = df.loc[df["date"] == last, "close"]
+    if got.empty:
+        return False
+    stored = store.read(symbols=[sym], start=last, end=last, columns=["close"])["close"]
+    return stored.empty or int(stored.iloc[-1]) != int(got.iloc[-1])
+
+
+def _fetch_and_store(store, sym, start_date, end_date, client, adjusted=None) -> int:
+    """
+    저장소에 없는 구간만 조회해 append. 기록한 행 수 반환. end_date 는 장이 마감된 마지막 세션.
+    수정주가 이벤트가 감지된 종목은 저장된 첫날부터 다시 받아 이력을 교체 (adjusted 에 기록).
+    """
+    rng = store.missing_range(sym, start_date, end_date, overlap=CHECK_OVERLAP)
+    if rng is None:
+        return 0
+    # access_token 은 넘기지 않음 → 요청마다 토큰 캐시에서 조회 (런 도중 만료돼도 갱신 토큰 사용)
+    df = get_daily_candle(sym, rng[0], rng[1], env="real", client=client)
+    if _needs_rebackfill(store, sym, df, closed=end_date):
+        first = store.first_date(sym).strftime("%Y%m%d")
+        new = store.replace(sym, get_daily_candle(sym, first, end_date, env="real", client=client))
+        if adjusted is not None:
+            adjusted.append(sym)
+    else:
+        new = store.append(sym, df)
+    return len(new)
+
+
+def _confirm_session(cal, end_date: str, client) -> tuple:
+    """
+    end_date 가 캐시된 마지막 세션 이후(평일/휴장일 목록으로 추정한 세션)이면 PROBE_SYMBOL 1건 조회로 확인.
+    봉이 없으면 휴장일로 기록하고 직전 추정 세션으로 반복. (캘린더, 확정된 end_date) 반환.
+    """
+    while cal.last_known is not None and pd.Timestamp(end_date) > cal.last_known:
+        if not get_daily_candle(PROBE_SYMBOL, end_date, end_date, env="real", client=client).empty:
+            break
+        print(f"ℹ️ {end_date} 휴장 (목록에 없던 휴장일) → {HOLIDAYS_PATH} 에 추가")
+        add_holiday(end_date)
+        cal = cal.with_holiday(end_date)
+        end_date = cal.last_session(pd.Timestamp(end_date) - pd.Timedelta(days=1)).strftime("%Y%m%d")
+    return cal, end_date
 
 
 def main():
     today = datetime.now().strftime("%Y%m%d")
-    access_token = get_or_load_access_token(env="real")
 
-    # 1) 심볼 마스터 로드
-    master_path = Path(f"data/raw/kis/symbol_master/{today}.parquet")
-    if not master_path.exists():
-        raise FileNotFoundError(f"심볼 마스터 파일 없음: {master_path}")
-    df_symbols = pd.read_parquet(master_path)
+    # 1) 심볼 마스터 로드 (오늘 이하 마지막 스냅샷, 네트워크 없음)
+    df_symbols = load_symbol_master(today)
+    if df_symbols is None:
+        raise FileNotFoundError(f"심볼 마스터 스냅샷 없음: {MASTER_DIR} (python -m libs.symbols 로 생성)")
     symbols = df_symbols["symbol"].tolist()
-    print(f"총 {len(symbols)} 종목 대상 수집")
-
-    # 2) 조회 기간: 최근 1년
-    end_date = today
-    start_date = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
-
-    # 3) 수집 루프
-    all_rows = []
-    for i, sym in enumerate(symbols, 1):
-        try:
-            df = get_daily_candle(sym, start_date, end_date, access_token, env="real")
-            if not df.empty:
-                all_rows.append(df)
-        except Exception as e:
-            print(f"⚠️ {sym} 실패:", e)
-
-        if i % 50 == 0:
-            print(f"진행률: {i}/{len(symbols)}")
-            time.sleep(1)
-
-    if not all_rows:
-        print("⚠️ 수집된 데이터 없음")
+
+    # 2) 조회 기간: 저장소 마지막 날짜 이후 ~ 장 마감된 마지막 세션 (신규 종목은 최근 1년)
+    #    이미 그 세션까지 받은 종목은 API 를 부르지 않음 (주말/휴장일이면 대부분 종료)
+    store = CandleStore()
+    cal = update_calendar(store)
+    end_date = cal.last_closed_session().strftime("%Y%m%d")
+    start_date = (datetime.now() - timedelta(days=HISTORY_DAYS)).strftime("%Y%m%d")
+    last = store.last_dates(symbols)
+
+    def _need(end):
+        return set(last.index[last.isna() | (last < pd.Timestamp(end))])
+
+    need = _need(end_date)
+    if need:
+        get_or_load_access_token(env="real")  # 토큰 캐시 준비 (이후 요청은 메모리에서 조회)
+        client = get_client("real")
+        # 추정 세션(캐시 이후)이면 1건 조회로 개장 여부 확인 → 목록에 없던 휴장일이면 전 종목 호출 없이 종료
+        cal, end_date = _confirm_session(cal, end_date, client)
+        need = _need(end_date)
+    if not need:
+        print(f"✅ 수집할 구간 없음 (마감된 마지막 세션 {end_date}{', 오늘 휴장' if not cal.is_session(today) else ''})")
         return
 
-    df_all = pd.concat(all_rows, ignore_index=True)
+    # 3) 체크포인트: 같은 세션까지 완료한 종목은 건너뜀, 실패 종목 먼저
+    #    (장중 런은 전 세션 기준 → 마감 후 재실행하면 새 세션으로 다시 수집)
+    manifest = RunManifest.for_run("collect_daily", end_date)
+    todo = [s for s in manifest.pending(symbols) if str(s).zfill(6) in need]
+    print(f"총 {len(symbols)} 종목 중 {len(todo)} 종목 수집 ~{end_date} "
+          f"(완료 {len(manifest.done)}, 재시도 대기 {len(manifest.failed)})")
+
+    # 4) 수집 + 종목별 증분 저장 (appkey 별 토큰 버킷으로 초당 호출 수 제한)
+    print(f"appkey {len(client)}개 사용: {client}")
+    adjusted: list[str] = []
+    fetch = partial(_fetch_and_store, store, start_date=start_date, end_date=end_date, client=client,
+                    adjusted=adjusted)
+    n_rows = collect(todo, fetch, manifest, client, async_mode=ASYNC_MODE, retry_rounds=RETRY_ROUNDS,
+                     retry_wait=RETRY_WAIT, concurrency_per_key=CONCURRENCY_PER_KEY,
+                     rate_retries=RATE_LIMIT_RETRIES)
 
-    # 4) 저장
-    outdir = Path("data/raw/kis/daily")
-    outdir.mkdir(parents=True, exist_ok=True)
-    outfile = outdir / f"{today}.parquet"
-    df_all.to_parquet(outfile, index=False)
-    print("✅ 저장 완료:", outfile, "행 개수:", len(df_all))
+    update_calendar(store)  # 새 세션 반영
+    if adjusted:
+        print(f"🔁 수정주가 이벤트로 이력 재수집: {len(adjusted)} 종목 ({', '.join(sorted(adjusted)[:10])}"
+              f"{' 외' if len(adjusted) > 10 else ''})")
+    if manifest.failed:
+        print(f"⚠️ 실패 {len(manifest.failed)} 종목 (재실행 시 우선 수집): {manifest.path}")
+    if not n_rows:
+        print("⚠️ 신규 데이터 없음")
+        return
+    print("✅ 저장 완료:", store.root, "신규 행 개수:", n_rows)
 
 
 if __name__ == "__main__":
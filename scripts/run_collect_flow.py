@@ -0,0 +1,78 @@
+"""
+scripts/run_collect_flow.py
+
+심볼 마스터 전 종목의 투자자 매매동향(일별)을 종목별 증분 저장소(CandleStore, freq="flow")에 수집.
+- 종목별 마지막 저장일 이후 구간만 요청 (신규 종목은 최근 HISTORY_DAYS 일)
+- 요청 끝은 장이 마감된 마지막 세션 (libs.trading_calendar 캐시, 15:30 KST 전에는 전 세션 → 장중 부분 집계를 저장하지 않음)
+- 저장: data/raw/kis_daily/<SYM>/flow/*.parquet (append-only, 종목 단위로 즉시 기록)
+- 병렬 수집/재시도/체크포인트는 run_collect_daily 와 동일 (수집 루프는 libs.collect)
+  (appkey 별 토큰 버킷으로 초당 호출 수 제한, 체크포인트 data/raw/kis_daily/_runs/collect_flow_{YYYYMMDD}.json — 요청 끝 세션 기준)
+- 집단 내부 비율은 저장하지 않음 → 필요할 때 libs.investor_flow.flow_ratios(store.read(...)) 로 전체 한 번에 계산
+"""
+
+from datetime import datetime, timedelta
+from functools import partial
+
+from libs.collect import collect
+from libs.investor_flow import flow_store, get_investor_flow
+from libs.kis_auth import get_or_load_access_token
+from libs.kis_client import get_client
+from libs.run_manifest import RunManifest
+from libs.symbols import MASTER_DIR, load_symbol_master
+from libs.trading_calendar import TradingCalendar
+
+# ==== 설정 ====
+ASYNC_MODE = True
+HISTORY_DAYS = 365       # 저장소에 없는 신규 종목의 초기 수집 기간
+RETRY_ROUNDS = 2         # 실패 종목 재시도 라운드 수
+RETRY_WAIT = 10          # 재시도 라운드 전 대기(초)
+
+
+def _fetch_and_store(store, sym, start_date, end_date, client) -> int:
+    """저장소에 없는 구간만 조회해 append. 기록한 행 수 반환."""
+    rng = store.missing_range(sym, start_date, end_date)
+    if rng is None:
+        return 0
+    df = get_investor_flow(sym, rng[0], rng[1], env="real", client=client)
+    return len(store.append(sym, df))
+
+
+def main():
+    today = datetime.now().strftime("%Y%m%d")
+
+    # 1) 심볼 마스터 로드 (오늘 이하 마지막 스냅샷, 네트워크 없음)
+    df_symbols = load_symbol_master(today)
+    if df_symbols is None:
+        raise FileNotFoundError(f"심볼 마스터 스냅샷 없음: {MASTER_DIR} (python -m libs.symbols 로 생성)")
+    symbols = df_symbols["symbol"].tolist()
+
+    # 2) 요청 끝(장 마감된 마지막 세션) + 체크포인트
+    end_date = TradingCalendar.load().last_closed_session().strftime("%Y%m%d")
+    manifest = RunManifest.for_run("collect_flow", end_date)
+    todo = manifest.pending(symbols)
+    print(f"총 {len(symbols)} 종목 중 {len(todo)} 종목 수집 ~{end_date} "
+          f"(완료 {len(manifest.done)}, 재시도 대기 {len(manifest.failed)})")
+    if not todo:
+        print(f"✅ 수집할 종목 없음 (마감된 마지막 세션 {end_date})")
+        return
+
+    # 3) 수집 + 종목별 증분 저장 (수집할 종목이 있을 때만 토큰 준비)
+    get_or_load_access_token(env="real")
+    start_date = (datetime.now() - timedelta(days=HISTORY_DAYS)).strftime("%Y%m%d")
+    store = flow_store()
+    client = get_client("real")
+    print(f"appkey {len(client)}개 사용: {client}")
+    fetch = partial(_fetch_and_store, store, start_date=start_date, end_date=end_date, client=client)
+    n_rows = collect(todo, fetch, manifest, client, async_mode=ASYNC_MODE, retry_rounds=RETRY_ROUNDS,
+                     retry_wait=RETRY_WAIT)
+
+    if manifest.failed:
+        print(f"⚠️ 실패 {len(manifest.failed)} 종목 (재실행 시 우선 수집): {manifest.path}")
+    if not n_rows:
+        print("⚠️ 신규 데이터 없음")
+        return
+    print("✅ 저장 완료:", store.root, f"({store.freq})", "신규 행 개수:", n_rows)
+
+
+if __name__ == "__main__":
+    main()
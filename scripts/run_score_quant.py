@@ -2,88 +2,59 @@
 scripts/run_score_quant.py
 
 유니버스 필터(지수편입 or 시총 상위) → 섹터키 생성(sector→industry→market→symbol) →
-섹터별 Top K(기본 5) → 전체 재정렬 후 Top 50 → 가중치(inv-vol × liq)
+섹터별 Top K(기본 5) → 전체 재정렬 후 Top 50 (섹터 캡, 직전 선정 대비 회전율 제한) → 가중치(inv-vol × liq)
 + KONEX 제외 옵션
 + 팩터 익스포저 진단 출력
 
 입력:
-  data/proc/features/{YYYYMMDD}.parquet
-출력:
+  data/proc/feature_store/dt={YYYYMMDD}/  (최신 날짜 파티션의 필요한 컬럼만 로드)
+  data/proc/selection/{직전일}_top50.parquet  (MAX_TURNOVER 사용 시 기준일 이전의 가장 최근 선정)
+출력 (YYYYMMDD = 스코어링 기준일: AS_OF 또는 피처 저장소 최신 날짜):
   data/proc/selection/{YYYYMMDD}_top50.parquet
   data/proc/selection/{YYYYMMDD}_top50.csv
 """
 
 from __future__ import annotations
 
-from datetime import datetime
 from pathlib import Path
 
-import numpy as np
 import pandas as pd
 
+from libs.feature_store import FeatureStore
+from libs.scoring import FACTOR_COLS, SCORE_WEIGHTS, compute_scores
+from libs.risk import update_risk_model
+from libs.selection import (RISK_METHODS, assign_weights, build_portfolios as _build_portfolios, select_top_n,
+                            universe_mask)
+
 # ==== 설정 ====
 TOP_N = 50
 SECTOR_TOP_K = 5      # 섹터별 사전 선별 개수
-SECTOR_CAP = 10       # (옵션) 최종 섹터 캡을 유지하고 싶으면 사용, 아니면 상향 조절/미사용
+SECTOR_CAP = None     # 최종 포트폴리오 섹터당 최대 종목 수 (예: 10, None 이면 미사용)
+MAX_TURNOVER = None   # 직전 선정 대비 신규 편입 비율 상한 (예: 0.3 → TOP_N 의 30% 까지 교체, None 이면 미사용)
 LIQUIDITY_CUTOFF_PCT = 0.20
-WEIGHTING_METHOD = "inv_vol_liq"  # "equal" | "inv_vol" | "inv_vol_liq"
+WEIGHTING_METHOD = "inv_vol_liq"  # "equal" | "inv_vol" | "inv_vol_liq" | "min_var" | "risk_parity"
 MAX_WEIGHT_CAP = 0.05
 EXCLUDE_KONEX = True  # KONEX 제외
 USE_INDEX_IF_AVAILABLE = True     # KOSPI200/KOSDAQ150 있으면 우선 사용
-# TODAY = datetime.now().strftime("%Y%m%d")
-TODAY = 20250923
-
-# 사용할 팩터 컬럼
-FACTOR_COLS = {
-    "momentum": "ret_60d",          # 또는 "momentum"
-    "volatility": "volatility_20d",
-    "liquidity": "value_traded",
-    "size": "log_mcap",
-    "turnover": "turnover",
-    "value_per": "per",
-    "value_pbr": "pbr",
-}
-
-
-def _safe_numeric(series: pd.Series) -> pd.Series:
-    return pd.to_numeric(series, errors="coerce")
-
-
-def _zscore(s: pd.Series) -> pd.Series:
-    s = _safe_numeric(s)
-    mu = s.mean()
-    sigma = s.std(ddof=0)
-    if not np.isfinite(sigma) or sigma == 0:
-        return pd.Series(np.zeros(len(s)), index=s.index)
-    return (s - mu) / sigma
-
-
-def _build_sector_key(cs: pd.DataFrame) -> pd.Series:
-    # 섹터 결측 보정: sector -> industry -> market -> symbol
-    s = cs.get("sector")
-    if s is None or s.isna().all():
-        s = cs.get("industry")
-    if s is None or s.isna().all():
-        s = cs.get("market")
-    if s is None:
-        return cs["symbol"].astype(str)
-    s = s.copy()
-    mask_na = s.isna() | (s.astype(str).str.strip() == "")
-    s.loc[mask_na] = cs.loc[mask_na, "symbol"].astype(str)
-    return s.astype(str)
-
-
-def _zscore_by_sector_with_key(df: pd.DataFrame, col: str, sector_key: pd.Series) -> pd.Series:
-    tmp = df[[col]].copy()
-    tmp["_sec"] = sector_key.values
-    return tmp.groupby("_sec")[col].transform(_zscore)
+AS_OF = None  # 스코어링 기준일 (YYYYMMDD). None 이면 피처 저장소의 최신 날짜 — 출력 파일명/직전 선정 기준도 이 날짜
+
+# 피처 저장소에서 읽을 컬럼 (유니버스/섹터키/스코어/가중치/출력에 쓰는 것만)
+LOAD_COLS = list(dict.fromkeys([
+    "date", "symbol", "name", "market", "sector", "industry",
+    "is_kospi200", "is_kosdaq150", "market_cap",
+    "close", "volume", "value", "volatility_20d", "volatility_60d",
+    *FACTOR_COLS.values(),
+]))
 
 
 def _load_features() -> pd.DataFrame:
-    path = Path(f"data/proc/features/{TODAY}.parquet")
-    if not path.exists():
-        raise FileNotFoundError(f"features 파일 없음: {path}")
-    df = pd.read_parquet(path)
+    store = FeatureStore()
+    date = AS_OF or store.latest_date()
+    if date is None:
+        raise FileNotFoundError(f"피처 저장소 비어 있음: {store.root}")
+    df = store.read(date=date, columns=LOAD_COLS)
+    if df.empty:
+        raise FileNotFoundError(f"{store.root} 에 {date} 피처 없음")
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
     return df
 
@@ -100,149 +71,60 @@ def _apply_universe(cs: pd.DataFrame) -> pd.DataFrame:
     2순위: (없으면) 시총 상위 50%
     + 유동성 컷(하위 20% 제거)
     + KONEX 제외(옵션)
+    여러 날짜가 섞여 있으면 날짜별로 적용.
     """
-    base = cs.copy()
-
-    # 지수편입 사용
-    if USE_INDEX_IF_AVAILABLE and ("is_kospi200" in base.columns or "is_kosdaq150" in base.columns):
-        mask = False
-        if "is_kospi200" in base.columns:
-            mask = mask | base["is_kospi200"].fillna(False)
-        if "is_kosdaq150" in base.columns:
-            mask = mask | base["is_kosdaq150"].fillna(False)
-        chosen = base[mask].copy()
-        if len(chosen) >= TOP_N:
-            base = chosen
-
-    # 시총 상위 50%
-    if "market_cap" in base.columns and len(base) > TOP_N:
-        q = base["market_cap"].quantile(0.50)
-        base = base[base["market_cap"] >= q].copy()
-
-    # 유동성 하위 20% 컷 (value_traded는 log of 20d mean value)
-    if "value_traded" in base.columns and len(base) > TOP_N:
-        ql = base["value_traded"].quantile(LIQUIDITY_CUTOFF_PCT)
-        base = base[base["value_traded"] >= ql].copy()
-
-    # KONEX 제외
-    if EXCLUDE_KONEX and "market" in base.columns:
-        base = base[base["market"] != "KONEX"].copy()
-
-    return base
+    mask = universe_mask(cs, TOP_N, liquidity_cutoff=LIQUIDITY_CUTOFF_PCT,
+                         exclude_konex=EXCLUDE_KONEX, use_index=USE_INDEX_IF_AVAILABLE)
+    return cs[mask].copy()
 
 
 def _compute_score(cs: pd.DataFrame) -> pd.DataFrame:
-    # 최소 팩터 체크
-    need = []
-    for k in ["momentum", "volatility", "liquidity", "size"]:
-        if FACTOR_COLS[k] in cs.columns:
-            need.append(FACTOR_COLS[k])
-    if len(need) < 3:
-        raise ValueError(f"필요 팩터 부족. 존재: {[c for c in FACTOR_COLS.values() if c in cs.columns]}")
-
-    # 섹터 키 생성
-    sector_key = _build_sector_key(cs)
-
-    # 섹터 중립 z-score
-    z = {}
-    if FACTOR_COLS["momentum"] in cs.columns:
-        z["mom"] = _zscore_by_sector_with_key(cs, FACTOR_COLS["momentum"], sector_key)
-    if FACTOR_COLS["liquidity"] in cs.columns:
-        z["liq"] = _zscore_by_sector_with_key(cs, FACTOR_COLS["liquidity"], sector_key)
-    if FACTOR_COLS["size"] in cs.columns:
-        z["size"] = _zscore_by_sector_with_key(cs, FACTOR_COLS["size"], sector_key)
-    if FACTOR_COLS["volatility"] in cs.columns:
-        z["lvol"] = -_zscore_by_sector_with_key(cs, FACTOR_COLS["volatility"], sector_key)
-    if FACTOR_COLS.get("value_per") in cs.columns:
-        z["val_per"] = -_zscore_by_sector_with_key(cs, FACTOR_COLS["value_per"], sector_key)
-    if FACTOR_COLS.get("value_pbr") in cs.columns:
-        z["val_pbr"] = -_zscore_by_sector_with_key(cs, FACTOR_COLS["value_pbr"], sector_key)
-
-    zdf = pd.DataFrame(z, index=cs.index).fillna(0.0)
-
-    # 가중치
-    weights = {"mom": 0.30, "lvol": 0.25, "liq": 0.20, "size": 0.15, "val_per": 0.05, "val_pbr": 0.05}
-    use_keys = [k for k in weights.keys() if k in zdf.columns]
-    w_sum = sum(weights[k] for k in use_keys)
-    for k in use_keys:
-        zdf[k] = zdf[k] * (weights[k] / w_sum)
-
-    cs = cs.copy()
-    cs["score"] = zdf[use_keys].sum(axis=1)
-    cs["sector_key"] = sector_key.values
-    return cs
+    # 섹터 중립 z-score 가중합 (libs.scoring — 여러 날짜를 한 번에 넣어도 날짜별 단면 기준으로 계산)
+    return compute_scores(cs, FACTOR_COLS, SCORE_WEIGHTS)
 
 
-def _sector_top_k(cs: pd.DataFrame, k: int, sector_col: str = "sector_key") -> pd.DataFrame:
-    """섹터별로 score 상위 k개 선별."""
-    if sector_col not in cs.columns:
-        cs["sector_key"] = _build_sector_key(cs)
-        sector_col = "sector_key"
-    # 각 섹터 내 정렬 후 head(k)
-    out = (
-        cs.sort_values(["sector_key", "score"], ascending=[True, False])
-          .groupby(sector_col, group_keys=False)
-          .head(k)
-          .copy()
-    )
-    return out
-
-
-def _final_top_n(after_sector_pick: pd.DataFrame, n: int) -> pd.DataFrame:
-    """섹터별 선별 후 전체 재정렬 → 상위 n개. 부족하면 전체 후보에서 추가 보충."""
-    # 1) 섹터별 top-k 묶음을 전체 정렬
-    ranked = after_sector_pick.sort_values("score", ascending=False).copy()
-
-    # 2) 상위 n컷
-    if len(ranked) >= n:
-        out = ranked.head(n).copy()
-    else:
-        # 보충: 원본 풀에서 빠진 것 중 상위 추가
-        need = n - len(ranked)
-        # 전체 후보 풀은 섹터 선별 이전 전체 (여기선 after_sector_pick의 원본이 없으므로 컬럼 보유용)
-        # 함수 호출부에서 원본 scored를 전달해 보충
-        raise RuntimeError("internal: _final_top_n는 scored 원본을 함께 사용하세요.")
-    out["rank"] = np.arange(1, len(out) + 1)
-    return out
+def _assign_weights(df_top: pd.DataFrame) -> pd.DataFrame:
+    model = None
+    if WEIGHTING_METHOD in RISK_METHODS:
+        # 공분산: data/proc/risk/ 캐시 + 새 날짜 종가만 반영
+        model = update_risk_model(FeatureStore(), end=AS_OF)
+        print(f"리스크 모델: {len(model.symbols)} 종목, 기준일 {model.last_date:%Y-%m-%d}")
+    return assign_weights(df_top, WEIGHTING_METHOD, MAX_WEIGHT_CAP, risk_model=model)
+
+
+def strategy_params() -> dict:
+    """현재 설정값 → libs.selection.build_portfolios 인자 (백테스트/파라미터 스윕의 기준값)."""
+    return {
+        "top_n": TOP_N,
+        "sector_top_k": SECTOR_TOP_K,
+        "liquidity_cutoff": LIQUIDITY_CUTOFF_PCT,
+        "exclude_konex": EXCLUDE_KONEX,
+        "use_index": USE_INDEX_IF_AVAILABLE,
+        "factor_cols": dict(FACTOR_COLS),
+        "score_weights": dict(SCORE_WEIGHTS),
+        "weighting_method": WEIGHTING_METHOD,
+        "max_weight_cap": MAX_WEIGHT_CAP,
+        "sector_cap": SECTOR_CAP,
+        "max_turnover": MAX_TURNOVER,
+    }
+
+
+def build_portfolios(df: pd.DataFrame, returns: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    피처 단면(여러 날짜 가능) → 날짜별 Top-N + 가중치.
+    main 과 같은 파이프라인 (유니버스 → 스코어 → 섹터별 Top-K → Top-N → 가중치), 백테스트에서 사용.
+    returns: 일수익률 행렬 (WEIGHTING_METHOD 가 min_var / risk_parity 일 때 날짜별 공분산 계산에 사용)
+    """
+    return _build_portfolios(df, **strategy_params(), returns=returns)
 
 
-def _assign_weights(df_top: pd.DataFrame) -> pd.DataFrame:
-    out = df_top.copy()
-
-    if WEIGHTING_METHOD == "equal":
-        out["weight"] = 1.0 / len(out)
-        return out
-
-    # 변동성 열
-    vol_col = "volatility_60d" if "volatility_60d" in out.columns else "volatility_20d"
-    vol = _safe_numeric(out.get(vol_col, np.nan)).replace(0, np.nan)
-
-    if WEIGHTING_METHOD in ["inv_vol", "inv_vol_liq"]:
-        inv = 1.0 / vol
-        inv = inv.fillna(inv.median())
-
-        if WEIGHTING_METHOD == "inv_vol":
-            raw = inv
-        else:
-            liq = _safe_numeric(out.get("value_traded", np.nan))
-            if np.isfinite(liq.std(ddof=0)) and liq.std(ddof=0) > 0:
-                liq_z = (liq - liq.mean()) / liq.std(ddof=0)
-                liq_scale = (liq_z - np.nanmin(liq_z))
-                if np.nanmax(liq_scale) > 0:
-                    liq_scale = liq_scale / np.nanmax(liq_scale)
-            else:
-                liq_scale = pd.Series(0.0, index=liq.index)
-            raw = inv * (1 + liq_scale)
-
-        w = raw / raw.sum()
-        if MAX_WEIGHT_CAP:
-            w = w.clip(upper=MAX_WEIGHT_CAP)
-            w = w / w.sum()
-        out["weight"] = w.values
-        return out
-
-    out["weight"] = 1.0 / len(out)
-    return out
+def _load_previous_selection(outdir: Path, run_date: str) -> list[str] | None:
+    """run_date(스코어링 기준일) 이전의 가장 최근 선정 파일 종목 목록 (없으면 None)."""
+    prev = sorted(p for p in outdir.glob(f"*_top{TOP_N}.parquet") if p.name.split("_")[0] < run_date)
+    if not prev:
+        return None
+    print(f"직전 선정: {prev[-1]}")
+    return pd.read_parquet(prev[-1], columns=["symbol"])["symbol"].astype(str).tolist()
 
 
 def _exposure_summary(df: pd.DataFrame) -> pd.DataFrame:
@@ -267,6 +149,7 @@ def main():
 
     # 최신 단면
     cs = _latest_cross_section(df_feat)
+    run_date = cs["date"].max().strftime("%Y%m%d")   # 출력 파일명/직전 선정 기준 = 스코어링 기준일
 
     # 진단
     if "sector" in cs.columns:
@@ -294,38 +177,16 @@ def main():
         print("\n섹터키 상위 분포:")
         print(scored["sector_key"].value_counts().head(10))
 
-    # 섹터별 Top-K 선별
-    sector_picks = _sector_top_k(scored, k=SECTOR_TOP_K, sector_col="sector_key")
-
-    # 전체 재정렬 후 Top-N (부족분 보충 포함)
-    # 1) 우선 섹터별 picks에서 상위 정렬
-    ranked = sector_picks.sort_values("score", ascending=False).copy()
-
-    # 2) 부족하면 scored 전체에서 보충
-    if len(ranked) < TOP_N:
-        need = TOP_N - len(ranked)
-        remain = scored.loc[~scored["symbol"].isin(ranked["symbol"])].sort_values("score", ascending=False)
-        ranked = pd.concat([ranked, remain.head(need)], ignore_index=True)
-
-    # (옵션) 최종 섹터 캡도 적용하고 싶으면 아래 블록 주석 해제
-    # ranked = ranked.sort_values("score", ascending=False).copy()
-    # if "sector_key" not in ranked.columns:
-    #     ranked["sector_key"] = _build_sector_key(ranked)
-    # final_idx = []
-    # counts = {}
-    # for idx, row in ranked.iterrows():
-    #     sec = str(row["sector_key"])
-    #     counts.setdefault(sec, 0)
-    #     if counts[sec] < SECTOR_CAP:
-        #         final_idx.append(idx)
-        #         counts[sec] += 1
-        #     if len(final_idx) >= TOP_N:
-        #         break
-    # ranked = ranked.loc[final_idx].copy()
-
-    # Top-N 확정 및 랭크
-    port = ranked.sort_values("score", ascending=False).head(TOP_N).copy()
-    port["rank"] = np.arange(1, len(port) + 1)
+    # 섹터별 Top-K 선별 → 전체 재정렬 후 Top-N (부족하면 섹터 선별 밖에서 score 순 보충) + 랭크
+    # 섹터 캡 / 직전 선정 대비 회전율 제한 포함
+    outdir = Path("data/proc/selection")
+    prev = _load_previous_selection(outdir, run_date) if MAX_TURNOVER is not None else None
+    port = select_top_n(scored, TOP_N, SECTOR_TOP_K, SECTOR_CAP, MAX_TURNOVER, prev)
+    if len(port) < TOP_N:
+        print(f"⚠️ 선정 종목 {len(port)} < TOP_N {TOP_N} (섹터 캡/유니버스 부족)")
+    if prev is not None:
+        n_new = int((~port["symbol"].astype(str).isin(prev)).sum())
+        print(f"신규 편입 {n_new}개 / 편출 {len(set(prev) - set(port['symbol'].astype(str)))}개")
 
     # 가중치
     port = _assign_weights(port)
@@ -337,10 +198,9 @@ def main():
                 "value_traded", "per", "pbr", "sector_key"]
     df_out = port[[c for c in cols_out if c in port.columns]].reset_index(drop=True)
 
-    outdir = Path("data/proc/selection")
     outdir.mkdir(parents=True, exist_ok=True)
-    p_path = outdir / f"{TODAY}_top{TOP_N}.parquet"
-    c_path = outdir / f"{TODAY}_top{TOP_N}.csv"
+    p_path = outdir / f"{run_date}_top{TOP_N}.parquet"
+    c_path = outdir / f"{run_date}_top{TOP_N}.csv"
     df_out.to_parquet(p_path, index=False)
     df_out.to_csv(c_path, index=False, encoding="utf-8-sig")
 
@@ -0,0 +1,98 @@
+"""
+scripts/run_sweep.py
+
+run_score_quant 설정값(TOP_N, SECTOR_TOP_K, LIQUIDITY_CUTOFF_PCT, WEIGHTING_METHOD,
+MAX_WEIGHT_CAP, 스코어 가중치, FACTOR_COLS)의 조합을 백테스트로 일괄 평가.
+
+- MODE="grid": SPACE 전체 조합 / MODE="random": SPACE 에서 N_RANDOM 개 무작위 추출
+- SPACE 에 없는 파라미터는 run_score_quant 의 현재 설정값 사용
+- 피처 패널(리밸런스일 단면)과 일수익률을 한 번만 읽어 메모리 맵으로 워커들이 공유
+
+입력:
+  data/proc/feature_store/dt=*/
+출력:
+  data/proc/sweep/{YYYYMMDD_HHMMSS}_{MODE}.parquet / .csv   설정별 성과 테이블
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from libs.backtest import daily_returns, rebalance_dates
+from libs.feature_store import FeatureStore
+from libs.scoring import SCORE_WEIGHTS
+from libs.sweep import SWEEP_DIR, grid, random_search, run_sweep
+from scripts.run_score_quant import LOAD_COLS, strategy_params
+
+# ==== 설정 ====
+MODE = "grid"          # "grid" | "random"
+N_RANDOM = 200         # MODE="random" 일 때 설정 개수
+SEED = 0
+N_WORKERS = os.cpu_count()
+START = None           # YYYYMMDD
+END = None
+REBALANCE = "M"        # "D" | "W" | "M" | "Q" | 정수 N
+COST_BPS = 15
+SORT_BY = "sharpe"
+
+SPACE = {
+    "top_n": [30, 50, 80],
+    "sector_top_k": [3, 5, 8],
+    "liquidity_cutoff": [0.10, 0.20, 0.30],
+    "weighting_method": ["equal", "inv_vol", "inv_vol_liq"],
+    "max_weight_cap": [0.05, 0.08],
+    "factor_cols": [{"momentum": "ret_60d"}, {"momentum": "momentum"}],
+    "score_weights": [
+        SCORE_WEIGHTS,
+        {"mom": 0.45, "lvol": 0.20, "liq": 0.15, "size": 0.10, "val_per": 0.05, "val_pbr": 0.05},
+    ],
+}
+
+
+def main():
+    store = FeatureStore()
+    dates = pd.DatetimeIndex(store.dates())
+    if START:
+        dates = dates[dates >= pd.Timestamp(START)]
+    if END:
+        dates = dates[dates <= pd.Timestamp(END)]
+    if len(dates) < 2:
+        raise RuntimeError(f"스윕할 피처 날짜 부족: {len(dates)}")
+
+    configs = grid(SPACE) if MODE == "grid" else random_search(SPACE, N_RANDOM, SEED)
+    print(f"설정 {len(configs)}개 ({MODE}), 워커 {N_WORKERS}개")
+
+    # 스윕에서 쓰일 수 있는 팩터 컬럼까지 포함해 한 번만 로드
+    extra = [c for fc in SPACE.get("factor_cols", []) for c in fc.values()]
+    reb = rebalance_dates(dates, REBALANCE)
+    panel = store.read(dates=reb, columns=LOAD_COLS + extra)
+    prices = store.read(start=dates[0], end=dates[-1], columns=["date", "symbol", "close"])
+    returns = daily_returns(prices)
+    del prices
+    print(f"패널 {panel.shape} (리밸런스 {len(reb)}회), 수익률 행렬 {returns.shape}")
+
+    table = run_sweep(panel, returns, configs, base=strategy_params(),
+                      n_workers=N_WORKERS, cost_bps=COST_BPS)
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    outdir = Path(SWEEP_DIR)
+    outdir.mkdir(parents=True, exist_ok=True)
+    p_path = outdir / f"{stamp}_{MODE}.parquet"
+    c_path = outdir / f"{stamp}_{MODE}.csv"
+    table.to_parquet(p_path, index=False)
+    table.to_csv(c_path, index=False, encoding="utf-8-sig")
+
+    if "error" in table.columns and table["error"].notna().any():
+        print(f"⚠️ 실패 {table['error'].notna().sum()} 설정 (error 컬럼 참고)")
+    if SORT_BY in table.columns:
+        print(f"\n상위 10개 ({SORT_BY} 기준):")
+        print(table.sort_values(SORT_BY, ascending=False).head(10).to_string(index=False))
+    print(f"\n✅ 저장 완료:\n - {p_path}\n - {c_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 저장소 루트를 import 경로에 추가 → `pytest` 로 실행해도 libs 를 찾음
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,60 @@
+"""libs.risk 상한 단체 투영 / 최소분산 가중치 회귀 테스트."""
+
+import numpy as np
+import pytest
+
+from libs.risk import min_variance, project_capped_simplex
+
+
+def _check_feasible(w: np.ndarray, cap: float, total: float = 1.0) -> None:
+    n = len(w)
+    assert np.isfinite(w).all()
+    assert w.min() >= -1e-12
+    assert w.max() <= max(cap, total / n) + 1e-12
+    assert w.sum() == pytest.approx(total, abs=1e-9)
+
+
+@pytest.mark.parametrize("n", [6, 7, 13, 14, 15, 19])
+def test_min_variance_cap_below_equal_weight(n):
+    # n·cap < 1 → 상한 완화, 동일가중
+    rng = np.random.default_rng(n)
+    a = rng.normal(size=(n, n))
+    S = a @ a.T + np.eye(n)
+    w = min_variance(S, 0.05)
+    np.testing.assert_allclose(w, np.full(n, 1.0 / n))
+
+
+@pytest.mark.parametrize("n", range(1, 41))
+def test_projection_cap_below_equal_weight(n):
+    v = np.random.default_rng(n).normal(size=n)
+    w = project_capped_simplex(v, 0.05)
+    if n * 0.05 <= 1.0:
+        np.testing.assert_allclose(w, np.full(n, 1.0 / n))
+    _check_feasible(w, 0.05)
+
+
+@pytest.mark.parametrize("n", [3, 7, 10, 20, 25, 33, 50])
+@pytest.mark.parametrize("eps", [-1e-15, 0.0, 1e-15, 1e-12])
+def test_projection_cap_at_equal_weight_boundary(n, eps):
+    # n·cap ≈ 1: 반올림 오차로 상한 합이 1 을 아주 조금 넘거나 못 미치는 경우
+    cap = 1.0 / n + eps
+    rng = np.random.default_rng(n)
+    for _ in range(20):
+        w = project_capped_simplex(rng.normal(size=n), cap)
+        _check_feasible(w, cap)
+        np.testing.assert_allclose(w, np.full(n, 1.0 / n), atol=1e-9)
+
+
+def test_projection_matches_unconstrained_when_cap_inactive():
+    v = np.array([0.5, 0.3, 0.2])
+    np.testing.assert_allclose(project_capped_simplex(v, 1.0), v)
+    np.testing.assert_allclose(project_capped_simplex(v + 1.0, 1.0), v)
+
+
+def test_projection_random_draws_respect_cap():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(2, 60))
+        cap = float(rng.uniform(0.5, 3.0)) / n
+        w = project_capped_simplex(rng.normal(scale=rng.uniform(0.01, 10), size=n), cap)
+        _check_feasible(w, cap)